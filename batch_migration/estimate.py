@@ -0,0 +1,172 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Timing model of the batch jobs.
+
+The duration of each stage of a job is estimated from the nodes of
+the plan (batch_migration/plan.py): each Weblate request takes the
+latency fitted for its endpoint from the requests of earlier runs
+(common/latency.py), plus the time of its uploaded bytes. The stages
+a job already completed in an earlier run take their recorded
+duration (job_timings.json of the workspace).
+
+The scheduler orders the jobs by their estimated duration, and its
+dry run simulates the pipeline of the stages to predict the wall time
+of a batch at different numbers of jobs.
+"""
+
+import heapq
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir, 'common'))
+from weblate_utils import NEW_TRANSLATION_WAIT_SECONDS  # noqa: E402
+
+
+STAGES = ('pull', 'upload', 'verify')
+# Latency of the requests of an endpoint without recorded requests
+DEFAULT_REQUEST_SECONDS = 0.5
+DEFAULT_BYTES_PER_SECOND = 1024 * 1024
+# Endpoints of the GET requests and the POST request of each plan step,
+# following weblate_utils.py.
+STEP_REQUESTS = {
+    'create-project': (('projects',), 'projects'),
+    'create-glossary': (('components',), 'projects/components'),
+    'create-category': (('projects/categories',), 'categories'),
+    'create-component': (('components', 'projects/categories'),
+                         'projects/components'),
+    'create-translation': (('translations',), 'components/translations'),
+    'upload-po-file': ((), 'translations/file'),
+    'test-accuracy': (('projects/file',), None),
+}
+# Seconds the scripts wait after a step.
+# create_weblate_components.sh waits after each new translation.
+STEP_WAIT_SECONDS = {'create-translation': NEW_TRANSLATION_WAIT_SECONDS}
+# Parallel operations of the upload stage, see WEBLATE_BATCH_JOBS of
+# create_weblate_components.sh. The waits do not hold a worker, so
+# they only delay the last uploads of a job.
+BATCH_JOBS = 4
+# Stage of each plan step. The project and the glossary are created
+# by prepare_project.sh before the pull.
+STEP_STAGES = {
+    'create-project': 'pull',
+    'create-glossary': 'pull',
+    'test-accuracy': 'verify',
+}
+
+
+def request_seconds(model: dict, method: str, endpoint: str,
+                    size: int = 0) -> float:
+    """Estimate the seconds of a request
+
+    :param model: dictionary of the fitted latencies, see
+        LatencyLog.fit
+    :returns: float seconds
+    """
+    if f'{method} {endpoint}' in model:
+        base, per_byte, _ = model[f'{method} {endpoint}']
+        return base + per_byte * size
+    return DEFAULT_REQUEST_SECONDS + size / DEFAULT_BYTES_PER_SECOND
+
+
+def node_seconds(node: dict, model: dict) -> float:
+    """Estimate the seconds of the requests of a node of the plan"""
+    get_endpoints, post_endpoint = STEP_REQUESTS[node['step']]
+    seconds = sum(request_seconds(model, 'GET', endpoint)
+                  for endpoint in get_endpoints[:node['gets']])
+    if node['posts'] and post_endpoint:
+        seconds += request_seconds(model, 'POST', post_endpoint,
+                                   node['bytes'])
+    return seconds
+
+
+def estimate_durations(job_ids: list, plan: dict, timings: dict,
+                       model: dict) -> dict:
+    """Estimate the seconds of the stages of the jobs
+
+    A stage takes its recorded duration if the job has one, else the
+    estimate of the plan nodes. The requests of the upload stage run
+    on BATCH_JOBS workers. The pull from Zanata is not in the
+    plan, so it takes the median of the recorded pulls. The stages
+    of unresolved jobs take the median of the other jobs.
+
+    :param job_ids: list of "<project>@<version>" job ids
+    :param plan: dictionary of the plan
+    :param timings: dictionary of job id -> dictionary of
+        stage -> recorded seconds
+    :param model: dictionary of the fitted latencies
+    :returns: dictionary of job id -> dictionary of stage -> seconds
+    """
+    resolved = {job['id'] for job in plan['jobs'] if job['resolved']}
+    estimates = {job_id: dict.fromkeys(STAGES, 0.0) for job_id in job_ids}
+    waits = dict.fromkeys(job_ids, 0.0)
+    for node in plan['nodes']:
+        if node['job'] in estimates:
+            stage = STEP_STAGES.get(node['step'], 'upload')
+            seconds = node_seconds(node, model)
+            if stage == 'upload':
+                seconds /= BATCH_JOBS
+            estimates[node['job']][stage] += seconds
+            waits[node['job']] = max(
+                waits[node['job']], STEP_WAIT_SECONDS.get(node['step'], 0.0))
+    for job_id, wait in waits.items():
+        estimates[job_id]['upload'] += wait
+
+    recorded_pulls = [stages['pull'] for stages in timings.values()
+                      if 'pull' in stages]
+    pull = statistics.median(recorded_pulls) if recorded_pulls else 0.0
+    for stages in estimates.values():
+        stages['pull'] += pull
+
+    for job_id in job_ids:
+        estimates[job_id].update(timings.get(job_id, {}))
+
+    known = [estimates[job_id] for job_id in job_ids
+             if job_id in resolved or job_id in timings]
+    if not known:
+        return estimates
+    medians = {stage: statistics.median(stages[stage] for stages in known)
+               for stage in STAGES}
+    for job_id in job_ids:
+        if job_id not in resolved and job_id not in timings:
+            estimates[job_id] = dict(medians)
+    return estimates
+
+
+def simulate_pipeline(durations: list, concurrency: dict) -> float:
+    """Simulate the stages of the jobs as the scheduler runs them
+
+    Each stage has its own workers, and a free worker takes the first
+    job of the list which finished the previous stage. The bounds of
+    the queues are not simulated.
+
+    :param durations: list of dictionaries of stage -> seconds,
+        in the dispatch order of the jobs
+    :param concurrency: dictionary of stage -> int number of workers
+    :returns: float seconds until the last job finished
+    """
+    ready = [0.0] * len(durations)
+    for stage in STAGES:
+        workers = [0.0] * concurrency[stage]
+        remaining = list(range(len(durations)))
+        finished = [0.0] * len(durations)
+        while remaining:
+            now = heapq.heappop(workers)
+            now = max(now, min(ready[i] for i in remaining))
+            job = next(i for i in remaining if ready[i] <= now)
+            remaining.remove(job)
+            finished[job] = now + durations[job][stage]
+            heapq.heappush(workers, finished[job])
+        ready = finished
+    return max(ready, default=0.0)
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Whole-run migration plan.
+
+Every project and version of a batch run is expanded into a DAG of
+the steps migration_resources.sh performs on Weblate, down to each
+component and locale. Each node counts the Weblate API calls, uploads
+and bytes of the step, so the plan shows the cost of the run before
+it starts, and two plans can be compared to spot projects whose cost
+changed.
+
+The plan is resolved offline from the workspace: the manifest written
+by discover_components, or the metadata files of every version read
+from the git objects of the cloned repository with the POT files, and
+the translations pulled from Zanata. Jobs that are not pulled yet are
+kept in the plan as unresolved.
+
+Plan format::
+
+    {
+        "created": "<ISO 8601 time>",
+        "bundle_translations": false,
+        "jobs": [
+            {
+                "id": "<project>@<version>",
+                "project": "<project>",
+                "version": "<version>",
+                "resolved": true,
+                "source": "manifest | git | fixed",
+                "components": [
+                    {"name": "<component>", "pot_bytes": 0,
+                     "locales": {"<locale>": <po bytes>}}
+                ],
+                "totals": {"gets": 0, "posts": 0, "uploads": 0,
+                           "downloads": 0, "bytes": 0}
+            }
+        ],
+        "nodes": [
+            {"id": "<node id>", "job": "<job id>", "step": "<step>",
+             "deps": ["<node id>"], "gets": 0, "posts": 0, "uploads": 0,
+             "downloads": 0, "bytes": 0}
+        ],
+        "totals": {...}
+    }
+"""
+
+import argparse
+from datetime import datetime
+from datetime import timezone
+import json
+import os
+import sys
+
+_BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                         os.pardir)
+sys.path.insert(0, os.path.join(_BASE_DIR, 'common'))
+sys.path.insert(0, os.path.join(_BASE_DIR, 'prepare_component_name'))
+from discover_components import discover_branch_components  # noqa: E402
+from discover_components import scan_pot_dir  # noqa: E402
+from discover_components import SPECIAL_PROJECT_COMPONENTS  # noqa: E402
+from git_metadata import read_metadata  # noqa: E402
+from translation_index import build_index  # noqa: E402
+from weblate_utils import get_version_name  # noqa: E402
+
+
+COUNTERS = ('gets', 'posts', 'uploads', 'downloads', 'bytes')
+
+
+def read_list(path):
+    """Read a list file such as list.txt and version.txt
+
+    Empty lines are skipped and whitespaces are stripped.
+    """
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def get_project_workspace(workspace, project, version):
+    """Get the workspace directory holding the files of the version
+
+    migration_versions.sh keeps each version in its own directory,
+    like get_project_work_dir in setup.sh.
+    """
+    project_dir = os.path.join(workspace, 'projects', project)
+    if version:
+        version_dir = os.path.join(
+            project_dir, 'versions', get_version_name(version))
+        if os.path.isdir(version_dir):
+            return version_dir
+    return project_dir
+
+
+def read_project_metadata(workspace, project, versions):
+    """Read the metadata files of all versions with one git call
+
+    The shared mirror is used if it exists, see update_mirror.
+
+    :returns: A dictionary of version -> files, empty if the project
+        is not cloned
+    """
+    mirror_dir = os.getenv('MIRROR_DIR', os.path.expanduser(
+        '~/.cache/openstack-weblate-migration/mirrors'))
+    repo = os.path.join(mirror_dir, f'{project}.git')
+    if not os.path.isdir(repo):
+        # Workspaces of older runs have a full clone.
+        repo = os.path.join(
+            get_project_workspace(workspace, project, None), project)
+    if not os.path.isdir(repo):
+        return {}
+    try:
+        return read_metadata(repo, versions)
+    except RuntimeError as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return {}
+
+
+def resolve_components(workspace, project, version, files=None):
+    """Resolve components and their POT paths offline
+
+    :param files: dict of the metadata files of the version read by
+        read_metadata, or None
+    :returns: tuple of (list of (component, POT path or None) tuples,
+        source), or (None, None) if it can not be resolved
+    """
+    project_workspace = get_project_workspace(workspace, project, version)
+    zanata_version = get_version_name(version)
+
+    if project in SPECIAL_PROJECT_COMPONENTS:
+        if not os.path.isdir(os.path.join(project_workspace, 'translations')):
+            return None, None
+        return ([(c, None) for c in SPECIAL_PROJECT_COMPONENTS[project]],
+                'fixed')
+
+    manifest_path = os.path.join(project_workspace, 'manifest.json')
+    if os.path.isfile(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('version') == zanata_version:
+            return ([(c['name'], c['pot_path'])
+                     for c in manifest['components']], 'manifest')
+
+    # The POT files of the last pulled version are used as an estimate
+    # for the versions which are not pulled yet.
+    pot_dir = os.path.join(project_workspace, 'pot')
+    if not files or not os.path.isdir(pot_dir):
+        return None, None
+    components = discover_branch_components(
+        project, files, scan_pot_dir(pot_dir))
+    return ([(c, os.path.join(pot_dir, pot_path))
+             for c, pot_path in components], 'git')
+
+
+def get_file_size(path):
+    if path and os.path.isfile(path):
+        return os.path.getsize(path)
+    return 0
+
+
+def new_node(node_id, job_id, step, deps, **counters):
+    node = {'id': node_id, 'job': job_id, 'step': step, 'deps': deps}
+    for counter in COUNTERS:
+        node[counter] = counters.get(counter, 0)
+    return node
+
+
+def plan_job(workspace, project, version, is_first_version,
+             bundle_translations=False, files=None):
+    """Expand a project version into a job and its nodes
+
+    The API calls follow create_weblate_components and test_accuracy:
+
+    - create-project/create-glossary: GET, and POST on the first version
+    - create-category: GET category list and POST
+    - create-component: GET, GET category list and POST with the zip
+    - create-translation: GET and POST, upload-po-file: POST with the po
+    - test_accuracy: download the project zip once
+
+    :param files: dict of the metadata files of the version
+    :returns: tuple of (job dict, list of node dicts)
+    """
+    job_id = f'{project}@{version}'
+    job = {'id': job_id, 'project': project, 'version': version,
+           'resolved': False, 'source': None, 'components': []}
+    nodes = []
+
+    def node_id(*names):
+        return ':'.join((job_id,) + names)
+
+    create_posts = 1 if is_first_version else 0
+    nodes.append(new_node(node_id('project'), job_id, 'create-project', [],
+                          gets=1, posts=create_posts))
+    nodes.append(new_node(node_id('glossary'), job_id, 'create-glossary',
+                          [node_id('project')], gets=1, posts=create_posts))
+    nodes.append(new_node(node_id('category'), job_id, 'create-category',
+                          [node_id('project')], gets=1, posts=1))
+
+    components, source = resolve_components(
+        workspace, project, version, files)
+    if components is None:
+        job['totals'] = sum_counters(nodes)
+        return job, nodes
+    job['resolved'] = True
+    job['source'] = source
+
+    translations_dir = os.path.join(
+        get_project_workspace(workspace, project, version), 'translations')
+    index = build_index(project, translations_dir,
+                        [component for component, _ in components])
+
+    verify_deps = []
+    for component, pot_path in components:
+        locales = {locale: entry['size'] for locale, entry
+                   in index['components'][component].items()}
+        pot_bytes = get_file_size(pot_path)
+        job['components'].append({
+            'name': component, 'pot_bytes': pot_bytes, 'locales': locales})
+
+        component_node = node_id('component', component)
+        zip_bytes = pot_bytes
+        if bundle_translations:
+            zip_bytes += sum(locales.values())
+        nodes.append(new_node(
+            component_node, job_id, 'create-component',
+            [node_id('category')],
+            gets=2, posts=1, uploads=1, bytes=zip_bytes))
+        verify_deps.append(component_node)
+        if bundle_translations:
+            continue
+
+        for locale, po_bytes in locales.items():
+            translation_node = node_id('translation', component, locale)
+            upload_node = node_id('upload', component, locale)
+            nodes.append(new_node(
+                translation_node, job_id, 'create-translation',
+                [component_node], gets=1, posts=1))
+            nodes.append(new_node(
+                upload_node, job_id, 'upload-po-file', [translation_node],
+                posts=1, uploads=1, bytes=po_bytes))
+            verify_deps.append(upload_node)
+
+    nodes.append(new_node(node_id('verify'), job_id, 'test-accuracy',
+                          verify_deps, gets=1, downloads=1))
+    job['totals'] = sum_counters(nodes)
+    return job, nodes
+
+
+def sum_counters(items):
+    totals = dict.fromkeys(COUNTERS, 0)
+    for item in items:
+        for counter in COUNTERS:
+            totals[counter] += item.get(counter, 0)
+    return totals
+
+
+def build_plan(workspace, projects, versions, bundle_translations=False):
+    """Build the plan of projects x versions"""
+    jobs = []
+    nodes = []
+    for project in projects:
+        metadata = read_project_metadata(workspace, project, versions)
+        for i, version in enumerate(versions):
+            job, job_nodes = plan_job(
+                workspace, project, version, i == 0, bundle_translations,
+                metadata.get(version))
+            jobs.append(job)
+            nodes.extend(job_nodes)
+
+    return {
+        'created': datetime.now(timezone.utc).isoformat(),
+        'bundle_translations': bundle_translations,
+        'jobs': jobs,
+        'nodes': nodes,
+        'totals': sum_counters(job['totals'] for job in jobs),
+    }
+
+
+def load_plan(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def format_totals(totals):
+    return (f"GET {totals['gets']:>6}  POST {totals['posts']:>6}  "
+            f"uploads {totals['uploads']:>6}  "
+            f"downloads {totals['downloads']:>4}  "
+            f"bytes {totals['bytes']:>12}")
+
+
+def show_plan(plan):
+    for job in plan['jobs']:
+        state = ''
+        if not job['resolved']:
+            state = '  (unresolved)'
+        elif job['source'] == 'git':
+            state = '  (estimated)'
+        locales = sum(len(c['locales']) for c in job['components'])
+        print(f"{job['id']:<50} components {len(job['components']):>3}  "
+              f"locales {locales:>5}  {format_totals(job['totals'])}{state}")
+    print(f"{'Total':<50} jobs {len(plan['jobs']):>9}  "
+          f"nodes {len(plan['nodes']):>7}  {format_totals(plan['totals'])}")
+
+
+def diff_plans(old_plan, new_plan):
+    """Print the jobs whose cost changed between two plans
+
+    :returns: number of changed jobs
+    """
+    old_jobs = {job['id']: job for job in old_plan['jobs']}
+    new_jobs = {job['id']: job for job in new_plan['jobs']}
+    changed = 0
+    for job_id in sorted(old_jobs.keys() | new_jobs.keys()):
+        old_totals = old_jobs.get(job_id, {}).get('totals')
+        new_totals = new_jobs.get(job_id, {}).get('totals')
+        if old_totals == new_totals:
+            continue
+        changed += 1
+        if old_totals is None:
+            print(f"+ {job_id}: {format_totals(new_totals)}")
+        elif new_totals is None:
+            print(f"- {job_id}: {format_totals(old_totals)}")
+        else:
+            delta = {counter: new_totals[counter] - old_totals[counter]
+                     for counter in COUNTERS}
+            print(f"~ {job_id}: {format_totals(delta)}")
+    print(f"{changed} jobs changed")
+    return changed
+
+
+def setup_argument_parser():
+    """Setup command line argument parser with subcommands."""
+    parser = argparse.ArgumentParser(
+        description='Plan a batch migration and estimate its requests')
+    subparser = parser.add_subparsers(
+        dest='command', help='Available commands')
+    # Plan command
+    plan_parser = subparser.add_parser(
+        'plan', help='Expand projects x versions into a plan')
+    plan_parser.add_argument(
+        'list_file', help='The text file containing the list of projects')
+    plan_parser.add_argument(
+        'version_file', nargs='?', default='version.txt',
+        help='The text file containing the list of versions')
+    plan_parser.add_argument(
+        '--workspace', default=os.path.expanduser('~/workspace'),
+        help='Path to the migration workspace (default: ~/workspace)')
+    plan_parser.add_argument(
+        '--bundle-translations', action='store_true',
+        default=os.getenv('BUNDLE_TRANSLATIONS') == 'true',
+        help='Plan for BUNDLE_TRANSLATIONS=true')
+    plan_parser.add_argument(
+        '-o', '--output', required=True, help='Path to the plan JSON')
+    # Show command
+    show_parser = subparser.add_parser('show', help='Show a plan')
+    show_parser.add_argument('plan', help='Path to the plan JSON')
+    # Diff command
+    diff_parser = subparser.add_parser(
+        'diff', help='Show jobs whose cost changed between two plans')
+    diff_parser.add_argument('old_plan', help='Path to the old plan JSON')
+    diff_parser.add_argument('new_plan', help='Path to the new plan JSON')
+    return parser
+
+
+def main():
+    parser = setup_argument_parser()
+    args = parser.parse_args()
+
+    if args.command == 'plan':
+        plan = build_plan(
+            args.workspace, read_list(args.list_file),
+            read_list(args.version_file), args.bundle_translations)
+        tmp_path = f'{args.output}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(plan, f, indent=2)
+        os.replace(tmp_path, args.output)
+        show_plan(plan)
+    elif args.command == 'show':
+        show_plan(load_plan(args.plan))
+    elif args.command == 'diff':
+        diff_plans(load_plan(args.old_plan), load_plan(args.new_plan))
+    else:
+        parser.print_help()
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
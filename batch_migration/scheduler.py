@@ -0,0 +1,719 @@
+#!/usr/bin/env python3
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Run the project versions of a batch concurrently.
+
+Every project of the list file and version of the version file is a
+job running the stages of migration_resources.sh as a pipeline: pull
+(clone and pull from Zanata), upload (create the Weblate components
+and translations) and verify. Each stage runs up to --<stage>-jobs
+jobs at the same time, so the Zanata pull of the next jobs overlaps
+with the Weblate uploads of the previous ones, and the verification
+trails behind. The Weblate requests of all jobs share one request
+budget (see common/rate_limit.py) instead of sleeping between the jobs.
+
+The environment, the mirror, the Weblate project and the glossary are
+shared by the versions of a project, so prepare_project.sh prepares
+them once before the first version of the project starts. Each
+version has its own workspace directory, like migration_versions.sh.
+
+The jobs start longest first, so that the biggest projects do not
+start last and keep the batch running alone at the end. The cost of
+a job is the duration of its last successful run (job_timings.json of
+the workspace), or else estimated from the plan (batch_migration/
+plan.py) and the latencies of the Weblate requests of earlier runs,
+see batch_migration/estimate.py. Each stage takes the costliest
+waiting job first.
+
+With --work-queue, several hosts share the jobs of a batch: each host
+adds the jobs of the lists to a shared queue once, and its pull
+workers claim the jobs from the queue, see batch_migration/
+work_queue.py. The leases of the claimed jobs are renewed while they
+run, and the jobs of a crashed host are claimed again by the others.
+
+With --dry-run, nothing is run: the Weblate requests of the plan and
+the wall time of the batch at different numbers of jobs are printed,
+to choose the number of jobs before the migration.
+
+Each job writes its output to logs/<project>/<version>.<time>.log and
+its errors to logs/<project>/error.<version>.<time>.log, and a summary
+of the jobs is printed at the end.
+"""
+
+import argparse
+from collections import Counter
+import itertools
+import json
+import logging
+import math
+import os
+import queue
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from estimate import estimate_durations
+from estimate import simulate_pipeline
+from estimate import STAGES
+from plan import build_plan
+from plan import load_plan
+from plan import read_list
+from work_queue import get_work_queue
+from work_queue import WorkQueue
+# plan adds the common directory to the path.
+from latency import LatencyLog
+from migration_log import LogTee
+
+
+SCRIPTS_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+# Numbers of jobs compared by the dry run, with --jobs
+DRY_RUN_JOBS = (1, 2, 4, 8, 16)
+# Seconds between the claims while the other hosts run the last jobs
+CLAIM_INTERVAL = 30
+
+
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f'{hours}h{minutes:02d}m{seconds:02d}s'
+    return f'{minutes}m{seconds:02d}s'
+
+
+class Job:
+    """A version of a project to migrate"""
+    def __init__(self, project: str, version: str):
+        self.project = project
+        self.version = version
+        self.status = 'pending'
+        self.stage = None
+        self.exit_code = None
+        self.start = None
+        self.duration = 0.0
+        self.log_path = None
+        # Estimated seconds of the stages, and the measured ones
+        self.estimates = {}
+        self.durations = {}
+
+    @property
+    def cost(self) -> float:
+        return sum(self.estimates.values())
+
+    @property
+    def id(self) -> str:
+        return f'{self.project}@{self.version}'
+
+    @property
+    def name(self) -> str:
+        return f'{self.project} ({self.version})'
+
+    def to_dict(self) -> dict:
+        return {
+            'project': self.project,
+            'version': self.version,
+            'status': self.status,
+            'stage': self.stage,
+            'exit_code': self.exit_code,
+            'duration': round(self.duration, 1),
+            'cost': round(self.cost, 1),
+            'log': self.log_path,
+        }
+
+
+def load_timings(path: str) -> dict:
+    """Load the stage durations of the last successful runs
+
+    :returns: dictionary of job id -> dictionary of stage -> seconds
+    """
+    if not os.path.isfile(path):
+        return {}
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except ValueError:
+        print(f"[ERROR] Ignore the broken job timings: {path}")
+        return {}
+
+
+def save_timings(path: str, timings: dict, jobs: list) -> None:
+    """Record the stage durations of the successful jobs"""
+    for job in jobs:
+        if job.status == 'success':
+            timings[job.id] = {stage: round(seconds, 1)
+                               for stage, seconds in job.durations.items()}
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(timings, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def load_latency_model(work_dir: str) -> dict:
+    """Fit the latencies of the Weblate requests of earlier runs
+
+    :returns: dictionary of the fitted latencies, see LatencyLog.fit
+    """
+    path = os.getenv('MIGRATION_LATENCY',
+                     os.path.join(work_dir, 'latency.sqlite'))
+    if not os.path.isfile(path):
+        return {}
+    return LatencyLog(path).fit()
+
+
+def assign_costs(jobs: list, plan: dict, timings: dict,
+                 model: dict) -> None:
+    """Estimate the stages of the jobs and sort them longest first"""
+    estimates = estimate_durations(
+        [job.id for job in jobs], plan, timings, model)
+    for job in jobs:
+        job.estimates = estimates[job.id]
+    jobs.sort(key=lambda job: job.cost, reverse=True)
+
+
+def print_dry_run(jobs: list, plan: dict, timings: dict, model: dict,
+                  concurrency: dict, rate: float) -> None:
+    """Print the Weblate requests and the predicted wall time"""
+    job_ids = {job.id for job in jobs}
+    plan_jobs = [plan_job for plan_job in plan['jobs']
+                 if plan_job['id'] in job_ids]
+    resolved = [plan_job for plan_job in plan_jobs if plan_job['resolved']]
+    totals = Counter()
+    for plan_job in resolved:
+        totals.update(plan_job['totals'])
+    requests = totals['gets'] + totals['posts']
+
+    print("=== Dry run ===")
+    print(f"Jobs: {len(jobs)}, resolved: {len(resolved)}, "
+          f"recorded: {len(job_ids & timings.keys())}")
+    print(f"Weblate requests: GET {totals['gets']}, POST {totals['posts']}, "
+          f"uploads {totals['uploads']}, downloads {totals['downloads']}, "
+          f"bytes {totals['bytes']}")
+    samples = sum(count for _, _, count in model.values())
+    print(f"Latency: {samples} recorded requests of {len(model)} endpoints")
+    print("Longest jobs:")
+    for job in jobs[:5]:
+        stages = ', '.join(f'{stage} {format_duration(seconds)}'
+                           for stage, seconds in job.estimates.items())
+        print(f"  {job.name:<40} {stages}")
+
+    # The request budget bounds the wall time, whatever the jobs.
+    minimum = requests / rate if rate else 0.0
+    durations = [job.estimates for job in jobs]
+    print("Jobs (pull/upload/verify)  Wall time")
+    levels = [(str(n), dict.fromkeys(STAGES, n))
+              for n in sorted(set(DRY_RUN_JOBS) | set(concurrency.values()))]
+    levels.append(('/'.join(str(concurrency[stage]) for stage in STAGES),
+                   concurrency))
+    for name, level in levels:
+        wall_time = max(simulate_pipeline(durations, level), minimum)
+        print(f"  {name:<25} {format_duration(wall_time)}")
+    resolved_ids = {plan_job['id'] for plan_job in resolved}
+    unknown = job_ids - resolved_ids - timings.keys()
+    if unknown:
+        print(f"[INFO] {len(unknown)} jobs are neither resolved nor "
+              "recorded, and estimated with the median of the others")
+
+
+class Scheduler:
+    """Runs the stages of the jobs as a pipeline
+
+    Each stage has its own workers, and the stages are connected by
+    bounded queues. A job goes to the next stage when its stage
+    succeeded, and the workers of a stage wait while the queue of the
+    next stage is full, so that the pulled files do not pile up when
+    Weblate is slower than Zanata. The queues are ordered by the cost
+    of the jobs, the costliest first.
+
+    With a work queue, the jobs are claimed from it one by one when a
+    pull worker is free, instead of running all jobs.
+    """
+    def __init__(self, jobs: list, concurrency: dict, queue_size: int,
+                 workspace_name: str, log_dir: str, env: dict,
+                 work_queue: WorkQueue = None, worker: str = None,
+                 lease_seconds: float = 300):
+        """
+        :param jobs: list of Job, longest first
+        :param concurrency: dictionary of stage -> int number of jobs
+            running the stage at the same time
+        :param queue_size: int number of jobs waiting for a stage
+        :param workspace_name: string folder name of the workspace
+        :param log_dir: string path to the log directory
+        :param env: dictionary of environment variables of the jobs
+        :param work_queue: WorkQueue shared with the other hosts
+        :param worker: string name of this host in the work queue
+        :param lease_seconds: float seconds until the lease of a
+            claimed job expires without a heartbeat
+        """
+        self.jobs = jobs
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.workspace_name = workspace_name
+        self.log_dir = log_dir
+        self.env = env
+        self.work_queue = work_queue
+        self.worker = worker
+        self.lease_seconds = lease_seconds
+        self.timestamp = time.strftime('%H%M%S')
+
+        self._lock = threading.Lock()
+        self._env_lock = threading.Lock()
+        self._env_ready = False
+        self._project_locks = {job.project: threading.Lock() for job in jobs}
+        self._prepared = {}
+        # Unfinished jobs of each project. Their artifacts are kept
+        # when a finished job evicts the workspace.
+        self._remaining = Counter(job.project for job in jobs)
+        self._processes = set()
+        self._started = 0
+        self._stopping = False
+        self._stopped = threading.Event()
+        self._sequence = itertools.count()
+        # Jobs claimed from the work queue and not finished yet
+        self._claimed = set()
+        self._claiming = False
+
+    def _get_log_path(self, project: str, name: str) -> str:
+        project_log_dir = os.path.join(self.log_dir, project)
+        os.makedirs(project_log_dir, exist_ok=True)
+        return os.path.join(project_log_dir, f'{name}.{self.timestamp}.log')
+
+    def _run(self, command: list, env: dict, log_path: str,
+             error_log_path: str, prefix: str) -> int:
+        """Run a command and write its output to the log files
+
+        The error lines are also printed with the prefix.
+
+        :returns: int exit code of the command
+        """
+        with self._lock:
+            if self._stopping:
+                return -1
+            process = subprocess.Popen(
+                command, env=env, stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT, text=True, errors='replace')
+            self._processes.add(process)
+        try:
+            with LogTee(log_path, error_log_path) as tee:
+                for line in process.stdout:
+                    if tee.write(line) >= logging.ERROR:
+                        print(f'{prefix} | {line}', end='', flush=True)
+            return process.wait()
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+
+    def _prepare_project(self, project: str) -> bool:
+        """Prepare the project once for all of its versions
+
+        The environment of the workspace is set up by the first
+        preparation, and the others wait for it.
+
+        :returns: bool prepared or not
+        """
+        with self._project_locks[project]:
+            if project in self._prepared:
+                return self._prepared[project]
+
+            print(f"[INFO] Prepare {project}", flush=True)
+            log_path = self._get_log_path(project, 'prepare')
+            error_log_path = self._get_log_path(project, 'error.prepare')
+            command = [os.path.join(SCRIPTS_DIR, 'prepare_project.sh'),
+                       project, self.workspace_name]
+            with self._env_lock:
+                prepared_env = self._env_ready
+                if not prepared_env:
+                    exit_code = self._run(command, self.env, log_path,
+                                          error_log_path, project)
+                    self._env_ready = exit_code == 0
+            if prepared_env:
+                env = dict(self.env, PREPARED_ENV='true')
+                exit_code = self._run(command, env, log_path,
+                                      error_log_path, project)
+
+            self._prepared[project] = exit_code == 0
+            if exit_code != 0:
+                print(f"[ERROR] Failed to prepare {project}, "
+                      f"see {log_path}", flush=True)
+            return self._prepared[project]
+
+    def _run_stage(self, stage: str, job: Job) -> bool:
+        """Run a stage of migration_resources.sh for the job
+
+        :returns: bool succeeded or not
+        """
+        job.stage = stage
+        if stage == STAGES[0]:
+            job.start = time.time()
+            if not self._prepare_project(job.project):
+                job.log_path = self._get_log_path(job.project, 'prepare')
+                return False
+
+        with self._lock:
+            if stage == STAGES[0]:
+                self._started += 1
+                print(f"[INFO] [{self._started}/{len(self.jobs)}] "
+                      f"{stage}: Start {job.name}", flush=True)
+            else:
+                print(f"[INFO] {stage}: Start {job.name}", flush=True)
+            keep = ' '.join(p for p, n in self._remaining.items() if n)
+        version_name = job.version.replace('/', '-')
+        job.log_path = self._get_log_path(job.project, version_name)
+        env = dict(self.env, PREPARED_PROJECT='true', WORKSPACE_KEEP=keep)
+        start = time.time()
+        job.exit_code = self._run(
+            [os.path.join(SCRIPTS_DIR, 'migration_resources.sh'),
+             '--stage', stage, job.project, job.version,
+             self.workspace_name],
+            env, job.log_path,
+            self._get_log_path(job.project, f'error.{version_name}'),
+            f'{job.project} {job.version}')
+        job.durations[stage] = time.time() - start
+        return job.exit_code == 0
+
+    def _finish(self, job: Job, status: str) -> None:
+        job.status = status
+        if job.start:
+            job.duration = time.time() - job.start
+        with self._lock:
+            self._remaining[job.project] -= 1
+            self._claimed.discard(job)
+        # The jobs interrupted by Ctrl-C are left to the other hosts.
+        if self.work_queue and (status == 'skipped' or self._stopping):
+            self.work_queue.release(job.id, self.worker)
+        elif self.work_queue:
+            self.work_queue.complete(job.id, self.worker, status)
+        if status == 'success':
+            print(f"[INFO] Success: {job.name} "
+                  f"in {format_duration(job.duration)}", flush=True)
+        elif status == 'failed':
+            print(f"[ERROR] Failed: {job.name} at {job.stage} "
+                  f"(exit code: {job.exit_code}), see {job.log_path}",
+                  flush=True)
+
+    def _put(self, stage_queue: queue.PriorityQueue, job: Job) -> None:
+        stage_queue.put((-job.cost, next(self._sequence), job))
+
+    def _get_job(self, project: str, version: str) -> Job:
+        """Get the job of a claimed project version
+
+        A job added by another host with other lists is added.
+        """
+        with self._lock:
+            for job in self.jobs:
+                if (job.project, job.version) == (project, version):
+                    return job
+            job = Job(project, version)
+            self.jobs.append(job)
+            self._project_locks.setdefault(project, threading.Lock())
+            self._remaining[project] += 1
+            return job
+
+    def _claim_jobs(self, first_queue: queue.PriorityQueue) -> None:
+        """Put the jobs claimed from the work queue to the first stage
+
+        A job is claimed when a pull worker took the previous one, so
+        a host holds at most one job more than it runs. While the other
+        hosts run the last jobs, the queue is checked again, because the
+        jobs of a crashed host are claimed again when their leases
+        expire.
+        """
+        while not self._stopping:
+            if first_queue.full():
+                self._stopped.wait(1)
+                continue
+            claimed = self.work_queue.claim(self.worker, self.lease_seconds)
+            if claimed is None:
+                if not self.work_queue.counts()['running']:
+                    break
+                self._stopped.wait(CLAIM_INTERVAL)
+                continue
+            job = self._get_job(*claimed)
+            with self._lock:
+                self._claimed.add(job)
+            print(f"[INFO] Claimed {job.name}", flush=True)
+            self._put(first_queue, job)
+
+    def _heartbeat(self) -> None:
+        """Renew the leases of the claimed jobs until all finished"""
+        last_beat = time.monotonic()
+        while self._claiming or self._claimed:
+            time.sleep(1)
+            if time.monotonic() - last_beat < self.lease_seconds / 3:
+                continue
+            last_beat = time.monotonic()
+            with self._lock:
+                jobs = list(self._claimed)
+            for job in jobs:
+                if (not self.work_queue.heartbeat(job.id, self.worker)
+                        and job in self._claimed):
+                    print(f"[ERROR] Lost the lease of {job.name}, "
+                          "another host may run it", flush=True)
+
+    def _work(self, stage: str, in_queue: queue.PriorityQueue,
+              out_queue: queue.PriorityQueue) -> None:
+        """Run the stage for the jobs of the queue until None"""
+        while True:
+            _, _, job = in_queue.get()
+            if job is None:
+                break
+            if self._stopping:
+                self._finish(job, 'skipped')
+            elif not self._run_stage(stage, job):
+                self._finish(job, 'failed')
+            elif out_queue is None:
+                self._finish(job, 'success')
+            else:
+                self._put(out_queue, job)
+
+    def _interrupt(self, signum, frame) -> None:
+        print("[INFO] Interrupted, stop the running jobs", flush=True)
+        self.stop()
+
+    def stop(self) -> None:
+        """Skip the pending jobs and terminate the running ones"""
+        with self._lock:
+            self._stopping = True
+            self._stopped.set()
+            for process in self._processes:
+                process.terminate()
+
+    def run(self) -> list:
+        """Run all jobs through the stages
+
+        :returns: list of Job with their results
+        """
+        # With a work queue, one claimed job waits for the pull workers.
+        queues = [queue.PriorityQueue(maxsize=1 if self.work_queue else 0)]
+        queues.extend(queue.PriorityQueue(maxsize=self.queue_size)
+                      for _ in STAGES[1:])
+        workers = []
+        for i, stage in enumerate(STAGES):
+            out_queue = queues[i + 1] if i + 1 < len(STAGES) else None
+            workers.append([
+                threading.Thread(target=self._work,
+                                 args=(stage, queues[i], out_queue),
+                                 name=f'{stage}-{n}', daemon=True)
+                for n in range(self.concurrency[stage])])
+            for thread in workers[-1]:
+                thread.start()
+
+        if self.work_queue:
+            self._claiming = True
+            claimer = threading.Thread(target=self._claim_jobs,
+                                       args=(queues[0],), daemon=True)
+            heartbeat = threading.Thread(target=self._heartbeat, daemon=True)
+            claimer.start()
+            heartbeat.start()
+        else:
+            for job in self.jobs:
+                self._put(queues[0], job)
+        # Ctrl-C stops the jobs, and the workers finish the jobs
+        # left in the queues as skipped.
+        previous_handler = signal.signal(signal.SIGINT, self._interrupt)
+        try:
+            if self.work_queue:
+                claimer.join()
+                self._claiming = False
+            # A stage ends when all workers of the previous stage ended.
+            # The None items are ordered after the jobs.
+            for stage_queue, stage_workers in zip(queues, workers):
+                for n in range(len(stage_workers)):
+                    stage_queue.put((math.inf, n, None))
+                for thread in stage_workers:
+                    thread.join()
+            if self.work_queue:
+                heartbeat.join()
+        finally:
+            signal.signal(signal.SIGINT, previous_handler)
+        return self.jobs
+
+
+def print_summary(jobs: list, elapsed: float) -> None:
+    counts = Counter(job.status for job in jobs)
+    print("=====================")
+    print(f"=== Migration completed in {format_duration(elapsed)} ===")
+    print(f"Total: {len(jobs)}, Success: {counts['success']}, "
+          f"Failed: {counts['failed']}, Skipped: {counts['skipped']}")
+    for job in jobs:
+        if job.status == 'success':
+            continue
+        stage = f' at {job.stage}' if job.stage else ''
+        print(f"  {job.status:<8} {job.name}{stage} "
+              f"(exit code: {job.exit_code}) {job.log_path or ''}")
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='Run the project versions of a batch concurrently')
+    parser.add_argument(
+        'list_file', help='Project list file, one project per line')
+    parser.add_argument(
+        'version_file', nargs='?', default='version.txt',
+        help='Version list file, one version per line '
+             '(default: version.txt)')
+    parser.add_argument(
+        '--workspace', default='workspace',
+        help='Folder name of the workspace in the home directory '
+             '(default: workspace)')
+    parser.add_argument(
+        '-j', '--jobs', type=int,
+        default=int(os.getenv('MIGRATION_JOBS', '4')),
+        help='Number of jobs running each stage at the same time '
+             '(default: MIGRATION_JOBS environment variable or 4)')
+    for stage in STAGES:
+        parser.add_argument(
+            f'--{stage}-jobs', type=int,
+            help=f'Number of jobs running the {stage} stage at the same '
+                 'time (default: --jobs)')
+    parser.add_argument(
+        '--queue-size', type=int,
+        help='Number of jobs waiting for the upload and verify stages. '
+             'The earlier stage waits when the queue is full '
+             '(default: --jobs)')
+    parser.add_argument(
+        '--rate', type=float, default=os.getenv('WEBLATE_RATE_LIMIT'),
+        help='Weblate requests per second of all jobs '
+             '(default: WEBLATE_RATE_LIMIT environment variable, '
+             'no limit if not set)')
+    parser.add_argument(
+        '--log-dir', default='logs', help='Log directory (default: logs)')
+    parser.add_argument(
+        '--summary-json', help='Path to write the results of the jobs')
+    parser.add_argument(
+        '--plan',
+        help='Plan of batch_migration/plan.py to estimate the cost of '
+             'the jobs (default: built from the workspace)')
+    parser.add_argument(
+        '--work-queue',
+        help='Path to a work queue shared with other hosts, a .sqlite '
+             'file or a directory (see batch_migration/work_queue.py)')
+    parser.add_argument(
+        '--worker',
+        default=f'{socket.gethostname()}:{os.getpid()}',
+        help='Name of this host in the work queue (default: host:pid)')
+    parser.add_argument(
+        '--lease', type=float, default=300,
+        help='Seconds until the lease of a claimed job expires without '
+             'a heartbeat (default: 300)')
+    parser.add_argument(
+        '--dry-run', action='store_true',
+        help='Print the Weblate requests and the predicted wall time '
+             'of the batch without running it')
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='Run the jobs with MIGRATION_RESUME=true to skip the steps '
+             'completed by a failed run (see common/journal.py). '
+             'Without it, the jobs start from scratch')
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+    for path in (args.list_file, args.version_file):
+        if not os.path.isfile(path):
+            print(f"[ERROR] File '{path}' does not exist.")
+            sys.exit(1)
+    concurrency = {stage: getattr(args, f'{stage}_jobs') or args.jobs
+                   for stage in STAGES}
+    queue_size = args.queue_size or args.jobs
+    if min(concurrency.values()) < 1 or queue_size < 1:
+        print("[ERROR] The number of jobs and the queue size "
+              "should be at least 1")
+        sys.exit(1)
+
+    projects = read_list(args.list_file)
+    versions = read_list(args.version_file)
+    jobs = [Job(project, version)
+            for project in projects for version in versions]
+
+    work_dir = os.path.join(os.path.expanduser('~'), args.workspace)
+    if args.plan:
+        plan = load_plan(args.plan)
+    else:
+        plan = build_plan(work_dir, projects, versions)
+    timings_path = os.path.join(work_dir, 'job_timings.json')
+    timings = load_timings(timings_path)
+    model = load_latency_model(work_dir)
+    assign_costs(jobs, plan, timings, model)
+    if args.rate and float(args.rate) <= 0:
+        print(f"[ERROR] Invalid request rate: {args.rate}")
+        sys.exit(1)
+    if args.dry_run:
+        print_dry_run(jobs, plan, timings, model, concurrency,
+                      float(args.rate or 0))
+        return
+
+    work_queue = None
+    if args.work_queue:
+        if args.lease <= 0:
+            print(f"[ERROR] Invalid lease: {args.lease}")
+            sys.exit(1)
+        work_queue = get_work_queue(args.work_queue)
+        added = work_queue.add(
+            [(job.project, job.version, job.cost) for job in jobs])
+        print(f"[INFO] Added {added} jobs to the work queue")
+
+    os.makedirs(work_dir, exist_ok=True)
+    env = dict(os.environ, VERSION_WORKSPACE='true',
+               BATCH_LIST_FILE=os.path.abspath(args.list_file))
+    if args.resume:
+        env['MIGRATION_RESUME'] = 'true'
+    if args.rate:
+        env['WEBLATE_RATE_LIMIT'] = str(args.rate)
+        env.setdefault('WEBLATE_RATE_LIMIT_FILE',
+                       os.path.join(work_dir, 'weblate_rate_limit'))
+
+    print("=== Migration starts ===")
+    print(f"Project file: {args.list_file}")
+    print(f"Version file: {args.version_file}")
+    print(f"Jobs: {len(jobs)}")
+    print("Stages: " + ', '.join(
+        f'{stage} {count}' for stage, count in concurrency.items())
+        + f", queue size {queue_size}")
+    print(f"Weblate requests per second: {args.rate or 'no limit'}")
+    print(f"Log directory: {args.log_dir}")
+    if work_queue:
+        print(f"Work queue: {args.work_queue} (worker: {args.worker})")
+    print("Longest jobs: " + ', '.join(
+        f'{job.name} {format_duration(job.cost)}' for job in jobs[:3]))
+    print("=====================", flush=True)
+
+    start = time.time()
+    scheduler = Scheduler(jobs, concurrency, queue_size, args.workspace,
+                          args.log_dir, env, work_queue, args.worker,
+                          args.lease)
+    scheduler.run()
+    if work_queue:
+        # The other jobs were run by the other hosts.
+        jobs = [job for job in jobs if job.status != 'pending']
+    print_summary(jobs, time.time() - start)
+    if work_queue:
+        print("Work queue: " + ', '.join(
+            f'{status} {count}'
+            for status, count in work_queue.counts().items()))
+    save_timings(timings_path, timings, jobs)
+
+    if args.summary_json:
+        with open(args.summary_json, 'w') as f:
+            json.dump([job.to_dict() for job in jobs], f, indent=2)
+
+    if any(job.status != 'success' for job in jobs):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,441 @@
+#!/usr/bin/env python3
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Work queue of the batch jobs shared by several hosts.
+
+With --work-queue, batch_migration/scheduler.py of every host claims
+the project versions from a shared queue instead of running all jobs
+of the lists itself. A claimed job has a lease which the host renews
+with heartbeats while the job runs. When a host crashes, its leases
+expire and the jobs are claimed again by the other hosts, up to
+MAX_ATTEMPTS times.
+
+The queue is a path on the storage shared by the hosts:
+
+* ``<path>.sqlite``: a SQLite database. The rollback journal is used
+  instead of the write-ahead log, which does not work on network
+  file systems, so the file system should support POSIX locks.
+* any other path: a directory of lease files. A job is claimed by
+  renaming its file from ``pending/`` to ``running/``, and the
+  heartbeat updates the modification time of the file.
+
+Both have the same interface (WorkQueue), so the queue can be replaced
+by another backend.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+
+# Times a job is claimed again after its lease expired
+MAX_ATTEMPTS = 3
+STATUSES = ('pending', 'running', 'success', 'failed')
+
+
+class WorkQueue:
+    """Interface of the work queues
+
+    The jobs are identified by "<project>@<version>", and claimed
+    by the highest cost first.
+    """
+    def add(self, jobs: list) -> int:
+        """Add the jobs which are not in the queue yet
+
+        :param jobs: list of tuples of (project, version, float cost)
+        :returns: int number of added jobs
+        """
+        raise NotImplementedError
+
+    def claim(self, worker: str, lease_seconds: float) -> tuple:
+        """Claim the costliest pending job, or an expired one
+
+        :param worker: string name of the worker
+        :param lease_seconds: float seconds until the lease expires
+            without a heartbeat
+        :returns: tuple of (project, version), or None if no job
+            is available
+        """
+        raise NotImplementedError
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        """Renew the lease of a claimed job
+
+        :returns: bool the worker still holds the lease or not
+        """
+        raise NotImplementedError
+
+    def complete(self, job_id: str, worker: str, status: str) -> None:
+        """Record the result of a claimed job"""
+        raise NotImplementedError
+
+    def release(self, job_id: str, worker: str) -> None:
+        """Put a claimed job back to the pending jobs"""
+        raise NotImplementedError
+
+    def list_jobs(self) -> list:
+        """Get the jobs
+
+        :returns: list of dictionaries with the id, status, worker,
+            attempts and cost of each job
+        """
+        raise NotImplementedError
+
+    def retry(self) -> int:
+        """Put the failed jobs back to the pending jobs
+
+        :returns: int number of jobs to retry
+        """
+        raise NotImplementedError
+
+    def counts(self) -> dict:
+        """Count the jobs of each status"""
+        counts = dict.fromkeys(STATUSES, 0)
+        for job in self.list_jobs():
+            counts[job['status']] += 1
+        return counts
+
+
+def get_job_id(project: str, version: str) -> str:
+    return f'{project}@{version}'
+
+
+class SqliteWorkQueue(WorkQueue):
+    """Work queue in a SQLite database
+
+    Each thread has its own connection, because the transactions of
+    the claims and the heartbeats run in different threads.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if getattr(self._local, 'conn', None) is None:
+            conn = sqlite3.connect(self.path, timeout=60,
+                                   isolation_level=None)
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                ' id TEXT PRIMARY KEY,'
+                ' project TEXT NOT NULL,'
+                ' version TEXT NOT NULL,'
+                ' cost REAL NOT NULL,'
+                ' status TEXT NOT NULL,'
+                ' worker TEXT,'
+                ' lease_seconds REAL,'
+                ' lease_expires REAL,'
+                ' attempts INTEGER NOT NULL DEFAULT 0,'
+                ' updated REAL NOT NULL)')
+            self._local.conn = conn
+        return self._local.conn
+
+    def add(self, jobs: list) -> int:
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            added = 0
+            for project, version, cost in jobs:
+                added += self.conn.execute(
+                    'INSERT OR IGNORE INTO jobs'
+                    ' (id, project, version, cost, status, updated)'
+                    " VALUES (?, ?, ?, ?, 'pending', ?)",
+                    (get_job_id(project, version), project, version,
+                     cost, now)).rowcount
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        return added
+
+    def claim(self, worker: str, lease_seconds: float) -> tuple:
+        now = time.time()
+        # The lock is taken before reading, so two workers never
+        # claim the same job.
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            self.conn.execute(
+                "UPDATE jobs SET status = 'failed', updated = ?"
+                " WHERE status = 'running' AND lease_expires < ?"
+                ' AND attempts >= ?', (now, now, MAX_ATTEMPTS))
+            row = self.conn.execute(
+                'SELECT id, project, version FROM jobs'
+                " WHERE status = 'pending'"
+                " OR (status = 'running' AND lease_expires < ?)"
+                ' ORDER BY cost DESC, id LIMIT 1', (now,)).fetchone()
+            if row:
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?,"
+                    ' lease_seconds = ?, lease_expires = ?,'
+                    ' attempts = attempts + 1, updated = ? WHERE id = ?',
+                    (worker, lease_seconds, now + lease_seconds, now,
+                     row[0]))
+            self.conn.execute('COMMIT')
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        return (row[1], row[2]) if row else None
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        now = time.time()
+        return self.conn.execute(
+            'UPDATE jobs SET lease_expires = ? + lease_seconds,'
+            ' updated = ?'
+            " WHERE id = ? AND worker = ? AND status = 'running'",
+            (now, now, job_id, worker)).rowcount == 1
+
+    def complete(self, job_id: str, worker: str, status: str) -> None:
+        self.conn.execute(
+            'UPDATE jobs SET status = ?, lease_expires = NULL, updated = ?'
+            " WHERE id = ? AND worker = ? AND status = 'running'",
+            (status, time.time(), job_id, worker))
+
+    def release(self, job_id: str, worker: str) -> None:
+        self.conn.execute(
+            "UPDATE jobs SET status = 'pending', worker = NULL,"
+            ' lease_expires = NULL, attempts = attempts - 1, updated = ?'
+            " WHERE id = ? AND worker = ? AND status = 'running'",
+            (time.time(), job_id, worker))
+
+    def list_jobs(self) -> list:
+        now = time.time()
+        jobs = []
+        for job_id, status, worker, attempts, cost, expires in \
+                self.conn.execute(
+                    'SELECT id, status, worker, attempts, cost,'
+                    ' lease_expires FROM jobs ORDER BY cost DESC, id'):
+            # An expired lease is claimed again by the next worker.
+            if status == 'running' and expires < now:
+                status = 'pending'
+            jobs.append({'id': job_id, 'status': status, 'worker': worker,
+                         'attempts': attempts, 'cost': cost})
+        return jobs
+
+    def retry(self) -> int:
+        return self.conn.execute(
+            "UPDATE jobs SET status = 'pending', worker = NULL,"
+            " attempts = 0, updated = ? WHERE status = 'failed'",
+            (time.time(),)).rowcount
+
+
+class DirectoryWorkQueue(WorkQueue):
+    """Work queue in a directory of lease files
+
+    Each job is a JSON file named "<cost>.<job id>" in the directory
+    of its status. The files are moved between the directories with
+    atomic renames, so only one worker succeeds to claim a job.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        for status in STATUSES:
+            os.makedirs(os.path.join(path, status), exist_ok=True)
+
+    def _path(self, status: str, name: str = '') -> str:
+        return os.path.join(self.path, status, name)
+
+    def _find(self, job_id: str, status: str = None) -> tuple:
+        """Find the file of a job
+
+        :returns: tuple of (status, file name), or None
+        """
+        suffix = '.' + quote(job_id, safe='@')
+        for job_status in ([status] if status else STATUSES):
+            for name in os.listdir(self._path(job_status)):
+                if name.endswith(suffix):
+                    return job_status, name
+        return None
+
+    def _read(self, status: str, name: str) -> dict:
+        with open(self._path(status, name)) as f:
+            return json.load(f)
+
+    def _write(self, status: str, name: str, job: dict) -> None:
+        tmp_path = self._path(status, f'.{name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, self._path(status, name))
+
+    def _move(self, status: str, name: str, new_status: str) -> bool:
+        """Move the file of a job, if no other worker moved it"""
+        try:
+            os.rename(self._path(status, name), self._path(new_status, name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _is_expired(self, name: str, now: float) -> bool:
+        try:
+            job = self._read('running', name)
+            mtime = os.stat(self._path('running', name)).st_mtime
+        except FileNotFoundError:
+            return False
+        # The file of a job being claimed has no lease yet.
+        return 'lease_seconds' in job and mtime + job['lease_seconds'] < now
+
+    def add(self, jobs: list) -> int:
+        added = 0
+        for project, version, cost in jobs:
+            job_id = get_job_id(project, version)
+            if self._find(job_id):
+                continue
+            name = f'{int(cost):012d}.{quote(job_id, safe="@")}'
+            self._write('pending', name, {
+                'id': job_id, 'project': project, 'version': version,
+                'cost': cost, 'attempts': 0})
+            added += 1
+        return added
+
+    def _requeue_expired(self) -> None:
+        now = time.time()
+        for name in os.listdir(self._path('running')):
+            if name.startswith('.') or not self._is_expired(name, now):
+                continue
+            job = self._read('running', name)
+            new_status = ('failed' if job['attempts'] >= MAX_ATTEMPTS
+                          else 'pending')
+            if self._move('running', name, new_status):
+                job.pop('lease_seconds')
+                self._write(new_status, name, job)
+
+    def claim(self, worker: str, lease_seconds: float) -> tuple:
+        self._requeue_expired()
+        names = sorted((name for name in os.listdir(self._path('pending'))
+                        if not name.startswith('.')), reverse=True)
+        for name in names:
+            if not self._move('pending', name, 'running'):
+                continue
+            job = self._read('running', name)
+            job.update(worker=worker, lease_seconds=lease_seconds,
+                       attempts=job['attempts'] + 1)
+            self._write('running', name, job)
+            return job['project'], job['version']
+        return None
+
+    def heartbeat(self, job_id: str, worker: str) -> bool:
+        found = self._find(job_id, 'running')
+        if not found:
+            return False
+        try:
+            if self._read('running', found[1]).get('worker') != worker:
+                return False
+            os.utime(self._path('running', found[1]))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _finish(self, job_id: str, worker: str, status: str) -> None:
+        """Move a claimed job of the worker to the status"""
+        found = self._find(job_id, 'running')
+        if not found:
+            return
+        job = self._read('running', found[1])
+        if job.get('worker') != worker:
+            return
+        if self._move('running', found[1], status):
+            job.pop('lease_seconds', None)
+            if status == 'pending':
+                job.update(worker=None, attempts=job['attempts'] - 1)
+            self._write(status, found[1], job)
+
+    def complete(self, job_id: str, worker: str, status: str) -> None:
+        self._finish(job_id, worker, status)
+
+    def release(self, job_id: str, worker: str) -> None:
+        self._finish(job_id, worker, 'pending')
+
+    def list_jobs(self) -> list:
+        now = time.time()
+        jobs = []
+        for status in STATUSES:
+            for name in os.listdir(self._path(status)):
+                if name.startswith('.'):
+                    continue
+                try:
+                    job = self._read(status, name)
+                except FileNotFoundError:
+                    continue
+                job_status = status
+                if status == 'running' and self._is_expired(name, now):
+                    job_status = 'pending'
+                jobs.append({'id': job['id'], 'status': job_status,
+                             'worker': job.get('worker'),
+                             'attempts': job['attempts'],
+                             'cost': job['cost']})
+        return sorted(jobs, key=lambda job: (-job['cost'], job['id']))
+
+    def retry(self) -> int:
+        count = 0
+        for name in os.listdir(self._path('failed')):
+            if name.startswith('.'):
+                continue
+            job = self._read('failed', name)
+            if self._move('failed', name, 'pending'):
+                job.update(worker=None, attempts=0)
+                self._write('pending', name, job)
+                count += 1
+        return count
+
+
+def get_work_queue(path: str) -> WorkQueue:
+    """Open the work queue of the path
+
+    :param path: string path to a .sqlite file or a directory
+    :returns: WorkQueue
+    """
+    if path.endswith('.sqlite'):
+        return SqliteWorkQueue(path)
+    return DirectoryWorkQueue(path)
+
+
+def setup_argument_parser():
+    """Setup command line argument parser with subcommands."""
+    parser = argparse.ArgumentParser(
+        description='Work queue of the batch jobs shared by several hosts')
+    parser.add_argument(
+        '--queue', required=True,
+        help='Path to the work queue, a .sqlite file or a directory')
+    subparser = parser.add_subparsers(
+        dest='command', help='Available commands')
+    # Show command
+    subparser.add_parser('show', help='Print the jobs of the queue')
+    # Retry command
+    subparser.add_parser('retry', help='Put the failed jobs back to the queue')
+    return parser
+
+
+def main():
+    parser = setup_argument_parser()
+    args = parser.parse_args()
+
+    work_queue = get_work_queue(args.queue)
+    if args.command == 'show':
+        for job in work_queue.list_jobs():
+            print(f"{job['status']:<8} {job['id']:<50} "
+                  f"attempts {job['attempts']}  {job['worker'] or ''}")
+        print(', '.join(f'{status}: {count}' for status, count
+                        in work_queue.counts().items()))
+    elif args.command == 'retry':
+        print(f"[INFO] Retry {work_queue.retry()} failed jobs")
+    else:
+        parser.print_help()
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
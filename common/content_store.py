@@ -0,0 +1,321 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Content-addressed store for the pulled POT/PO files.
+
+Master and recent stable branches often have byte-identical POT and PO
+files. The store keeps a single copy of each payload keyed by its
+sha256 digest, and the project workspaces only hold hard links to it.
+
+It also records which digest has been sent to which Weblate target,
+so that the same payload is not zipped or uploaded twice.
+"""
+
+import argparse
+from contextlib import contextmanager
+import errno
+import fcntl
+import hashlib
+import json
+import os
+from pathlib import Path
+import shutil
+import sys
+import tempfile
+
+
+# The file name of the manifest written in each ingested directory.
+MANIFEST_NAME = '.store-manifest.json'
+# The extensions of the files kept in the store.
+STORE_EXTENSIONS = ('.pot', '.po')
+
+
+def file_digest(path: str) -> str:
+    """Get sha256 digest of the file
+
+    :param path: string path to the file
+    :returns: string hex digest
+    """
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def upload_target(weblate_url: str, project: str, category: str = '',
+                  component: str = '', locale: str = '') -> str:
+    """Get the key of a Weblate target in the upload ledger
+
+    The key starts with the Weblate URL, so the uploads to another
+    Weblate instance are not taken for each other.
+
+    ex) https://weblate.example.org/nova/master/nova/ko_KR
+
+    :param weblate_url: string base URL of Weblate
+    :returns: string target key
+    """
+    parts = [weblate_url.rstrip('/'), project, category, component, locale]
+    return '/'.join(part for part in parts if part)
+
+
+class ContentStore:
+    """Local store of file payloads keyed by digest.
+
+    Layout of the store directory::
+
+        <root>/objects/<digest[:2]>/<digest>   payloads (read-only)
+        <root>/zips/<digest>.zip               zips built from payloads
+        <root>/uploads.json                    digest sent to each target
+
+    Objects are read-only and shared by hard links. Anything that
+    rewrites a linked file must write a new file and rename it over
+    the link, otherwise the stored payload would change too.
+    """
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.objects_dir = self.root / 'objects'
+        self.zips_dir = self.root / 'zips'
+        self.ledger_path = self.root / 'uploads.json'
+        self.lock_path = self.root / 'uploads.lock'
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.zips_dir.mkdir(parents=True, exist_ok=True)
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def zip_path(self, digest: str) -> Path:
+        return self.zips_dir / f'{digest}.zip'
+
+    def has(self, digest: str) -> bool:
+        return self.object_path(digest).exists()
+
+    def put(self, path: str) -> str:
+        """Add the file to the store
+
+        If the same payload is already stored, nothing is copied.
+
+        :param path: string path to the file
+        :returns: string digest of the file
+        """
+        digest = file_digest(path)
+        obj_path = self.object_path(digest)
+        if obj_path.exists():
+            self.touch(digest)
+            return digest
+
+        obj_path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=obj_path.parent)
+        os.close(fd)
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, obj_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return digest
+
+    def touch(self, digest: str) -> None:
+        """Mark the object as used now
+
+        The workspace manager does not remove unlinked objects which
+        were used recently, so a reused object is not removed before
+        it is linked.
+        """
+        try:
+            os.utime(self.object_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def link(self, digest: str, dest: str) -> None:
+        """Replace dest with a reference to the stored object
+
+        A hard link is used when possible. If the workspace is on
+        another file system, the object is copied instead.
+
+        :param digest: string digest of the stored object
+        :param dest: string path to replace
+        """
+        tmp_path = f'{dest}.store-tmp'
+        try:
+            os.link(self.object_path(digest), tmp_path)
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+            shutil.copyfile(self.object_path(digest), tmp_path)
+        os.replace(tmp_path, dest)
+
+    def ingest(self, directory: str) -> dict:
+        """Move POT/PO files of the directory into the store
+
+        Each file is replaced by a reference to the stored object and
+        a manifest(relative path -> digest) is written in the directory.
+
+        :param directory: string path to the workspace directory
+        :returns: A dictionary of the manifest
+        """
+        manifest = {}
+        reused = 0
+        for root, _, files in os.walk(directory):
+            for name in sorted(files):
+                if not name.endswith(STORE_EXTENSIONS):
+                    continue
+                path = os.path.join(root, name)
+                digest = file_digest(path)
+                if self.has(digest):
+                    self.touch(digest)
+                    reused += 1
+                else:
+                    self.put(path)
+                self.link(digest, path)
+                manifest[os.path.relpath(path, directory)] = digest
+
+        with open(os.path.join(directory, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+
+        print(f"[INFO] Stored {len(manifest)} files from {directory}, "
+              f"{reused} identical to existing objects")
+        return manifest
+
+    @contextmanager
+    def _ledger(self):
+        """Lock and load the upload ledger
+
+        The ledger is shared by every migration using this store,
+        so it is read and written under an exclusive file lock.
+
+        :returns: A dictionary of target -> digest.
+            Changes are saved when the context exits.
+        """
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                ledger = {}
+                if self.ledger_path.exists():
+                    with open(self.ledger_path) as f:
+                        ledger = json.load(f)
+                before = dict(ledger)
+                yield ledger
+                if ledger != before:
+                    tmp_path = f'{self.ledger_path}.tmp'
+                    with open(tmp_path, 'w') as f:
+                        json.dump(ledger, f, indent=2, sort_keys=True)
+                    os.replace(tmp_path, self.ledger_path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def is_uploaded(self, target: str, digest: str) -> bool:
+        """Check the digest has been already sent to the target
+
+        :param target: string target key, see upload_target
+        :param digest: string digest of the payload
+        """
+        with self._ledger() as ledger:
+            return ledger.get(target) == digest
+
+    def record_upload(self, target: str, digest: str) -> None:
+        """Record that the digest has been sent to the target
+
+        :param target: string target key, see upload_target
+        :param digest: string digest of the payload
+        """
+        with self._ledger() as ledger:
+            ledger[target] = digest
+
+    def clear_uploads(self, prefix: str) -> int:
+        """Forget the uploads to the targets under the prefix
+
+        :param prefix: string target key, ex) the key of a project
+            version. Its sub targets are cleared as well.
+        :returns: int number of cleared targets
+        """
+        with self._ledger() as ledger:
+            targets = [target for target in ledger
+                       if target == prefix
+                       or target.startswith(prefix + '/')]
+            for target in targets:
+                del ledger[target]
+        return len(targets)
+
+
+def setup_argument_parser():
+    """Setup command line argument parser with subcommands."""
+    parser = argparse.ArgumentParser(
+        description='Content-addressed store for POT/PO files')
+    parser.add_argument(
+        '--store', default=os.getenv('MIGRATION_STORE_DIR'),
+        help='Path to the store directory '
+             '(default: MIGRATION_STORE_DIR environment variable)')
+    subparser = parser.add_subparsers(
+        dest='command', help='Available commands')
+    # Ingest command
+    ingest_parser = subparser.add_parser(
+        'ingest', help='Move files into the store and keep references')
+    ingest_parser.add_argument(
+        'directories', nargs='+', help='Workspace directories to ingest')
+    # Digest command
+    digest_parser = subparser.add_parser(
+        'digest', help='Print the digest of files')
+    digest_parser.add_argument('paths', nargs='+', help='Paths to files')
+    # Clear uploads command
+    clear_parser = subparser.add_parser(
+        'clear-uploads',
+        help='Forget the uploads to a Weblate project version')
+    clear_parser.add_argument(
+        '--weblate-url', default=os.getenv('WEBLATE_URL'),
+        help='Base URL of Weblate '
+             '(default: WEBLATE_URL environment variable)')
+    clear_parser.add_argument(
+        '--project', required=True, help='Name of the project')
+    clear_parser.add_argument(
+        '--version', required=True, help='Name of the version')
+    return parser
+
+
+def main():
+    parser = setup_argument_parser()
+    args = parser.parse_args()
+
+    if args.command == 'digest':
+        for path in args.paths:
+            print(f'{file_digest(path)}  {path}')
+        return
+
+    if args.command not in ('ingest', 'clear-uploads'):
+        parser.print_help()
+        sys.exit(1)
+
+    if not args.store:
+        print("[ERROR] Store directory is not set")
+        sys.exit(1)
+
+    store = ContentStore(args.store)
+    if args.command == 'clear-uploads':
+        if not args.weblate_url:
+            print("[ERROR] Weblate URL is not set")
+            sys.exit(1)
+        count = store.clear_uploads(upload_target(
+            args.weblate_url, args.project, args.version))
+        print(f"[INFO] Cleared {count} uploads of "
+              f"{args.project} ({args.version})")
+        return
+
+    for directory in args.directories:
+        if not os.path.isdir(directory):
+            print(f"[ERROR] Directory does not exist: {directory}")
+            sys.exit(1)
+        store.ingest(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -56,7 +56,7 @@ function get_project_package_name {
 
 function get_pot_path {
     local component=$1
-    local base_dir=${2:-$HOME/$WORKSPACE_NAME/projects/$PROJECT/pot}
+    local base_dir=${2:-$PROJECT_WORK_DIR/pot}
     local module_name=""
     local project_package_name=$(get_project_package_name $PROJECT)
     
@@ -91,6 +91,26 @@ function get_pot_path {
     esac
 }
 
+# Get the pot path of the component.
+# The manifest written by discover_components is used if it is
+# for the current version. Otherwise, it falls back to get_pot_path.
+function get_component_pot_path {
+    local component=$1
+    local pot_path=""
+
+    if [ -f "$COMPONENT_MANIFEST" ]; then
+        pot_path=$(jq -r --arg version "$ZANATA_VERSION" --arg component "$component" \
+            'select(.version == $version) | .components[]
+             | select(.name == $component) | .pot_path' \
+            $COMPONENT_MANIFEST)
+    fi
+
+    if [ -z "$pot_path" ]; then
+        pot_path=$(get_pot_path $component)
+    fi
+    echo "$pot_path"
+}
+
 function get_po_path {
     local component=$1
     local locale=$2
@@ -248,4 +268,40 @@ function get_translation_path_list() {
     fi
 
     echo "${locale_list[@]}"
-}
\ No newline at end of file
+}
+
+TRANSLATION_INDEX=$PROJECT_WORK_DIR/translation_index.json
+COMPONENT_MANIFEST=$PROJECT_WORK_DIR/manifest.json
+
+# Walk the translations directory once and save the index of
+# component -> locale -> zanata path and weblate path.
+function build_translation_index {
+    run_python $SCRIPTSDIR/common/translation_index.py build \
+        --project $PROJECT \
+        --translations-dir $PROJECT_WORK_DIR/translations \
+        --output $TRANSLATION_INDEX \
+        "${COMPONENTS[@]}"
+}
+
+# Print the translations of the component from the index.
+# Each line is tab separated: locale, zanata path, weblate path.
+# The weblate path is relative to <project>/<category>/
+# of the zip downloaded from Weblate.
+function list_translations {
+    local component=$1
+
+    jq -r --arg component "$component" \
+        '.components[$component] // {} | to_entries[]
+         | [.key, .value.zanata_path, .value.weblate_path] | @tsv' \
+        $TRANSLATION_INDEX
+}
+
+# Print the translations of all components from the index,
+# the biggest po file first.
+# Each line is tab separated: component, locale, zanata path.
+function list_upload_tasks {
+    jq -r '.components | to_entries[] | .key as $component
+           | .value | to_entries[]
+           | [.value.size, $component, .key, .value.zanata_path] | @tsv' \
+        $TRANSLATION_INDEX | sort -t $'\t' -k 1,1nr | cut -f 2-
+}
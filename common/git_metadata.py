@@ -0,0 +1,287 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Read the metadata files of every branch straight from git objects.
+
+The component discovery only reads setup.cfg and checks that the
+releasenotes and doc conf.py files exist. Instead of checking out each
+branch, the files of all branches are read with two git cat-file calls:
+one resolving the branches and one reading the blobs.
+
+The mirrors are blobless partial clones, and git fetches a missing blob
+one request at a time. prefetch fetches the metadata files of all
+branches in one request after the mirror is updated, so that reading
+them later needs no network.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+# Files read by the component discovery and setup_manuals.
+METADATA_PATHS = (
+    'setup.cfg',
+    'releasenotes/source/conf.py',
+    'doc/source/conf.py',
+    'doc-tools-check-languages.conf',
+)
+
+
+def _cat_file(repo: str, option: str, objects: list) -> bytes:
+    """Run git cat-file in batch mode for the objects
+
+    :param repo: string path to the git repository
+    :param option: --batch or --batch-check
+    :param objects: list of object names, e.g. <ref>:<path>
+    :returns: bytes output of git cat-file
+    """
+    result = subprocess.run(
+        ['git', '-C', repo, 'cat-file', option],
+        input=''.join(f'{obj}\n' for obj in objects).encode(),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"git cat-file failed in {repo}: "
+            f"{result.stderr.decode(errors='replace').strip()}")
+    return result.stdout
+
+
+def _parse_batch(output: bytes, count: int,
+                 object_type: bytes = b'blob') -> list:
+    """Parse the output of git cat-file --batch
+
+    :returns: list of bytes content, or None for missing objects
+        and objects of another type
+    """
+    contents = []
+    pos = 0
+    for _ in range(count):
+        end = output.index(b'\n', pos)
+        header = output[pos:end].split()
+        pos = end + 1
+        if header[-1] in (b'missing', b'ambiguous'):
+            contents.append(None)
+            continue
+        size = int(header[2])
+        # A path can be a directory, only blobs are files.
+        contents.append(output[pos:pos + size]
+                        if header[1] == object_type else None)
+        pos += size + 1
+    return contents
+
+
+def _git(repo: str, *args) -> str:
+    result = subprocess.run(
+        ['git', '-C', repo] + list(args),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"git {args[0]} failed in {repo}: "
+            f"{result.stderr.decode(errors='replace').strip()}")
+    return result.stdout.decode()
+
+
+def _parse_tree(content: bytes) -> dict:
+    """Parse a raw tree object into a dictionary of name -> oid"""
+    entries = {}
+    pos = 0
+    while pos < len(content):
+        end = content.index(b'\0', pos)
+        name = content[pos:end].split(b' ', 1)[1].decode(errors='replace')
+        entries[name] = content[end + 1:end + 21].hex()
+        pos = end + 21
+    return entries
+
+
+def list_blobs(repo: str, commits: list, paths: tuple) -> set:
+    """Get the object ids of the files without reading the blobs
+
+    Only the trees of the parent directories are read. Trees are kept
+    in blobless clones, so it does not fetch anything.
+
+    :returns: set of blob object ids
+    """
+    objects = []
+    names = []
+    for commit in commits:
+        for path in paths:
+            directory, name = os.path.split(path)
+            objects.append(f'{commit}:{directory}' if directory
+                           else f'{commit}^{{tree}}')
+            names.append(name)
+    trees = _parse_batch(
+        _cat_file(repo, '--batch', objects), len(objects), b'tree')
+
+    oids = set()
+    for tree, name in zip(trees, names):
+        oid = _parse_tree(tree).get(name) if tree is not None else None
+        if oid:
+            oids.add(oid)
+    return oids
+
+
+def is_partial_clone(repo: str) -> bool:
+    result = subprocess.run(
+        ['git', '-C', repo, 'config', '--get', 'remote.origin.promisor'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=False)
+    return result.stdout.strip() == b'true'
+
+
+def prefetch(repo: str, branches: list = None,
+             paths: tuple = METADATA_PATHS) -> int:
+    """Fetch the files of the branches in one request
+
+    It does nothing if the repository is not a partial clone.
+
+    :param repo: string path to the git repository
+    :param branches: list of branch names, all branches by default
+    :param paths: paths of the files relative to the repository root
+    :returns: number of fetched blobs
+    """
+    if not is_partial_clone(repo):
+        return 0
+    if branches is None:
+        branches = _git(repo, 'for-each-ref', '--format=%(refname:short)',
+                        'refs/heads').split()
+    commits = [c for c in resolve_refs(repo, branches).values() if c]
+    oids = sorted(list_blobs(repo, commits, paths))
+    if oids:
+        # Same options as git uses for fetching missing objects.
+        _git(repo, '-c', 'fetch.negotiationAlgorithm=noop', 'fetch',
+             '--quiet', '--no-tags', '--no-write-fetch-head',
+             '--recurse-submodules=no', '--filter=blob:none',
+             'origin', *oids)
+    return len(oids)
+
+
+def resolve_refs(repo: str, branches: list) -> dict:
+    """Resolve branch names to commits
+
+    The remote-tracking branch is preferred, so that a clone with only
+    master checked out and a mirror with every branch both work.
+
+    :param repo: string path to the git repository
+    :param branches: list of branch names, e.g. master, stable/2025.2
+    :returns: A dictionary of branch -> commit id or None if not found
+    """
+    candidates = []
+    for branch in branches:
+        candidates.extend((f'origin/{branch}^{{commit}}',
+                           f'{branch}^{{commit}}'))
+    lines = _cat_file(repo, '--batch-check', candidates).splitlines()
+
+    refs = {}
+    for i, branch in enumerate(branches):
+        refs[branch] = None
+        for line in lines[i * 2:i * 2 + 2]:
+            fields = line.split()
+            if fields[-1] not in (b'missing', b'ambiguous'):
+                refs[branch] = fields[0].decode()
+                break
+    return refs
+
+
+def read_metadata(repo: str, branches: list,
+                  paths: tuple = METADATA_PATHS) -> dict:
+    """Read the files of every branch from git objects
+
+    :param repo: string path to the git repository
+    :param branches: list of branch names
+    :param paths: paths of the files relative to the repository root
+    :returns: A dictionary of branch -> {path: str content or None}.
+        Branches that are not found are mapped to None.
+    """
+    refs = resolve_refs(repo, branches)
+    objects = [f'{commit}:{path}'
+               for commit in refs.values() if commit
+               for path in paths]
+    contents = iter(_parse_batch(
+        _cat_file(repo, '--batch', objects), len(objects)))
+
+    metadata = {}
+    for branch, commit in refs.items():
+        if not commit:
+            metadata[branch] = None
+            continue
+        metadata[branch] = {}
+        for path in paths:
+            content = next(contents)
+            metadata[branch][path] = (
+                content.decode('utf-8', errors='replace')
+                if content is not None else None)
+    return metadata
+
+
+def setup_argument_parser():
+    """Setup command line argument parser with subcommands."""
+    parser = argparse.ArgumentParser(
+        description='Read metadata files of branches from git objects')
+    subparser = parser.add_subparsers(
+        dest='command', help='Available commands')
+    # Read command
+    read_parser = subparser.add_parser(
+        'read', help='Print the files of the branches as JSON')
+    read_parser.add_argument(
+        '--repo', required=True, help='Path to the git repository')
+    read_parser.add_argument(
+        '--path', action='append', dest='paths',
+        help='Path of a file to read. Can be repeated '
+             '(default: the discovery metadata files)')
+    read_parser.add_argument(
+        'branches', nargs='+', help='Branch names, e.g. master')
+    # Prefetch command
+    prefetch_parser = subparser.add_parser(
+        'prefetch', help='Fetch the files of the branches in one request '
+                         'for a partial clone')
+    prefetch_parser.add_argument(
+        '--repo', required=True, help='Path to the git repository')
+    prefetch_parser.add_argument(
+        'branches', nargs='*', help='Branch names (default: all branches)')
+    # Show command
+    show_parser = subparser.add_parser(
+        'show', help='Print a file of a branch, like git show')
+    show_parser.add_argument(
+        '--repo', required=True, help='Path to the git repository')
+    show_parser.add_argument('branch', help='Branch name')
+    show_parser.add_argument('path', help='Path of the file')
+    return parser
+
+
+def main():
+    parser = setup_argument_parser()
+    args = parser.parse_args()
+
+    if args.command == 'read':
+        metadata = read_metadata(
+            args.repo, args.branches, tuple(args.paths or METADATA_PATHS))
+        print(json.dumps(metadata, indent=2))
+    elif args.command == 'prefetch':
+        count = prefetch(args.repo, args.branches or None)
+        print(f"[INFO] Prefetched {count} metadata files: {args.repo}")
+    elif args.command == 'show':
+        content = read_metadata(
+            args.repo, [args.branch], (args.path,))[args.branch]
+        if content is None or content[args.path] is None:
+            print(f"[ERROR] {args.path} not found in {args.branch}",
+                  file=sys.stderr)
+            sys.exit(1)
+        sys.stdout.write(content[args.path])
+    else:
+        parser.print_help()
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Checkpoint journal of the migration steps.
+
+Every completed step of a migration is recorded in a local SQLite
+database, keyed by project, version, component and locale. When a run
+fails, the next run with MIGRATION_RESUME=true skips the steps already
+completed instead of starting the project from scratch.
+
+Steps:
+
+* clone: the working copy of the version is checked out
+* pull: the pot and po files are pulled from Zanata
+* category: the Weblate category of the version is created
+* component: a component is created
+* translation: a translation of a component is created
+* upload: the po file of a translation is uploaded
+* verify: the translation in Weblate matches the po file
+
+A run without MIGRATION_RESUME clears the steps of its project version
+first, so the steps of an older run are never skipped.
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+
+STEPS = ('clone', 'pull', 'category', 'component', 'translation',
+         'upload', 'verify')
+
+
+class Journal:
+    """Records the completed steps in a SQLite database
+
+    The database is shared by the concurrent runs of a workspace,
+    so it uses the write-ahead log and waits for the locks.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=60,
+                                   isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS steps ('
+                ' project TEXT NOT NULL,'
+                ' version TEXT NOT NULL,'
+                ' component TEXT NOT NULL,'
+                ' locale TEXT NOT NULL,'
+                ' step TEXT NOT NULL,'
+                ' completed REAL NOT NULL,'
+                ' PRIMARY KEY (project, version, component, locale, step))')
+            self._conn = conn
+        return self._conn
+
+    def record(self, project: str, version: str, step: str,
+               component: str = '', locale: str = '') -> None:
+        """Record that the step is completed"""
+        if step not in STEPS:
+            raise ValueError(f"Unknown step: {step}")
+        self.conn.execute(
+            'INSERT OR REPLACE INTO steps VALUES (?, ?, ?, ?, ?, ?)',
+            (project, version, component, locale, step, time.time()))
+
+    def is_done(self, project: str, version: str, step: str,
+                component: str = '', locale: str = '') -> bool:
+        row = self.conn.execute(
+            'SELECT 1 FROM steps WHERE project = ? AND version = ?'
+            ' AND component = ? AND locale = ? AND step = ?',
+            (project, version, component, locale, step)).fetchone()
+        return row is not None
+
+    def list_done(self, project: str, version: str, step: str) -> list:
+        """Get the completed (component, locale) of the step"""
+        return self.conn.execute(
+            'SELECT component, locale FROM steps'
+            ' WHERE project = ? AND version = ? AND step = ?'
+            ' ORDER BY component, locale',
+            (project, version, step)).fetchall()
+
+    def reset(self, project: str, version: str) -> int:
+        """Clear the steps of the project version
+
+        :returns: int number of cleared steps
+        """
+        return self.conn.execute(
+            'DELETE FROM steps WHERE project = ? AND version = ?',
+            (project, version)).rowcount
+
+    def summary(self, project: str = None) -> list:
+        """Count the completed steps of each project version
+
+        :returns: list of (project, version, step, count, last completed)
+        """
+        query = ('SELECT project, version, step, COUNT(*), MAX(completed)'
+                 ' FROM steps')
+        params = ()
+        if project:
+            query += ' WHERE project = ?'
+            params = (project,)
+        query += ' GROUP BY project, version, step'
+        return self.conn.execute(query, params).fetchall()
+
+
+def get_journal() -> Journal:
+    """Create the journal from the MIGRATION_JOURNAL environment variable
+
+    :returns: Journal, or None if MIGRATION_JOURNAL is not set
+    """
+    path = os.getenv('MIGRATION_JOURNAL')
+    return Journal(path) if path else None
+
+
+def is_resume() -> bool:
+    return os.getenv('MIGRATION_RESUME') == 'true'
+
+
+def setup_argument_parser():
+    """Setup command line argument parser with subcommands."""
+    parser = argparse.ArgumentParser(
+        description='Checkpoint journal of the migration steps')
+    parser.add_argument(
+        '--journal', default=os.getenv('MIGRATION_JOURNAL'),
+        help='Path to the journal database '
+             '(default: MIGRATION_JOURNAL environment variable)')
+    subparser = parser.add_subparsers(
+        dest='command', help='Available commands')
+
+    def add_step_parser(name, help):
+        step_parser = subparser.add_parser(name, help=help)
+        step_parser.add_argument(
+            '--project', required=True, help='Name of the project')
+        step_parser.add_argument(
+            '--version', required=True, help='Name of the version')
+        step_parser.add_argument(
+            '--step', required=True, choices=STEPS, help='Name of the step')
+        step_parser.add_argument(
+            '--component', default='', help='Name of the component')
+        step_parser.add_argument(
+            '--locale', default='', help='Name of the locale')
+        return step_parser
+
+    # Record command
+    add_step_parser('record', 'Record that a step is completed')
+    # Check command
+    add_step_parser('check', 'Exit with 0 if a step is completed, 1 if not')
+    # List command
+    list_parser = subparser.add_parser(
+        'list', help='Print the completed components and locales of a step')
+    list_parser.add_argument(
+        '--project', required=True, help='Name of the project')
+    list_parser.add_argument(
+        '--version', required=True, help='Name of the version')
+    list_parser.add_argument(
+        '--step', required=True, choices=STEPS, help='Name of the step')
+    # Reset command
+    reset_parser = subparser.add_parser(
+        'reset', help='Clear the steps of a project version')
+    reset_parser.add_argument(
+        '--project', required=True, help='Name of the project')
+    reset_parser.add_argument(
+        '--version', required=True, help='Name of the version')
+    # Show command
+    show_parser = subparser.add_parser(
+        'show', help='Print the completed steps of each project version')
+    show_parser.add_argument('--project', help='Name of the project')
+    return parser
+
+
+def main():
+    parser = setup_argument_parser()
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.print_help()
+        sys.exit(1)
+    if not args.journal:
+        print("[ERROR] The journal is not set, use --journal "
+              "or MIGRATION_JOURNAL")
+        sys.exit(1)
+    journal = Journal(args.journal)
+
+    if args.command == 'record':
+        journal.record(args.project, args.version, args.step,
+                       args.component, args.locale)
+    elif args.command == 'check':
+        sys.exit(0 if journal.is_done(
+            args.project, args.version, args.step,
+            args.component, args.locale) else 1)
+    elif args.command == 'list':
+        for component, locale in journal.list_done(
+                args.project, args.version, args.step):
+            print(f'{component}\t{locale}')
+    elif args.command == 'reset':
+        count = journal.reset(args.project, args.version)
+        print(f"[INFO] Cleared {count} steps of "
+              f"{args.project} ({args.version})")
+    elif args.command == 'show':
+        for project, version, step, count, completed in journal.summary(
+                args.project):
+            last = time.strftime('%Y-%m-%d %H:%M', time.localtime(completed))
+            print(f"{last}  {project:<30} {version:<20} {step:<12} {count}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Latencies of the Weblate requests.
+
+Every Weblate request of weblate_utils.py is recorded in a local
+SQLite database with its endpoint, duration and uploaded bytes. The
+dry run of batch_migration/scheduler.py fits a latency of each
+endpoint from the recorded requests to predict the duration of a
+batch before it runs.
+
+The endpoint of a request is its API path without the names, e.g.
+``POST translations/file`` for the upload of a po file.
+"""
+
+import argparse
+from collections import defaultdict
+import os
+import sqlite3
+import sys
+import time
+from urllib.parse import urlparse
+
+
+# Path segments naming a resource, not a project or component
+RESOURCES = ('categories', 'components', 'file', 'translations')
+
+
+def get_endpoint(url: str) -> str:
+    """Get the endpoint of a Weblate API URL
+
+    ex) .../api/translations/nova/master%252Fdjango/ko_KR/file/
+        -> translations/file
+
+    :param url: string URL of the request
+    :returns: string endpoint
+    """
+    path = urlparse(url).path.split('/api/', 1)[-1]
+    segments = [segment for segment in path.split('/') if segment]
+    if not segments:
+        return ''
+    if len(segments) > 1 and segments[-1] in RESOURCES:
+        return f'{segments[0]}/{segments[-1]}'
+    return segments[0]
+
+
+class LatencyLog:
+    """Records the Weblate requests in a SQLite database
+
+    The database is shared by the concurrent processes of a workspace,
+    so it uses the write-ahead log and waits for the locks.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=60,
+                                   isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS requests ('
+                ' method TEXT NOT NULL,'
+                ' endpoint TEXT NOT NULL,'
+                ' seconds REAL NOT NULL,'
+                ' bytes INTEGER NOT NULL,'
+                ' recorded REAL NOT NULL)')
+            self._conn = conn
+        return self._conn
+
+    def record(self, method: str, endpoint: str, seconds: float,
+               size: int = 0) -> None:
+        """Record a request
+
+        :param method: string HTTP method
+        :param endpoint: string endpoint of the request
+        :param seconds: float duration of the request
+        :param size: int uploaded bytes
+        """
+        self.conn.execute(
+            'INSERT INTO requests VALUES (?, ?, ?, ?, ?)',
+            (method, endpoint, seconds, size, time.time()))
+
+    def fit(self) -> dict:
+        """Fit the latency of each endpoint from the recorded requests
+
+        The duration of a request is modeled as a base latency plus
+        a time per uploaded byte, fitted with least squares.
+
+        :returns: dictionary of "<method> <endpoint>" ->
+            tuple of (float base seconds, float seconds per byte,
+            int number of requests)
+        """
+        samples = defaultdict(list)
+        for method, endpoint, seconds, size in self.conn.execute(
+                'SELECT method, endpoint, seconds, bytes FROM requests'):
+            samples[f'{method} {endpoint}'].append((seconds, size))
+
+        model = {}
+        for key, requests in samples.items():
+            count = len(requests)
+            mean_seconds = sum(s for s, _ in requests) / count
+            mean_size = sum(b for _, b in requests) / count
+            variance = sum((b - mean_size) ** 2 for _, b in requests)
+            per_byte = 0.0
+            if variance:
+                per_byte = max(0.0, sum(
+                    (b - mean_size) * (s - mean_seconds)
+                    for s, b in requests) / variance)
+            base = max(0.0, mean_seconds - per_byte * mean_size)
+            model[key] = (base, per_byte, count)
+        return model
+
+
+def get_latency_log() -> LatencyLog:
+    """Create the latency log from the MIGRATION_LATENCY variable
+
+    :returns: LatencyLog, or None if MIGRATION_LATENCY is not set
+    """
+    path = os.getenv('MIGRATION_LATENCY')
+    return LatencyLog(path) if path else None
+
+
+def setup_argument_parser():
+    """Setup command line argument parser with subcommands."""
+    parser = argparse.ArgumentParser(
+        description='Latencies of the Weblate requests')
+    parser.add_argument(
+        '--latency', default=os.getenv('MIGRATION_LATENCY'),
+        help='Path to the latency database '
+             '(default: MIGRATION_LATENCY environment variable)')
+    subparser = parser.add_subparsers(
+        dest='command', help='Available commands')
+    # Show command
+    subparser.add_parser(
+        'show', help='Print the fitted latency of each endpoint')
+    return parser
+
+
+def main():
+    parser = setup_argument_parser()
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.print_help()
+        sys.exit(1)
+    if not args.latency:
+        print("[ERROR] The latency database is not set, use --latency "
+              "or MIGRATION_LATENCY")
+        sys.exit(1)
+
+    if args.command == 'show':
+        model = LatencyLog(args.latency).fit()
+        for key, (base, per_byte, count) in sorted(model.items()):
+            rate = f'{1 / per_byte / 1024:10.0f} KiB/s' if per_byte else ''
+            print(f"{key:<28} {base:8.3f}s {rate:>16}  requests {count}")
+
+
+if __name__ == '__main__':
+    main()
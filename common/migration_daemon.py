@@ -0,0 +1,491 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Warm worker daemon of the Python scripts.
+
+The shell scripts call weblate_utils.py and journal.py once per
+component and locale, and every call starts an interpreter and
+imports requests and polib again. The daemon imports these scripts,
+lang_plural_check.py and translation_index.py once and listens on a Unix socket
+(MIGRATION_DAEMON_SOCKET). The ``run`` command sends the script, its
+arguments, the working directory, the environment and the standard
+streams of the caller to the daemon, which forks a child running the
+``main()`` of the loaded script, and exits with the exit code of the
+child. The output goes directly to the streams of the caller, so the
+shell scripts see no difference.
+
+Each command runs in its own child, so the commands of concurrent
+jobs do not share the environment, the logging or the connections of
+the Weblate session. When the daemon is not running, or does not
+serve the script, ``run`` executes the script with a new interpreter.
+
+The daemon exits when no command came for ``--idle-timeout`` seconds.
+"""
+
+import argparse
+import atexit
+import fcntl
+import importlib
+import json
+import os
+import selectors
+import signal
+import socket
+import subprocess
+import sys
+import time
+import traceback
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Scripts kept loaded by the daemon, relative to the repository.
+# They are the scripts the shell calls for every step, component or
+# locale through run_python of setup_env/setup.sh. The scripts called
+# once per run are not worth a daemon.
+SCRIPTS = (
+    'common/weblate_utils.py',
+    'common/journal.py',
+    'common/translation_index.py',
+    'prepare_weblate_components/lang_plural_check.py',
+)
+IDLE_TIMEOUT = 900
+# Seconds the start command waits for the daemon to listen
+START_TIMEOUT = 30
+# Maximum size of the first message of a request
+MESSAGE_SIZE = 65536
+
+
+def send_message(sock: socket.socket, message: dict,
+                 fds: list = None) -> None:
+    """Send a JSON line, optionally with file descriptors"""
+    data = json.dumps(message).encode('utf-8') + b'\n'
+    if fds:
+        socket.send_fds(sock, [data], fds)
+    else:
+        sock.sendall(data)
+
+
+def receive_message(sock: socket.socket, data: bytes = b'') -> dict:
+    """Receive a JSON line
+
+    :param data: bytes already received of the line
+    :returns: dictionary of the message, or None if the socket was
+        closed before the end of the line
+    """
+    while not data.endswith(b'\n'):
+        chunk = sock.recv(MESSAGE_SIZE)
+        if not chunk:
+            return None
+        data += chunk
+    return json.loads(data)
+
+
+def get_exit_code(code) -> int:
+    """Get the exit code of a SystemExit code like the interpreter"""
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+class MigrationDaemon:
+    """Runs the loaded scripts in forked children"""
+    def __init__(self, socket_path: str, idle_timeout: float = IDLE_TIMEOUT):
+        """
+        :param socket_path: string path to the Unix socket
+        :param idle_timeout: float seconds without commands before
+            the daemon exits
+        """
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        # Real path of each loaded script -> (module, mtime)
+        self.scripts = {}
+        # pid -> (pidfd, connection) of the running commands
+        self.children = {}
+        # Connections of the callers which went away
+        self.interrupted = set()
+        self.selector = None
+        self.listener = None
+        self.stopping = False
+
+    def load_scripts(self) -> None:
+        """Import the scripts
+
+        A script which fails to import is not served, so its commands
+        run with a new interpreter and report the error themselves.
+        """
+        for script in SCRIPTS:
+            path = os.path.realpath(os.path.join(REPO_DIR, script))
+            directory, name = os.path.split(path)
+            if directory not in sys.path:
+                sys.path.insert(0, directory)
+            try:
+                module = importlib.import_module(name[:-len('.py')])
+            except Exception as e:
+                print(f"[ERROR] Failed to load {script}: {e}")
+                continue
+            self.scripts[path] = (module, os.stat(path).st_mtime)
+            print(f"[INFO] Loaded {script}")
+
+    def get_module(self, path: str):
+        """Get the loaded module of a script
+
+        :param path: string real path to the script
+        :returns: module, or None if the script is not loaded or was
+            changed since it was loaded
+        """
+        if path not in self.scripts:
+            return None
+        module, mtime = self.scripts[path]
+        try:
+            if os.stat(path).st_mtime != mtime:
+                return None
+        except OSError:
+            return None
+        return module
+
+    def serve(self) -> None:
+        """Serve the commands until the idle timeout or a stop command
+
+        Only one daemon serves a socket. A second daemon exits at once.
+        """
+        lock_fd = os.open(self.socket_path + '.lock',
+                          os.O_WRONLY | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            print(f"[INFO] A daemon already serves {self.socket_path}")
+            os.close(lock_fd)
+            return
+
+        self.load_scripts()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        self.listener.listen(64)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        print(f"[INFO] Listening on {self.socket_path}")
+
+        try:
+            last_activity = time.monotonic()
+            while not (self.stopping and not self.children):
+                timeout = None
+                if not self.children:
+                    timeout = last_activity + self.idle_timeout \
+                        - time.monotonic()
+                    if timeout <= 0:
+                        print("[INFO] Exit after the idle timeout")
+                        break
+                for key, _ in self.selector.select(timeout):
+                    if key.fileobj is self.listener:
+                        self._accept()
+                    else:
+                        key.data(key.fileobj)
+                last_activity = time.monotonic()
+        finally:
+            for pid in list(self.children):
+                os.kill(pid, signal.SIGTERM)
+            os.unlink(self.socket_path)
+            self.listener.close()
+            os.close(lock_fd)
+
+    def _accept(self) -> None:
+        conn, _ = self.listener.accept()
+        try:
+            conn.settimeout(10)
+            data, fds, _, _ = socket.recv_fds(conn, MESSAGE_SIZE, 3)
+            request = receive_message(conn, data)
+            conn.settimeout(None)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Failed to receive a request: {e}")
+            conn.close()
+            return
+
+        try:
+            command = request and request.get('command')
+            if command == 'ping':
+                send_message(conn, {'pid': os.getpid()})
+            elif command == 'stop':
+                print("[INFO] Stop after the running commands")
+                self.stopping = True
+                self.selector.unregister(self.listener)
+                send_message(conn, {'stopping': True})
+            elif command == 'run':
+                module = self.get_module(request['script'])
+                if module and len(fds) == 3:
+                    # The connection is closed when the child finished
+                    self._start(conn, module, request, fds)
+                    return
+                send_message(conn, {'fallback': True})
+        except OSError as e:
+            print(f"[ERROR] Failed to handle a request: {e}")
+        finally:
+            for fd in fds:
+                os.close(fd)
+        conn.close()
+
+    def _start(self, conn: socket.socket, module, request: dict,
+               fds: list) -> None:
+        """Fork a child running the script of the request"""
+        pid = os.fork()
+        if pid == 0:
+            self._run_child(conn, module, request, fds)
+        pidfd = os.pidfd_open(pid)
+        self.children[pid] = (pidfd, conn)
+        self.selector.register(
+            pidfd, selectors.EVENT_READ,
+            lambda _: self._finish(pid))
+        # The caller closes the connection when it is interrupted
+        self.selector.register(
+            conn, selectors.EVENT_READ,
+            lambda _: self._interrupt(pid))
+
+    def _run_child(self, conn: socket.socket, module, request: dict,
+                   fds: list) -> None:
+        """Run the script in the forked child and exit with its code"""
+        code = 1
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            self.selector.close()
+            self.listener.close()
+            conn.close()
+            for pidfd, other_conn in self.children.values():
+                os.close(pidfd)
+                other_conn.close()
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+            os.chdir(request['cwd'])
+            os.environ.clear()
+            os.environ.update(request['env'])
+            sys.argv = [request['script']] + request['argv']
+            # Like python3 -u, the output is not kept in buffers
+            for stream in (sys.stdout, sys.stderr):
+                stream.reconfigure(line_buffering=True, write_through=True)
+            code = 0
+            module.main()
+        except SystemExit as e:
+            code = get_exit_code(e.code)
+        except KeyboardInterrupt:
+            code = 128 + signal.SIGINT
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            try:
+                # The atexit functions of the script, e.g. the logging
+                atexit._run_exitfuncs()
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+    def _finish(self, pid: int) -> None:
+        """Send the exit code of a finished child to its caller"""
+        pidfd, conn = self.children.pop(pid)
+        self.selector.unregister(pidfd)
+        if conn in self.interrupted:
+            self.interrupted.remove(conn)
+        else:
+            self.selector.unregister(conn)
+        os.close(pidfd)
+        _, status = os.waitpid(pid, 0)
+        code = os.waitstatus_to_exitcode(status)
+        if code < 0:
+            # Killed by a signal, reported like the shell does
+            code = 128 - code
+        try:
+            send_message(conn, {'returncode': code})
+        except OSError:
+            pass
+        conn.close()
+
+    def _interrupt(self, pid: int) -> None:
+        """Terminate the child of a caller which went away"""
+        _, conn = self.children[pid]
+        self.selector.unregister(conn)
+        self.interrupted.add(conn)
+        os.kill(pid, signal.SIGTERM)
+
+
+def connect(socket_path: str) -> socket.socket:
+    """Connect to the daemon
+
+    :raises: OSError if the daemon does not listen on the socket
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def request(socket_path: str, message: dict) -> dict:
+    """Send a command without streams to the daemon
+
+    :returns: dictionary of the reply, or None if the daemon does
+        not listen on the socket
+    """
+    try:
+        with connect(socket_path) as sock:
+            send_message(sock, message)
+            return receive_message(sock)
+    except OSError:
+        return None
+
+
+def run_script(socket_path: str, script: str, argv: list) -> int:
+    """Run a script by the daemon with the streams of this process
+
+    :param socket_path: string path to the Unix socket
+    :param script: string path to the script
+    :param argv: list of the arguments of the script
+    :returns: int exit code of the script, or None if the daemon did
+        not run it
+    """
+    message = {
+        'command': 'run',
+        'script': os.path.realpath(script),
+        'argv': argv,
+        'cwd': os.getcwd(),
+        'env': dict(os.environ),
+    }
+    try:
+        sock = connect(socket_path)
+    except OSError:
+        return None
+    with sock:
+        try:
+            send_message(sock, message, [0, 1, 2])
+        except OSError:
+            return None
+        try:
+            reply = receive_message(sock)
+        except KeyboardInterrupt:
+            # Closing the connection terminates the script
+            return 128 + signal.SIGINT
+    if reply is None:
+        print(f"[ERROR] The daemon stopped while running {script}",
+              file=sys.stderr)
+        return 1
+    if reply.get('fallback'):
+        return None
+    return reply['returncode']
+
+
+def start_daemon(socket_path: str, idle_timeout: float) -> bool:
+    """Start the daemon in the background if it is not running
+
+    The daemon does not keep the streams of the caller, so a pipe of
+    the caller (e.g. the log files) is not held open by the daemon.
+    Its output goes to "<socket>.log".
+
+    :returns: True if the daemon listens on the socket
+    """
+    if request(socket_path, {'command': 'ping'}):
+        return True
+    with open(socket_path + '.log', 'a') as log_file:
+        subprocess.Popen(
+            [sys.executable, '-u', os.path.abspath(__file__),
+             '--socket', socket_path, 'serve',
+             '--idle-timeout', str(idle_timeout)],
+            stdin=subprocess.DEVNULL, stdout=log_file, stderr=log_file,
+            start_new_session=True)
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if request(socket_path, {'command': 'ping'}):
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def setup_argument_parser():
+    """Setup command line argument parser with subcommands."""
+    parser = argparse.ArgumentParser(
+        description='Warm worker daemon of the Python scripts')
+    parser.add_argument(
+        '--socket', default=os.getenv('MIGRATION_DAEMON_SOCKET'),
+        help='Path to the Unix socket '
+             '(default: MIGRATION_DAEMON_SOCKET environment variable)')
+    subparser = parser.add_subparsers(
+        dest='command', help='Available commands')
+
+    # Serve command
+    serve_parser = subparser.add_parser(
+        'serve', help='Serve the commands in the foreground')
+    serve_parser.add_argument(
+        '--idle-timeout', type=float, default=IDLE_TIMEOUT,
+        help='Seconds without commands before the daemon exits '
+             f'(default: {IDLE_TIMEOUT})')
+    # Start command
+    start_parser = subparser.add_parser(
+        'start', help='Start the daemon in the background')
+    start_parser.add_argument(
+        '--idle-timeout', type=float, default=IDLE_TIMEOUT,
+        help='Seconds without commands before the daemon exits '
+             f'(default: {IDLE_TIMEOUT})')
+    # Stop command
+    subparser.add_parser(
+        'stop', help='Stop the daemon after the running commands')
+    # Run command
+    run_parser = subparser.add_parser(
+        'run', help='Run a script by the daemon, '
+                    'or with a new interpreter')
+    run_parser.add_argument('script', help='Path to the script')
+    run_parser.add_argument(
+        'argv', nargs=argparse.REMAINDER, help='Arguments of the script')
+    return parser
+
+
+def main():
+    parser = setup_argument_parser()
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        code = None
+        if args.socket:
+            code = run_script(args.socket, args.script, args.argv)
+        if code is None:
+            os.execv(sys.executable,
+                     [sys.executable, '-u', args.script] + args.argv)
+        sys.exit(code)
+
+    if not args.command:
+        parser.print_help()
+        sys.exit(1)
+    if not args.socket:
+        print("[ERROR] The socket is not set, use --socket "
+              "or MIGRATION_DAEMON_SOCKET")
+        sys.exit(1)
+
+    if args.command == 'serve':
+        MigrationDaemon(args.socket, args.idle_timeout).serve()
+    elif args.command == 'start':
+        if not start_daemon(args.socket, args.idle_timeout):
+            print(f"[ERROR] The daemon did not start, see {args.socket}.log")
+            sys.exit(1)
+        print(f"[INFO] The daemon listens on {args.socket}")
+    elif args.command == 'stop':
+        if request(args.socket, {'command': 'stop'}) is None:
+            print("[INFO] The daemon is not running")
+
+
+if __name__ == '__main__':
+    main()
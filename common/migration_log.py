@@ -0,0 +1,291 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Logging of the migration scripts.
+
+The Python scripts log with the standard logging module. The records
+are printed to stdout as "[LEVEL] message", the format the shell
+scripts and the log files already use, and carry the project, version,
+component and locale of the run as context fields. With
+MIGRATION_LOG_JSON set, the records are also appended to that file as
+JSON lines with their context, for searching the logs of a batch.
+
+The log files are written by a background thread from a queue, and
+the lines are buffered and appended with one write per batch, so the
+process producing the output never waits for the disk. The ``tee``
+command writes the output of a migration to the project.*.log and
+error.*.log files this way, instead of a shell loop starting
+processes for every line.
+"""
+
+import argparse
+import atexit
+import json
+import logging
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+import os
+import queue
+import re
+import sys
+import time
+
+
+LOG_FORMAT = '[%(levelname)s] %(message)s'
+CONTEXT_FIELDS = ('project', 'version', 'component', 'locale')
+# Seconds the buffered lines wait before they are written
+FLUSH_INTERVAL = 1.0
+# The level of an output line, optionally prefixed with "<version> | "
+LINE_LEVEL_PATTERN = re.compile(
+    r'^(?:[^|\[]*\| )?\[(DEBUG|INFO|WARNING|ERROR|CRITICAL)\]')
+
+
+class ContextFilter(logging.Filter):
+    """Adds the context fields to the records
+
+    The fields given to a log call with ``extra`` are kept.
+    """
+    def __init__(self, context: dict):
+        super().__init__()
+        self.context = context
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for field in CONTEXT_FIELDS:
+            if not getattr(record, field, None):
+                setattr(record, field, self.context.get(field) or '')
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as a JSON line with its context fields"""
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S'),
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, '')
+            if value:
+                data[field] = value
+        data['message'] = record.getMessage()
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class BufferedFileHandler(logging.Handler):
+    """Appends the formatted records to a file in batches
+
+    The records are written when the buffer is full, when an error
+    is logged, when FLUSH_INTERVAL passed since the last write, and
+    on close. Each batch is one append, so the processes sharing the
+    file do not mix their lines. The file is created by the first
+    write, so an error log without errors is not created.
+    """
+    def __init__(self, path: str, flush_interval: float = FLUSH_INTERVAL,
+                 capacity: int = 1000):
+        super().__init__()
+        self.path = path
+        self.flush_interval = flush_interval
+        self.capacity = capacity
+        self._buffer = []
+        self._fd = None
+        self._last_flush = time.monotonic()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._buffer.append(self.format(record) + '\n')
+        except Exception:
+            self.handleError(record)
+            return
+        if (len(self._buffer) >= self.capacity
+                or record.levelno >= logging.ERROR
+                or time.monotonic() - self._last_flush
+                >= self.flush_interval):
+            self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            self._last_flush = time.monotonic()
+            if not self._buffer:
+                return
+            data = ''.join(self._buffer).encode('utf-8', 'replace')
+            self._buffer = []
+            if self._fd is None:
+                self._fd = os.open(
+                    self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            os.write(self._fd, data)
+
+    def close(self) -> None:
+        self.flush()
+        with self.lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+        super().close()
+
+
+class FlushingQueueListener(QueueListener):
+    """Handles the queued records in a thread
+
+    The buffered handlers are flushed when the queue stays empty for
+    FLUSH_INTERVAL, so the last lines of a quiet process are written.
+    """
+    def __init__(self, log_queue, *handlers,
+                 flush_interval: float = FLUSH_INTERVAL):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        while True:
+            try:
+                return self.queue.get(block, timeout=self.flush_interval)
+            except queue.Empty:
+                if not block:
+                    raise
+                for handler in self.handlers:
+                    handler.flush()
+
+
+class LogTee:
+    """Writes the output lines of a command to the log files
+
+    All lines go to the log file and the error lines to the error log
+    file. The files are written by a background thread.
+    """
+    def __init__(self, log_path: str, error_log_path: str = None):
+        """
+        :param log_path: string path to the log file
+        :param error_log_path: string path to the error log file
+        """
+        self.handlers = [BufferedFileHandler(log_path)]
+        if error_log_path:
+            error_handler = BufferedFileHandler(error_log_path)
+            error_handler.setLevel(logging.ERROR)
+            self.handlers.append(error_handler)
+        self._listener = FlushingQueueListener(queue.SimpleQueue(),
+                                               *self.handlers)
+        self._listener.start()
+
+    def write(self, line: str) -> int:
+        """Write an output line to the log files
+
+        :param line: string output line
+        :returns: int log level of the line
+        """
+        level = get_line_level(line)
+        self._listener.queue.put(logging.makeLogRecord({
+            'msg': line.rstrip('\n'),
+            'levelno': level,
+            'levelname': logging.getLevelName(level),
+        }))
+        return level
+
+    def close(self) -> None:
+        """Write the remaining lines and close the log files"""
+        self._listener.stop()
+        for handler in self.handlers:
+            handler.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def get_line_level(line: str) -> int:
+    """Get the level of an output line from its "[LEVEL]" tag
+
+    :returns: int log level, INFO if the line has no tag
+    """
+    match = LINE_LEVEL_PATTERN.match(line)
+    return logging.getLevelName(match.group(1)) if match else logging.INFO
+
+
+def setup_logging(stream=None, **context) -> None:
+    """Set up the logging of a script
+
+    The log level is MIGRATION_LOG_LEVEL (default: INFO).
+
+    :param stream: file of the log lines (default: stdout)
+    :param context: project, version, component and locale of the run
+    """
+    context_filter = ContextFilter(context)
+    console = logging.StreamHandler(stream or sys.stdout)
+    console.setFormatter(logging.Formatter(LOG_FORMAT))
+    console.addFilter(context_filter)
+    handlers = [console]
+
+    json_path = os.getenv('MIGRATION_LOG_JSON')
+    if json_path:
+        json_handler = BufferedFileHandler(json_path)
+        json_handler.setFormatter(JsonFormatter())
+        log_queue = queue.SimpleQueue()
+        listener = FlushingQueueListener(log_queue, json_handler)
+        listener.start()
+        # The context is added before the record is queued, and the
+        # message is formatted by the JSON formatter.
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.setFormatter(logging.Formatter('%(message)s'))
+        queue_handler.addFilter(context_filter)
+        handlers.append(queue_handler)
+
+        def stop_listener():
+            listener.stop()
+            json_handler.close()
+        atexit.register(stop_listener)
+
+    logging.basicConfig(level=os.getenv('MIGRATION_LOG_LEVEL', 'INFO'),
+                        handlers=handlers, force=True)
+
+
+def setup_argument_parser():
+    """Setup command line argument parser with subcommands."""
+    parser = argparse.ArgumentParser(
+        description='Logging of the migration scripts')
+    subparser = parser.add_subparsers(
+        dest='command', help='Available commands')
+
+    # Tee command
+    tee_parser = subparser.add_parser(
+        'tee', help='Copy stdin to stdout and the log files')
+    tee_parser.add_argument(
+        '--log-file', required=True, help='Path to the log file')
+    tee_parser.add_argument(
+        '--error-log', help='Path to the log file of the error lines')
+    tee_parser.add_argument(
+        '--prefix', default='',
+        help='Prefix of each line, e.g. "<version> | "')
+    return parser
+
+
+def main():
+    parser = setup_argument_parser()
+    args = parser.parse_args()
+
+    if args.command == 'tee':
+        stdin = open(sys.stdin.fileno(), errors='replace', closefd=False)
+        with LogTee(args.log_file, args.error_log) as tee:
+            for line in stdin:
+                line = args.prefix + line
+                sys.stdout.write(line)
+                sys.stdout.flush()
+                tee.write(line)
+    else:
+        parser.print_help()
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Strip the content of PO files that Weblate ignores before uploading.
+
+Zanata exports keep the obsolete entries(#~), the previous msgid
+comments(#|) and the source references(#:). Weblate discards the
+obsolete entries and takes the references from the template,
+so they only make the upload bigger and slower to parse.
+The translations, flags and translator comments are kept as they are.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+
+# Comment prefixes removed from the entries.
+# - #| previous msgid of fuzzy entries
+# - #: source references
+STRIP_PREFIXES = ('#|', '#:')
+OBSOLETE_PREFIX = '#~'
+
+
+def _is_obsolete(block):
+    """Check the entry block is an obsolete entry
+
+    Translator comments can be placed before the obsolete entry,
+    so the first line that is not a plain comment is checked.
+    """
+    for line in block:
+        if line.startswith(OBSOLETE_PREFIX):
+            return True
+        if not line.startswith('#'):
+            return False
+    return False
+
+
+def minimize_po_lines(lines):
+    """Strip obsolete entries, previous msgids and references
+
+    Entries are separated by blank lines in the PO files.
+
+    :param lines: iterable of lines including line endings
+    :returns: list of minimized lines
+    """
+    blocks = []
+    block = []
+    for line in lines:
+        if line.strip():
+            block.append(line)
+        elif block:
+            blocks.append(block)
+            block = []
+    if block:
+        blocks.append(block)
+
+    output = []
+    for block in blocks:
+        if _is_obsolete(block):
+            continue
+        if output:
+            output.append('\n')
+        output.extend(
+            line for line in block if not line.startswith(STRIP_PREFIXES))
+
+    # Keep the file ending with a line break.
+    if output and not output[-1].endswith('\n'):
+        output[-1] += '\n'
+    return output
+
+
+def minimize_po_file(po_path: str) -> tuple:
+    """Minimize the PO file and replace it atomically
+
+    The PO file can be a reference to the content store,
+    so the result is written to a new file and renamed over it.
+
+    :param po_path: string path to the PO file
+    :returns: tuple of (bytes before, bytes after)
+    """
+    before = os.path.getsize(po_path)
+    with open(po_path, encoding='utf-8', newline='') as f:
+        lines = minimize_po_lines(f)
+    content = ''.join(lines).encode('utf-8')
+    if len(content) == before:
+        return before, before
+
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(po_path)),
+        prefix='.minimize-', suffix='.po')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, po_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return before, len(content)
+
+
+def collect_po_files(paths):
+    """Expand the given paths into a sorted list of PO files
+
+    :param paths: list of PO file or directory paths
+    :returns: list of PO file paths
+    """
+    po_files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                po_files.update(
+                    os.path.join(root, name)
+                    for name in files if name.endswith('.po'))
+        elif os.path.isfile(path):
+            po_files.add(path)
+        else:
+            print(f"[ERROR] PO file does not exist: {path}")
+    return sorted(po_files)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='Strip the content Weblate ignores from PO files')
+    parser.add_argument(
+        'paths', nargs='+',
+        help='PO files or directories containing PO files.')
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    total_before = 0
+    total_after = 0
+    failed = 0
+    for po_path in collect_po_files(args.paths):
+        try:
+            before, after = minimize_po_file(po_path)
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"[ERROR] Failed to minimize {po_path}: {e}")
+            failed += 1
+            continue
+        total_before += before
+        total_after += after
+        print(f"[INFO] Minimized {po_path}: "
+              f"{before} -> {after} bytes ({before - after} saved)")
+
+    print(f"[INFO] Total: {total_before} -> {total_after} bytes "
+          f"({total_before - total_after} saved)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
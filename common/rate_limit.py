@@ -0,0 +1,84 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Request budget shared by all migration processes.
+
+Every Weblate request of every weblate_utils.py process takes a time
+slot from a state file. The slots are 1/rate seconds apart, so the
+processes of concurrent jobs send at most <rate> requests per second
+in total, whatever the number of jobs.
+
+The state file only holds the start time of the next free slot, and
+it is read and written under an exclusive file lock.
+"""
+
+import fcntl
+import os
+import time
+
+
+class RateLimiter:
+    """Spaces the requests of the processes sharing a state file"""
+    def __init__(self, state_path: str, rate: float):
+        """
+        :param state_path: string path to the shared state file
+        :param rate: float requests per second of all processes
+        """
+        if rate <= 0:
+            raise ValueError(f"Invalid request rate: {rate}")
+        self.state_path = state_path
+        self.interval = 1.0 / rate
+
+    def _reserve(self) -> float:
+        """Take the next free slot
+
+        :returns: float unix time of the reserved slot
+        """
+        with open(self.state_path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    next_slot = float(f.read() or 0)
+                except ValueError:
+                    next_slot = 0.0
+                slot = max(time.time(), next_slot)
+                f.seek(0)
+                f.truncate()
+                f.write(f'{slot + self.interval:.6f}')
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return slot
+
+    def acquire(self) -> None:
+        """Wait until the process may send a request"""
+        delay = self._reserve() - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Create the rate limiter from the environment variables
+
+    WEBLATE_RATE_LIMIT is the number of requests per second of all
+    processes, and WEBLATE_RATE_LIMIT_FILE is the shared state file.
+
+    :returns: RateLimiter, or None if WEBLATE_RATE_LIMIT is not set
+    """
+    rate = os.getenv('WEBLATE_RATE_LIMIT')
+    if not rate:
+        return None
+    state_path = os.getenv(
+        'WEBLATE_RATE_LIMIT_FILE',
+        os.path.join(os.getenv('TMPDIR', '/tmp'), 'weblate_rate_limit'))
+    return RateLimiter(state_path, float(rate))
@@ -0,0 +1,196 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Index of the translation files pulled from Zanata.
+
+The translations directory is walked once and every PO file is mapped
+to its component and locale, together with the path of the same file
+in the zip downloaded from Weblate. The component creation and the
+accuracy test both read the index instead of running find per component.
+
+Index format::
+
+    {
+        "project": "<project>",
+        "translations_dir": "<path>",
+        "components": {
+            "<component>": {
+                "<locale>": {
+                    "zanata_path": "<absolute path of the pulled po>",
+                    "weblate_path": "<path relative to the category
+                                     directory of the Weblate zip>",
+                    "size": <bytes>
+                }
+            }
+        }
+    }
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+
+from weblate_utils import get_filemask
+from weblate_utils import sanitize_locale
+from weblate_utils import sanitize_slug
+
+
+# <module>/locale/<locale>/LC_MESSAGES/<domain>.po
+PO_PATH_RE = re.compile(r'(?:^|/)locale/([^/]+)/LC_MESSAGES/([^/]+)\.po$')
+
+
+def scan_translations(translations_dir: str) -> list:
+    """Walk the translations directory once
+
+    :param translations_dir: string path to the translations directory
+    :returns: list of (relative path, locale, domain) tuples
+    """
+    po_files = []
+    for root, _, files in os.walk(translations_dir):
+        for name in files:
+            if not name.endswith('.po'):
+                continue
+            rel_path = os.path.relpath(
+                os.path.join(root, name), translations_dir)
+            match = PO_PATH_RE.search(rel_path)
+            if match:
+                po_files.append((rel_path, match.group(1), match.group(2)))
+    return sorted(po_files)
+
+
+def get_component_filter(project: str, component: str):
+    """Get the rule to select the po files of the component
+
+    It follows get_translation_path_list in get_translation_path.sh.
+
+    :returns: tuple of (top directory or None for anywhere, domain or
+        None for any domain)
+    """
+    project_package_name = project.replace('-', '_')
+    if component == 'releasenotes':
+        return 'releasenotes', None
+    if component in ('django', 'djangojs'):
+        return project_package_name, component
+    if component.endswith('-django') or component.endswith('-djangojs'):
+        # ex) openstack-auth-django -> openstack_auth/.../django.po
+        module_name, domain = component.rsplit('-', 1)
+        return module_name.replace('-', '_'), domain
+    return None, component
+
+
+def get_weblate_path(component: str, locale: str) -> str:
+    """Get the path of the po file in the zip downloaded from Weblate
+
+    The path is relative to <project>/<category>/ in the zip.
+    """
+    filemask = get_filemask(component)
+    return (f'{sanitize_slug(component)}/'
+            f'{filemask.replace("*", sanitize_locale(locale))}')
+
+
+def build_index(project: str, translations_dir: str,
+                components: list) -> dict:
+    """Build the index of the components
+
+    :param project: string name of the project
+    :param translations_dir: string path to the translations directory
+    :param components: list of component names
+    :returns: A dictionary of the index
+    """
+    translations_dir = os.path.abspath(translations_dir)
+    po_files = scan_translations(translations_dir)
+
+    index = {}
+    for component in components:
+        top_dir, domain = get_component_filter(project, component)
+        locales = {}
+        for rel_path, locale, po_domain in po_files:
+            if top_dir and not rel_path.startswith(f'{top_dir}/'):
+                continue
+            if domain and po_domain != domain:
+                continue
+            zanata_path = os.path.join(translations_dir, rel_path)
+            locales[locale] = {
+                'zanata_path': zanata_path,
+                'weblate_path': get_weblate_path(component, locale),
+                'size': os.path.getsize(zanata_path),
+            }
+        index[component] = dict(sorted(locales.items()))
+
+    return {
+        'project': project,
+        'translations_dir': translations_dir,
+        'components': index,
+    }
+
+
+def setup_argument_parser():
+    """Setup command line argument parser with subcommands."""
+    parser = argparse.ArgumentParser(
+        description='Index of the translation files pulled from Zanata')
+    subparser = parser.add_subparsers(
+        dest='command', help='Available commands')
+    # Build command
+    build_parser = subparser.add_parser(
+        'build', help='Build the index of the translations directory')
+    build_parser.add_argument(
+        '--project', required=True, help='Name of the project')
+    build_parser.add_argument(
+        '--translations-dir', required=True,
+        help='Path to the translations directory')
+    build_parser.add_argument(
+        '--output', required=True, help='Path to the index JSON')
+    build_parser.add_argument(
+        'components', nargs='+', help='Names of the components')
+    # List command
+    list_parser = subparser.add_parser(
+        'list', help='Print the translations as tab separated lines: '
+                     'component, locale, zanata path, weblate path')
+    list_parser.add_argument(
+        '--index', required=True, help='Path to the index JSON')
+    list_parser.add_argument(
+        '--component', help='Name of the component (default: all)')
+    return parser
+
+
+def main():
+    parser = setup_argument_parser()
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        index = build_index(
+            args.project, args.translations_dir, args.components)
+        tmp_path = f'{args.output}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, args.output)
+        total = sum(len(v) for v in index['components'].values())
+        print(f"[INFO] Indexed {total} translations of "
+              f"{len(index['components'])} components: {args.output}")
+    elif args.command == 'list':
+        with open(args.index) as f:
+            index = json.load(f)
+        for component, locales in index['components'].items():
+            if args.component and component != args.component:
+                continue
+            for locale, entry in locales.items():
+                print('\t'.join((component, locale, entry['zanata_path'],
+                                 entry['weblate_path'])))
+    else:
+        parser.print_help()
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Validate PO files locally before uploading them to Weblate.
+
+When Weblate rejects a file, upload_po_file spends all of its retries
+and sleeps before giving up. The files are checked up front for what
+Weblate rejects (encoding and syntax errors, duplicated entries and
+missing headers), and broken files are moved to a quarantine directory
+so that they are not picked up by the upload phase.
+
+Weblate accepts the files with format or plural count mismatches and
+only reports them as failing checks, so they are printed as warnings
+and uploaded.
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import os
+from pathlib import Path
+import re
+import shutil
+import sys
+
+import polib
+
+# The plural rules are normalized to the Zanata rules before uploading,
+# so the plural count is checked against them.
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir,
+    'prepare_weblate_components'))
+from zanata_plural_rules import ZANATA_LANG_RULES  # noqa: E402
+
+
+# python-format: %(name)s, %s, %d, %% etc.
+PYTHON_FORMAT_RE = re.compile(
+    r'%(?:\((?P<name>[^)]*)\))?[#0 +-]*(?:\*|\d+)?(?:\.(?:\*|\d+))?'
+    r'[hlL]?(?P<type>[diouxXeEfFgGcrsa%])')
+# python-brace-format: {name}, {0}, {} etc. {{ and }} are escapes.
+BRACE_FORMAT_RE = re.compile(r'(?<!\{)\{([^{}:!]*)(?:[:!][^{}]*)?\}(?!\})')
+NPLURALS_RE = re.compile(r'nplurals\s*=\s*(\d+)')
+CHARSET_RE = re.compile(r'charset=([\w-]+)')
+
+
+def get_charset(raw: bytes) -> str:
+    """Get charset declared in the header, utf-8 by default"""
+    match = CHARSET_RE.search(raw[:4096].decode('ascii', errors='ignore'))
+    if match and match.group(1).upper() != 'CHARSET':
+        return match.group(1)
+    return 'utf-8'
+
+
+def get_expected_nplurals(po: polib.POFile):
+    """Get nplurals the file will have after normalization
+
+    It follows lang_plural_check.py, which replaces Plural-Forms with
+    the Zanata rule of the language before uploading.
+
+    :returns: int nplurals or None if it is not known
+    """
+    language = po.metadata.get('Language', '')
+    lang_code = language.split('_')[0].lower()
+    if lang_code in ZANATA_LANG_RULES:
+        plural_forms = ZANATA_LANG_RULES[lang_code]['plurals']
+    else:
+        plural_forms = po.metadata.get('Plural-Forms', '')
+    match = NPLURALS_RE.search(plural_forms)
+    return int(match.group(1)) if match else None
+
+
+def python_format_directives(text: str) -> list:
+    """Get sorted list of python-format directives except %%"""
+    return sorted(
+        (m.group('name') or '', m.group('type'))
+        for m in PYTHON_FORMAT_RE.finditer(text)
+        if m.group('type') != '%')
+
+
+def brace_format_fields(text: str) -> set:
+    return set(BRACE_FORMAT_RE.findall(text))
+
+
+def check_format(entry: polib.POEntry) -> list:
+    """Check format flags are consistent between msgid and msgstr
+
+    Singular entries must use the same directives as msgid.
+    Plural forms may omit directives(ex. "one file"),
+    but must not use ones that are not in msgid or msgid_plural.
+
+    :returns: list of error messages
+    """
+    errors = []
+    checks = []
+    if 'python-format' in entry.flags:
+        checks.append(('python-format', python_format_directives))
+    if 'python-brace-format' in entry.flags:
+        checks.append(('python-brace-format', brace_format_fields))
+
+    for flag, parse in checks:
+        if entry.msgid_plural:
+            source = set(parse(entry.msgid)) | set(parse(entry.msgid_plural))
+            for index, msgstr in entry.msgstr_plural.items():
+                if msgstr and not set(parse(msgstr)) <= source:
+                    errors.append(
+                        f"{flag} mismatch in msgstr[{index}] "
+                        f"for msgid '{entry.msgid[:50]}'")
+        elif entry.msgstr and parse(entry.msgstr) != parse(entry.msgid):
+            errors.append(
+                f"{flag} mismatch for msgid '{entry.msgid[:50]}'")
+    return errors
+
+
+def validate_po_file(po_path: str) -> tuple:
+    """Validate a PO file
+
+    :param po_path: string path to the PO file
+    :returns: tuple of (list of error messages, list of warning
+        messages). The errors are empty if Weblate accepts the file.
+    """
+    try:
+        with open(po_path, 'rb') as f:
+            raw = f.read()
+    except OSError as e:
+        return [f"Failed to read: {e}"], []
+
+    # Encoding
+    charset = get_charset(raw)
+    try:
+        raw.decode(charset)
+    except LookupError:
+        return [f"Unknown charset in header: {charset}"], []
+    except UnicodeDecodeError as e:
+        return [f"Invalid {charset} content: {e}"], []
+
+    # Syntax and duplicated entries
+    try:
+        po = polib.pofile(
+            raw.decode(charset), encoding=charset,
+            check_for_duplicates=True)
+    except (OSError, ValueError) as e:
+        return [f"Syntax error: {e}"], []
+
+    errors = []
+    warnings = []
+
+    # Headers
+    if not po.metadata:
+        errors.append("Header entry is missing")
+    if not po.metadata.get('Language'):
+        errors.append("Language header is missing")
+    if 'charset=' not in po.metadata.get('Content-Type', 'charset='):
+        errors.append("Content-Type header has no charset")
+
+    # Plural count
+    nplurals = get_expected_nplurals(po)
+    has_plural = False
+    for entry in po:
+        if entry.obsolete:
+            continue
+        if entry.msgid_plural:
+            has_plural = True
+            if (nplurals and entry.translated()
+                    and len(entry.msgstr_plural) != nplurals):
+                warnings.append(
+                    f"Plural count mismatch: {len(entry.msgstr_plural)} "
+                    f"forms, expected {nplurals} "
+                    f"for msgid '{entry.msgid[:50]}'")
+        if entry.translated():
+            warnings.extend(check_format(entry))
+    if has_plural and nplurals is None:
+        errors.append("Plural-Forms header is missing or invalid")
+
+    return errors, warnings
+
+
+def collect_po_files(paths):
+    """Expand the given paths into (root, PO file path) tuples
+
+    The root is kept to place quarantined files with the same layout.
+    """
+    po_files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                po_files.extend(
+                    (path, os.path.join(root, name))
+                    for name in sorted(files) if name.endswith('.po'))
+        elif os.path.isfile(path):
+            po_files.append((os.path.dirname(path), path))
+        else:
+            print(f"[ERROR] PO file does not exist: {path}")
+    return po_files
+
+
+def quarantine_file(root: str, po_path: str, quarantine_dir: str) -> str:
+    """Move the PO file to the quarantine directory
+
+    :returns: string path of the quarantined file
+    """
+    dest = Path(quarantine_dir) / os.path.relpath(po_path, root)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    shutil.move(po_path, dest)
+    return str(dest)
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='Validate PO files before uploading them to Weblate')
+    parser.add_argument(
+        'paths', nargs='+',
+        help='PO files or directories containing PO files.')
+    parser.add_argument(
+        '-q', '--quarantine',
+        help='Move invalid files to this directory '
+             'and write report.json in it.')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help='Number of worker processes (default: number of cores).')
+    return parser.parse_args()
+
+
+def main():
+    args = get_args()
+
+    po_files = collect_po_files(args.paths)
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        results = list(executor.map(
+            validate_po_file, [path for _, path in po_files], chunksize=8))
+
+    report = {}
+    warned = 0
+    for (root, po_path), (errors, warnings) in zip(po_files, results):
+        for warning in warnings:
+            print(f"[WARNING] {po_path}: {warning}")
+        warned += bool(warnings)
+        if not errors:
+            continue
+        for error in errors:
+            print(f"[ERROR] {po_path}: {error}")
+        if args.quarantine:
+            dest = quarantine_file(root, po_path, args.quarantine)
+            print(f"[ERROR] Quarantined {po_path} to {dest}")
+        report[po_path] = errors
+
+    print(f"[INFO] Validated {len(po_files)} PO files, "
+          f"{len(report)} invalid, {warned} with warnings")
+
+    if args.quarantine and report:
+        report_path = os.path.join(args.quarantine, 'report.json')
+        previous = {}
+        if os.path.exists(report_path):
+            with open(report_path) as f:
+                previous = json.load(f)
+        previous.update(report)
+        with open(report_path, 'w') as f:
+            json.dump(previous, f, indent=2, sort_keys=True)
+        print(f"[ERROR] {len(report)} PO files were quarantined and will "
+              f"not be migrated, see {report_path}:")
+        for po_path in sorted(report):
+            print(f"[ERROR]   {po_path}")
+    if report:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
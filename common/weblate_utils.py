@@ -14,18 +14,39 @@
 
 import argparse
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import io
 import json
+import logging
 import os
 from pathlib import Path
 import re
 import sys
+import threading
 import time
 from urllib.parse import urljoin
 import zipfile
 import polib
 import requests
 
+from content_store import ContentStore
+from content_store import upload_target
+from journal import get_journal
+from journal import is_resume
+from latency import get_endpoint
+from latency import get_latency_log
+from migration_log import setup_logging
+from rate_limit import get_rate_limiter
+
+
+LOG = logging.getLogger(__name__)
+# Seconds Weblate needs to set up a new translation before an upload.
+# create_weblate_components.sh and the estimate of the scheduler use
+# the same NEW_TRANSLATION_WAIT_SECONDS environment variable.
+NEW_TRANSLATION_WAIT_SECONDS = float(
+    os.getenv('NEW_TRANSLATION_WAIT_SECONDS', '10'))
+
 
 def sanitize_locale(locale: str) -> str:
     """Sanitize locale for standardization
@@ -87,6 +108,44 @@ def get_filemask(component_name: str) -> str:
         return f'locale/*/LC_MESSAGES/{component_name}.po'
 
 
+def get_locale_from_path(po_path: str) -> str:
+    """Get locale from the path of the po file
+
+    ex) .../locale/ko_KR/LC_MESSAGES/django.po -> ko_KR
+
+    :param po_path: string path to the po file
+    :returns: string locale
+    """
+    return re.sub(r'.*locale/([^/]*)/LC_MESSAGES/.*', r'\1', po_path)
+
+
+def bundle_digest(member_digests: dict) -> str:
+    """Get a digest for a set of files
+
+    :param member_digests: A dictionary of file name -> digest
+    :returns: string hex digest
+    """
+    sha = hashlib.sha256()
+    for name in sorted(member_digests):
+        sha.update(f'{name} {member_digests[name]}\n'.encode())
+    return sha.hexdigest()
+
+
+def get_payload_size(file: dict) -> int:
+    """Get the bytes of the files of a request
+
+    :param file: The file dictionary of the request
+    :returns: int number of bytes from the current positions
+    """
+    size = 0
+    for value in file.values():
+        fileobj = value[1] if isinstance(value, tuple) else value
+        position = fileobj.tell()
+        size += fileobj.seek(0, io.SEEK_END) - position
+        fileobj.seek(position)
+    return size
+
+
 def get_version_name(version: str) -> str:
     return version.replace('/', '-')
 
@@ -97,10 +156,19 @@ class WeblateConfig:
     Before using this class, you need to set the
     WEBLATE_TOKEN and WEBLATE_URL
     in system environment variables.
+    MIGRATION_STORE_DIR is optional. If it is set, the content store
+    in the directory is used to skip payloads already sent to Weblate.
+    WEBLATE_RATE_LIMIT is optional. If it is set, the requests of all
+    processes are limited to the number of requests per second.
+    MIGRATION_JOURNAL is optional. If it is set, the completed steps
+    are recorded, and skipped when MIGRATION_RESUME is true.
+    MIGRATION_LATENCY is optional. If it is set, the duration of
+    each request is recorded for the dry run estimates.
     """
     def __init__(self):
         self.token = os.getenv('WEBLATE_TOKEN')
         self.base_url = os.getenv('WEBLATE_URL')
+        self.store_dir = os.getenv('MIGRATION_STORE_DIR')
 
 
 class WeblateUtils:
@@ -109,6 +177,15 @@ class WeblateUtils:
         self.config: WeblateConfig = config
         # All of the API calls are prefixed with api/
         self.base_url = urljoin(self.config.base_url, 'api/')
+        self.store = None
+        if self.config.store_dir:
+            self.store = ContentStore(self.config.store_dir)
+        self.rate_limiter = get_rate_limiter()
+        self.journal = get_journal()
+        self.resume = is_resume()
+        self.latency_log = get_latency_log()
+        # The requests of a command share the connections to Weblate
+        self.session = requests.Session()
 
     @property
     def _headers(self) -> dict:
@@ -143,15 +220,20 @@ class WeblateUtils:
             with status code 1.
         :returns: requests.Response
         """
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
         try:
-            response = requests.get(url, headers=self._headers, params=params)
+            start = time.monotonic()
+            response = self.session.get(
+                url, headers=self._headers, params=params)
+            self._record_latency('GET', url, time.monotonic() - start)
             if raise_error:
                 response.raise_for_status()
             return response
         except requests.exceptions.RequestException as e:
-            print(f"[ERROR] Failed to get: {url}")
+            LOG.error(f"Failed to get: {url}")
             if hasattr(e, 'response') and e.response is not None:
-                print(f"[ERROR] Response details: {e.response.text}")
+                LOG.error(f"Response details: {e.response.text}")
             sys.exit(1)
 
     def _post(
@@ -179,26 +261,56 @@ class WeblateUtils:
             with status code 1.
         :returns: requests.Response
         """
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
         try:
-            # The requests.post automatically set the Content-Type
+            # The session.post automatically set the Content-Type
             # depending on the post type.
+            start = time.monotonic()
             if file:
-                response = requests.post(
+                size = get_payload_size(file)
+                response = self.session.post(
                     url, data=data, files=file, headers=self._headers)
             else:
-                response = requests.post(url, json=data, headers=self._headers)
+                size = 0
+                response = self.session.post(
+                    url, json=data, headers=self._headers)
+            self._record_latency('POST', url, time.monotonic() - start, size)
 
             if raise_error:
                 response.raise_for_status()
 
             return response
         except requests.exceptions.RequestException as e:
-            print(f"[ERROR] Failed to post: {url}")
-            print(f"[ERROR] Exception: {e}")
+            LOG.error(f"Failed to post: {url}")
+            LOG.error(f"Exception: {e}")
             if hasattr(e, 'response') and e.response is not None:
-                print(f"[ERROR] Response: {e.response.text}")
+                LOG.error(f"Response: {e.response.text}")
             sys.exit(1)
 
+    def _record_latency(self, method: str, url: str, seconds: float,
+                        size: int = 0) -> None:
+        if self.latency_log:
+            self.latency_log.record(method, get_endpoint(url), seconds, size)
+
+    def _is_done(self, project_name: str, category_name: str, step: str,
+                 component_name: str = '', locale: str = '') -> bool:
+        """Check if a resumed run already completed the step"""
+        if not (self.resume and self.journal):
+            return False
+        if not self.journal.is_done(project_name, category_name, step,
+                                    component_name, locale):
+            return False
+        LOG.info(f"Skip completed step: {step} "
+                 f"{component_name} {locale}".rstrip())
+        return True
+
+    def _record(self, project_name: str, category_name: str, step: str,
+                component_name: str = '', locale: str = '') -> None:
+        if self.journal:
+            self.journal.record(project_name, category_name, step,
+                                component_name, locale)
+
     def _build_category_list(self, project_name: str) -> dict:
         """Get category list for the project
 
@@ -232,7 +344,7 @@ class WeblateUtils:
         """
         category_dict = self._build_category_list(project_name)
         if not category_dict.get(get_version_name(category_name)):
-            print("[ERROR] Category does not exist: ", category_name)
+            LOG.error(f"Category does not exist: {category_name}")
             sys.exit(1)
 
         return category_dict[get_version_name(category_name)]['id']
@@ -249,9 +361,9 @@ class WeblateUtils:
         url = urljoin(self.base_url, path)
         response = self._get(url)
         if response.status_code == 200:
-            print("[INFO] Project already exists: ", project_name)
+            LOG.info(f"Project already exists: {project_name}")
         elif response.status_code == 404:
-            print("[INFO] Project does not exist: ", project_name)
+            LOG.info(f"Project does not exist: {project_name}")
 
             path = 'projects/'
             url = urljoin(self.base_url, path)
@@ -262,10 +374,10 @@ class WeblateUtils:
             }
             _ = self._post(url=url, data=data, raise_error=True)
 
-            print("[INFO] Project created: ", project_name)
+            LOG.info(f"Project created: {project_name}")
         else:
-            print("[ERROR] Failed to create project: ",
-                  json.dumps(response.json()))
+            LOG.error("Failed to create project: "
+                      f"{json.dumps(response.json())}")
 
     def create_category(self, project_name: str, category_name: str) -> None:
         """Create a new category to specify the version.
@@ -276,10 +388,13 @@ class WeblateUtils:
         :param category_name: The name of the category
         """
 
+        if self._is_done(project_name, category_name, 'category'):
+            return
+
         category_dict = self._build_category_list(project_name)
         is_exists = bool(category_dict.get(get_version_name(category_name)))
         if not is_exists:
-            print("[INFO] Category does not exist: ", category_name)
+            LOG.info(f"Category does not exist: {category_name}")
 
             path = 'categories/'
             url = urljoin(self.base_url, path)
@@ -291,9 +406,10 @@ class WeblateUtils:
             }
             _ = self._post(url=url, data=data, raise_error=True)
 
-            print("[INFO] Category created: ", category_name)
+            LOG.info(f"Category created: {category_name}")
         else:
-            print("[INFO] Category already exists: ", category_name)
+            LOG.info(f"Category already exists: {category_name}")
+        self._record(project_name, category_name, 'category')
 
     def create_glossary(self, project_name: str) -> None:
         """Create a new glossary component
@@ -308,9 +424,9 @@ class WeblateUtils:
         url = urljoin(self.base_url, path)
         response = self._get(url)
         if response.status_code == 200:
-            print("[INFO] Glossary Component already exists.")
+            LOG.info("Glossary Component already exists.")
         elif response.status_code == 404:
-            print("[INFO] Glossary Component does not exist")
+            LOG.info("Glossary Component does not exist")
 
             path = f'projects/{sanitize_slug(project_name)}/components/'
             url = urljoin(self.base_url, path)
@@ -326,10 +442,10 @@ class WeblateUtils:
             }
             _ = self._post(url=url, data=data, raise_error=True)
 
-            print("[INFO] Glossary created.")
+            LOG.info("Glossary created.")
         else:
-            print("[ERROR] Failed to create glossary: ",
-                  json.dumps(response.json()))
+            LOG.error("Failed to create glossary: "
+                      f"{json.dumps(response.json())}")
             sys.exit(1)
 
     def create_component(
@@ -337,28 +453,84 @@ class WeblateUtils:
             project_name: str,
             category_name: str,
             component_name: str,
-            pot_path: str
+            pot_path: str,
+            po_paths: list = None
     ) -> None:
         """Create a new component
 
         If the component does not exist, create a new one.
+        When the content store is enabled and the same pot file
+        was already sent to the component, the request is skipped.
+
+        If po_paths is given, the translations are put in the zip file
+        following the filemask of the component, so the component and
+        all of its translations are created in a single request.
+        If the component already exists, each translation is created
+        and uploaded one by one instead.
 
         :param project_name: The name of the project
         :param category_name: The name of the category
         :param component_name: The name of the component
         :param pot_path: The path to the pot file
+        :param po_paths: (Optional) The paths to the normalized po files
         """
 
+        if self._is_done(project_name, category_name, 'component',
+                         component_name):
+            return
+
+        if po_paths:
+            # The pot file is stored with the new_base name so that
+            # Weblate can find it among the translations.
+            members = [(pot_path, f'{component_name}.pot')]
+            filemask = get_filemask(component_name)
+            for po_path in po_paths:
+                locale = sanitize_locale(get_locale_from_path(po_path))
+                members.append((po_path, filemask.replace('*', locale)))
+        else:
+            members = [(pot_path, os.path.basename(pot_path))]
+
+        digest = None
+        member_digests = {}
+        target = upload_target(self.config.base_url, project_name,
+                               category_name, component_name)
+        if self.store:
+            member_digests = {
+                arcname: self.store.put(path) for path, arcname in members}
+            digest = member_digests[members[0][1]]
+            if po_paths:
+                digest = bundle_digest(member_digests)
+
         path = (f'components/{sanitize_slug(project_name)}/'
                 f'{sanitize_slug(category_name)}%252F'
                 f'{sanitize_slug(component_name)}/')
         url = urljoin(self.base_url, path)
         response = self._get(url)
 
-        if response.status_code == 200:
-            print("[INFO] Component already exists: ", component_name)
+        # The ledger is only trusted while the component exists,
+        # it does not know about components deleted in Weblate.
+        if (response.status_code == 200 and self.store
+                and self.store.is_uploaded(target, digest)):
+            LOG.info("Component already created with the same "
+                     f"files: {component_name}")
+        elif response.status_code == 200:
+            LOG.info(f"Component already exists: {component_name}")
+            # Create all the missing translations first, so Weblate
+            # sets them up during a single wait before the uploads.
+            created = [
+                self.create_translation(
+                    project_name, category_name, component_name,
+                    get_locale_from_path(po_path))
+                for po_path in po_paths or []]
+            if any(created):
+                time.sleep(NEW_TRANSLATION_WAIT_SECONDS)
+            for po_path in po_paths or []:
+                locale = get_locale_from_path(po_path)
+                self.upload_po_file(
+                    project_name, category_name, component_name, locale,
+                    po_path)
         elif response.status_code == 404:
-            print("[INFO] Component does not exist: ", component_name)
+            LOG.info(f"Component does not exist: {component_name}")
 
             path = f'projects/{sanitize_slug(project_name)}/components/'
             url = urljoin(self.base_url, path)
@@ -367,15 +539,7 @@ class WeblateUtils:
                 self.base_url,
                 f"categories/{category_id}/")
 
-            # Create a zip file containing the pot file for Weblate
-            # component initialization.
-            # The new_base parameter will be set to the pot file name.
-            zip_buf = io.BytesIO()
-            with zipfile.ZipFile(
-                    zip_buf, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                zip_file.write(pot_path, os.path.basename(pot_path))
-            # Set the pointer to the beginning of the zip for uploading.
-            zip_buf.seek(0)
+            zip_buf = self._build_zip(members, member_digests)
             file = {
                 'zipfile': (
                     f'{component_name}.zip',
@@ -395,12 +559,64 @@ class WeblateUtils:
                 'category': category_url,
             }
             _ = self._post(url=url, data=data, file=file, raise_error=True)
-
-            print("[INFO] Component created: ", component_name)
+            if self.store:
+                self.store.record_upload(target, digest)
+                # The bundled translations are uploaded as well.
+                for _, arcname in members[1:]:
+                    locale = get_locale_from_path(arcname)
+                    self.store.record_upload(
+                        f'{target}/{locale}', member_digests[arcname])
+
+            LOG.info(f"Component created: {component_name}")
+            if po_paths:
+                LOG.info(f"Translations included: {len(po_paths)}")
         else:
-            print("[ERROR] Failed to create component: ",
-                  json.dumps(response.json()))
+            LOG.error("Failed to create component: "
+                      f"{json.dumps(response.json())}")
             sys.exit(1)
+        self._record(project_name, category_name, 'component', component_name)
+
+    def _build_zip(self, members: list, member_digests: dict = None):
+        """Build a zip file for the component initialization
+
+        Weblate initializes the component from the zip file.
+        The new_base parameter will be set to the pot file name.
+        When the content store is enabled, the zip is kept in the store
+        and reused for the same files in other versions.
+
+        :param members: A list of (path, name in the zip) tuples
+        :param member_digests: (Optional) A dictionary of the name in
+            the zip -> digest of the file in the store
+        :returns: A file object of the zip positioned at the beginning
+        """
+        zip_path = None
+        if self.store and member_digests:
+            zip_path = self.store.zip_path(bundle_digest(member_digests))
+            try:
+                zip_bytes = zip_path.read_bytes()
+                # The workspace manager removes the least recently
+                # used zips first.
+                os.utime(zip_path)
+            except FileNotFoundError:
+                pass
+            else:
+                LOG.info(f"Reuse zip file from the store: {zip_path}")
+                return io.BytesIO(zip_bytes)
+
+        zip_buf = io.BytesIO()
+        with zipfile.ZipFile(zip_buf, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for path, arcname in members:
+                zip_file.write(path, arcname)
+
+        if zip_path:
+            tmp_path = f'{zip_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(zip_buf.getvalue())
+            os.replace(tmp_path, zip_path)
+
+        # Set the pointer to the beginning of the zip for uploading.
+        zip_buf.seek(0)
+        return zip_buf
 
     def create_translation(
             self,
@@ -408,7 +624,7 @@ class WeblateUtils:
             category_name: str,
             component_name: str,
             locale: str
-    ) -> None:
+    ) -> bool:
         """Create a new translation
 
         If the translation does not exist, create a new one.
@@ -417,7 +633,13 @@ class WeblateUtils:
         :param category_name: The name of the category
         :param component_name: The name of the component
         :param locale: The locale of the translation
+        :returns: True if a new translation was created
         """
+        # The journal keeps the locale of the translation index.
+        step = (project_name, category_name, 'translation',
+                component_name, locale)
+        if self._is_done(*step):
+            return False
 
         locale = sanitize_locale(locale)
         path = (f'translations/{sanitize_slug(project_name)}/'
@@ -428,7 +650,7 @@ class WeblateUtils:
         response = self._get(url)
 
         if response.status_code == 200:
-            print("[INFO] Translation already exists: ", locale)
+            LOG.info(f"Translation already exists: {locale}")
         elif response.status_code == 404:
             path = (f'components/{sanitize_slug(project_name)}/'
                     f'{sanitize_slug(category_name)}%252F'
@@ -440,11 +662,13 @@ class WeblateUtils:
             }
             _ = self._post(url=url, data=data, raise_error=True)
 
-            print("[INFO] Translation created: ", locale)
+            LOG.info(f"Translation created: {locale}")
         else:
-            print("[ERROR] Failed to create translation: ",
-                  json.dumps(response.json()))
+            LOG.error("Failed to create translation: "
+                      f"{json.dumps(response.json())}")
             sys.exit(1)
+        self._record(*step)
+        return response.status_code == 404
 
     def upload_po_file(
         self,
@@ -458,6 +682,8 @@ class WeblateUtils:
 
         This function will retry up to 3 times
         for actually uploading.
+        When the content store is enabled and the same po file
+        was already uploaded to the translation, it is skipped.
 
         :param project_name: The name of the project
         :param category_name: The name of the category
@@ -466,17 +692,37 @@ class WeblateUtils:
         :param po_path: The path to the po file
         """
 
+        step = (project_name, category_name, 'upload', component_name, locale)
+        if self._is_done(*step):
+            return
+
         retry_count = 3
         locale = sanitize_locale(locale)
         path = (f'translations/{sanitize_slug(project_name)}/'
                 f'{sanitize_slug(category_name)}%252F'
                 f'{sanitize_slug(component_name)}/'
-                f'{locale}/file/')
-        url = urljoin(self.base_url, path)
+                f'{locale}/')
+        translation_url = urljoin(self.base_url, path)
+        url = urljoin(translation_url, 'file/')
+
+        digest = None
+        target = upload_target(self.config.base_url, project_name,
+                               category_name, component_name, locale)
+        if self.store:
+            digest = self.store.put(po_path)
+            # The ledger is only trusted while the translation exists,
+            # it does not know about translations deleted in Weblate.
+            if (self.store.is_uploaded(target, digest)
+                    and self._get(translation_url).status_code == 200):
+                LOG.info(f"Same PO file already uploaded: "
+                         f"{component_name} {locale}")
+                self._record(*step)
+                return
+
         for cnt in range(retry_count):
             sleep_time = 15
-            print(f"[INFO] Uploading PO file: {po_path}, "
-                  f"Retry count: {cnt + 1}")
+            LOG.info(f"Uploading PO file: {po_path}, "
+                     f"Retry count: {cnt + 1}")
             with open(po_path, 'rb') as f:
                 file = {
                     'file': f,
@@ -490,14 +736,17 @@ class WeblateUtils:
                 # If the upload is successful, out of the loop.
                 if (response.status_code == 200 and
                         response.json()['result'] is True):
-                    print("[INFO] Upload successful: ",
-                          component_name, locale)
+                    LOG.info(f"Upload successful: "
+                             f"{component_name} {locale}")
+                    if self.store:
+                        self.store.record_upload(target, digest)
+                    self._record(*step)
                     return
 
                 time.sleep(sleep_time)
 
-        print("[INFO] Upload failed: ",
-              json.dumps(response.json()))
+        LOG.error("Upload failed: "
+                  f"{json.dumps(response.json())}")
 
     def download_translation_file(
         self,
@@ -515,14 +764,14 @@ class WeblateUtils:
         if response.status_code == 200:
             with open(po_path, 'wb') as f:
                 f.write(response.content)
-            print(
-                "[INFO] Successfully downloaded translation "
+            LOG.info(
+                "Successfully downloaded translation "
                 f"file from: {url}"
             )
-            print(f"[INFO] Saved to: {po_path}")
+            LOG.info(f"Saved to: {po_path}")
         else:
-            print(
-                "[ERROR] Failed to download translation file: "
+            LOG.error(
+                "Failed to download translation file: "
                 f"{response.status_code}"
             )
             sys.exit(1)
@@ -564,7 +813,7 @@ class WeblateUtils:
                 f"{len(zanata_active)}(zanata) != "
                 f"{len(weblate_active)}(weblate)"
             )
-            print(f"[ERROR] {error_msg}")
+            LOG.error(error_msg)
             return None
 
         total_count = len(zanata_active)
@@ -579,7 +828,7 @@ class WeblateUtils:
                 f"{len(zanata_active)}(zanata) != "
                 f"{len(weblate_active)}(weblate)"
             )
-            print(f"[ERROR] {error_msg}")
+            LOG.error(error_msg)
             return None
 
         if zanata_translated != weblate_translated:
@@ -588,12 +837,12 @@ class WeblateUtils:
                 f"{zanata_translated}(zanata) != "
                 f"{weblate_translated}(weblate)"
             )
-            print(f"[ERROR] {error_msg}")
+            LOG.error(error_msg)
 
             return None
 
-        print(
-            f"[INFO] ✓ Count matched(translated/total): "
+        LOG.info(
+            f"✓ Count matched(translated/total): "
             f"{zanata_translated}/{len(zanata_active)}"
         )
 
@@ -636,7 +885,7 @@ class WeblateUtils:
             # Check it msgid exists in Weblate
             if msgid not in weblate_dict:
                 error_msg = f"Missing in Weblate: msgid='{msgid}'"
-                print(f"[ERROR] {error_msg}")
+                LOG.error(error_msg)
                 missing_count += 1
                 continue
 
@@ -649,7 +898,7 @@ class WeblateUtils:
                     f"- Zanata msgstr: '{zanata_entry.msgstr}' "
                     f"- Weblate msgstr: '{weblate_entry.msgstr}'"
                 )
-                print(f"[ERROR] {error_msg}")
+                LOG.error(error_msg)
                 mismatch_count += 1
 
         # Check for entries in Weblate but not in Zanata
@@ -661,37 +910,299 @@ class WeblateUtils:
 
         weblate_extra_count = len(extra_in_weblate)
         if extra_in_weblate:
-            print(
-                f"[ERROR] {weblate_extra_count} entries in "
+            LOG.error(
+                f"{weblate_extra_count} entries in "
                 f"Weblate but not in Zanata"
             )
 
             # show first 5 extra entries on weblate
             for msgid in extra_in_weblate[:5]:
                 error_msg = f"Extra msgid on weblate: '{msgid[:50]}'"
-                print(f"[ERROR] {error_msg}")
+                LOG.error(error_msg)
 
         if (mismatch_count == 0 and missing_count == 0 and
                 weblate_extra_count == 0):
-            print(
-                f"[INFO] ✓ Sentence detail matched: "
+            LOG.info(
+                f"✓ Sentence detail matched: "
                 f"{len(zanata_entries)} entries"
             )
+            self._record(project_name, category_name, 'verify',
+                         component_name, locale)
         else:
-            print(
-                "[ERROR] Sentence detail check "
+            LOG.error(
+                "Sentence detail check "
                 "completed with issues:"
             )
             if mismatch_count > 0:
-                print(f"[ERROR]   - Mismatches: {mismatch_count}")
+                LOG.error(f"  - Mismatches: {mismatch_count}")
             if missing_count > 0:
-                print(f"[ERROR]   - Missing in Weblate: {missing_count}")
+                LOG.error(f"  - Missing in Weblate: {missing_count}")
             if weblate_extra_count > 0:
-                print(f"[ERROR]   - Extra in Weblate: {weblate_extra_count}")
+                LOG.error(f"  - Extra in Weblate: {weblate_extra_count}")
 
         return None
 
 
+# Operations of the batch command: method of WeblateUtils and the
+# fields of the operation passed to it, as the options of the commands.
+BATCH_OPERATIONS = {
+    'create-project': ('create_project', ('project',)),
+    'create-category': ('create_category', ('project', 'category')),
+    'create-component': ('create_component', (
+        'project', 'category', 'component', 'pot_path', 'po_paths')),
+    'create-glossary': ('create_glossary', ('project',)),
+    'create-translation': ('create_translation', (
+        'project', 'category', 'component', 'locale')),
+    'upload-po-file': ('upload_po_file', (
+        'project', 'category', 'component', 'locale', 'po_path')),
+    'download-translation-file': ('download_translation_file', (
+        'project', 'po_path')),
+    'check-sentence-count': ('check_sentence_count', (
+        'project', 'category', 'component', 'locale',
+        'zanata_po_path', 'weblate_po_path')),
+    'check-sentence-detail': ('check_sentence_detail', (
+        'project', 'category', 'component', 'locale',
+        'zanata_po_path', 'weblate_po_path')),
+}
+# The verify operation runs both checks like test_accuracy/test.sh
+VERIFY_OPERATIONS = ('check-sentence-count', 'check-sentence-detail')
+# Optional fields of the operations
+OPTIONAL_FIELDS = ('po_paths',)
+BATCH_JOBS = 4
+
+
+class BatchError(Exception):
+    """Raised when an operation of a batch is invalid"""
+
+
+class ErrorCollector(logging.Handler):
+    """Collects the error messages logged by the operation of a thread"""
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self._local = threading.local()
+
+    def start(self) -> list:
+        self._local.messages = []
+        return self._local.messages
+
+    def emit(self, record: logging.LogRecord) -> None:
+        messages = getattr(self._local, 'messages', None)
+        if messages is not None:
+            messages.append(record.getMessage())
+
+
+class BatchRunner:
+    """Runs a stream of operations with parallel workers
+
+    Each operation is a JSON object with its "op", an optional "id",
+    the fields of the op named like the options of its command (e.g.
+    "po_path" for --po-path), an optional list of the ids of the
+    operations it runs "after", and optional seconds to "wait" after
+    it succeeded, before its dependent operations start. The waiting
+    does not hold a worker, and is skipped when the method of the
+    operation returned False because it had nothing to create.
+
+    An operation starts as soon as the operations it depends on
+    succeeded, and is skipped if one of them did not. The dependencies
+    must appear before the operation in the stream, so the operations
+    start while the stream is still being read.
+
+    Each worker thread has its own WeblateUtils, so the requests of
+    the operations of a worker reuse the connections of its session.
+    The result of every operation is written to the output as a JSON
+    line in the order they finish.
+    """
+    def __init__(self, config: WeblateConfig, jobs: int = BATCH_JOBS,
+                 output=None):
+        """
+        :param config: WeblateConfig
+        :param jobs: int number of parallel operations
+        :param output: file for the JSON results (default: stdout)
+        """
+        self.config = config
+        self.output = output or sys.stdout
+        self._executor = ThreadPoolExecutor(jobs)
+        self._local = threading.local()
+        self._errors = ErrorCollector()
+        self._lock = threading.Condition()
+        # Status of each finished operation by id
+        self._status = {}
+        # Id of each operation -> operations waiting for it
+        self._dependents = defaultdict(list)
+        # Id of each waiting operation -> ids it still waits for
+        self._waiting = {}
+        self._ids = set()
+        self._running = 0
+        self.failed = 0
+
+    def run(self, lines) -> None:
+        """Run the operations of the JSON lines and wait for them
+
+        :param lines: iterable of string JSON lines
+        """
+        logging.getLogger().addHandler(self._errors)
+        try:
+            for number, line in enumerate(lines, 1):
+                if line.strip():
+                    self.submit(line, number)
+            with self._lock:
+                self._lock.wait_for(lambda: self._running == 0)
+        finally:
+            self._executor.shutdown()
+            logging.getLogger().removeHandler(self._errors)
+
+    def submit(self, line: str, number: int) -> None:
+        """Start an operation, or keep it until its dependencies finish
+
+        :param line: string JSON line of the operation
+        :param number: int line number, the id of the operation
+            without one
+        """
+        op_id = str(number)
+        try:
+            operation = json.loads(line)
+            if not isinstance(operation, dict):
+                raise BatchError("The operation is not a JSON object")
+            op_id = str(operation.get('id', number))
+            operation['id'] = op_id
+            self._check(operation)
+        except (ValueError, BatchError) as e:
+            self._write({'id': op_id, 'status': 'failed', 'error': str(e)})
+            with self._lock:
+                self._ids.add(op_id)
+                self._status[op_id] = 'failed'
+                self.failed += 1
+            return
+
+        with self._lock:
+            self._ids.add(op_id)
+            self._running += 1
+            after = {str(dep) for dep in operation.get('after', [])}
+            if any(self._status.get(dep, 'success') != 'success'
+                   for dep in after):
+                self._skip(operation)
+                return
+            waiting = after - self._status.keys()
+            if waiting:
+                self._waiting[op_id] = waiting
+                for dep in waiting:
+                    self._dependents[dep].append(operation)
+            else:
+                self._executor.submit(self._run, operation)
+
+    def _check(self, operation: dict) -> None:
+        """Check an operation before it is queued
+
+        :raises: BatchError if the operation is invalid
+        """
+        op = operation.get('op')
+        if op != 'verify' and op not in BATCH_OPERATIONS:
+            raise BatchError(f"Unknown operation: {op}")
+        with self._lock:
+            if operation['id'] in self._ids:
+                raise BatchError(f"Duplicate id: {operation['id']}")
+            unknown = [str(dep) for dep in operation.get('after', [])
+                       if str(dep) not in self._ids]
+        if unknown:
+            raise BatchError(
+                f"Unknown dependencies: {', '.join(unknown)}")
+        for name in VERIFY_OPERATIONS if op == 'verify' else (op,):
+            _, fields = BATCH_OPERATIONS[name]
+            missing = [field for field in fields
+                       if field not in operation
+                       and field not in OPTIONAL_FIELDS]
+            if missing:
+                raise BatchError(f"Missing fields: {', '.join(missing)}")
+
+    def _get_utils(self) -> WeblateUtils:
+        """Get the WeblateUtils of the worker thread"""
+        if not hasattr(self._local, 'utils'):
+            self._local.utils = WeblateUtils(self.config)
+        return self._local.utils
+
+    def _run(self, operation: dict) -> None:
+        """Run an operation in a worker thread"""
+        utils = self._get_utils()
+        errors = self._errors.start()
+        start = time.monotonic()
+        status = 'success'
+        changed = None
+        op = operation['op']
+        try:
+            for name in VERIFY_OPERATIONS if op == 'verify' else (op,):
+                method, fields = BATCH_OPERATIONS[name]
+                changed = getattr(utils, method)(
+                    *(operation.get(field) for field in fields))
+                if errors:
+                    break
+            if errors:
+                status = 'failed'
+        except SystemExit:
+            # The methods exit when a request failed
+            status = 'failed'
+        except Exception as e:
+            LOG.exception(f"Failed to run {op}: {e}")
+            status = 'failed'
+
+        result = {
+            'id': operation['id'],
+            'op': op,
+            'status': status,
+            'seconds': round(time.monotonic() - start, 3),
+        }
+        if errors:
+            result['error'] = errors[0]
+        self._write(result)
+        # False means there was nothing to create, e.g. the translation
+        # already existed or is in the journal, so there is nothing to
+        # wait for either.
+        if (status == 'success' and operation.get('wait')
+                and changed is not False):
+            # The worker does not wait, it runs the next operation
+            timer = threading.Timer(float(operation['wait']), self._finish,
+                                    (operation, status))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._finish(operation, status)
+
+    def _finish(self, operation: dict, status: str) -> None:
+        """Start or skip the operations waiting for a finished one"""
+        with self._lock:
+            op_id = operation['id']
+            self._status[op_id] = status
+            if status == 'failed':
+                self.failed += 1
+            for dependent in self._dependents.pop(op_id, []):
+                if dependent['id'] not in self._waiting:
+                    continue
+                if status != 'success':
+                    self._skip(dependent)
+                    continue
+                waiting = self._waiting[dependent['id']]
+                waiting.discard(op_id)
+                if not waiting:
+                    del self._waiting[dependent['id']]
+                    self._executor.submit(self._run, dependent)
+            self._running -= 1
+            self._lock.notify_all()
+
+    def _skip(self, operation: dict) -> None:
+        """Skip an operation whose dependency did not succeed
+
+        Called with the lock held.
+        """
+        self._waiting.pop(operation['id'], None)
+        self._write({'id': operation['id'], 'op': operation['op'],
+                     'status': 'skipped'})
+        self._finish(operation, 'skipped')
+
+    def _write(self, result: dict) -> None:
+        with self._lock:
+            self.output.write(json.dumps(result, ensure_ascii=False) + '\n')
+            self.output.flush()
+
+
 def setup_argument_parser():
     """Setup command line argument parser with subcommands."""
     parser = argparse.ArgumentParser(
@@ -721,6 +1232,10 @@ def setup_argument_parser():
         '--component', required=True, help='Name of the component')
     create_component_parser.add_argument(
         '--pot-path', required=True, help='Path to the pot file')
+    create_component_parser.add_argument(
+        '--po-paths', nargs='*', default=None,
+        help='Paths to the normalized po files to include in the '
+             'initial zip file')
     # Create glossary command
     create_glossary_parser = subparser.add_parser(
         'create-glossary', help='Create a new glossary')
@@ -793,6 +1308,17 @@ def setup_argument_parser():
         '--weblate-po-path', required=True, help='Path to weblate po')
     check_sentence_detail_parser.add_argument(
         '--result-json', required=False, help='Path to result JSON')
+    # Batch command
+    batch_parser = subparser.add_parser(
+        'batch',
+        help='Run the JSON lines operations of a file or stdin, '
+             'and print the JSON result of each operation')
+    batch_parser.add_argument(
+        '--file', default='-',
+        help='Path to the JSON lines file (default: stdin)')
+    batch_parser.add_argument(
+        '--jobs', type=int, default=BATCH_JOBS,
+        help=f'Number of parallel operations (default: {BATCH_JOBS})')
     return parser
 
 
@@ -803,11 +1329,29 @@ def main():
 
         parser = setup_argument_parser()
         args = parser.parse_args()
+        # The batch command prints its results to stdout
+        setup_logging(project=getattr(args, 'project', None),
+                      version=getattr(args, 'category', None),
+                      component=getattr(args, 'component', None),
+                      locale=getattr(args, 'locale', None),
+                      stream=sys.stderr if args.command == 'batch'
+                      else sys.stdout)
 
         if not args.command:
             parser.print_help()
             sys.exit(1)
 
+        if args.command == 'batch':
+            runner = BatchRunner(config, args.jobs)
+            if args.file == '-':
+                runner.run(sys.stdin)
+            else:
+                with open(args.file, encoding='utf-8') as f:
+                    runner.run(f)
+            if runner.failed:
+                sys.exit(1)
+            return
+
         # Get result JSON path from args if available
         result_json_path = getattr(args, 'result_json', None)
         utils = WeblateUtils(config, result_json_path)
@@ -818,7 +1362,8 @@ def main():
             utils.create_category(args.project, args.category)
         elif args.command == 'create-component':
             utils.create_component(
-                args.project, args.category, args.component, args.pot_path)
+                args.project, args.category, args.component, args.pot_path,
+                args.po_paths)
         elif args.command == 'create-glossary':
             utils.create_glossary(args.project)
         elif args.command == 'create-translation':
@@ -844,9 +1389,7 @@ def main():
             parser.print_help()
             sys.exit(1)
     except Exception as e:
-        print(f"[ERROR] Failed to migrate: {e}")
-        import traceback
-        traceback.print_exc()
+        LOG.exception(f"Failed to migrate: {e}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,449 @@
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Keep the migration workspace under a disk budget.
+
+Each run records when it used the artifacts of its project: the
+working copy, the pot, translations and test directories, and the
+repository mirror. When the artifacts use more than the budget,
+the least recently used ones are removed first.
+
+The projects of the current run are never removed, and the projects
+listed in the batch are removed only after all the others.
+
+The content store is counted as well. Its objects which are no
+longer linked from any workspace are removed, and its cached zips
+are removed with the other artifacts, least recently used first.
+"""
+
+import argparse
+from collections import namedtuple
+from contextlib import contextmanager
+import fcntl
+import json
+import os
+import re
+import shutil
+import sys
+import time
+
+
+# Directories of a project workspace which can be rebuilt by a run.
+# The quarantine directory and the result files are kept for review.
+ARTIFACT_KINDS = ('clone', 'pot', 'translations', 'test')
+USAGE_NAME = 'workspace_usage.json'
+# Objects of the content store which are younger may be linked by
+# a running migration soon, so they are not garbage yet.
+STORE_GRACE_SECONDS = 3600
+SIZE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?\s*$', re.I)
+
+Artifact = namedtuple('Artifact', ['path', 'project', 'kind'])
+
+
+def parse_size(value: str) -> int:
+    """Parse a size such as 500M or 20G into bytes"""
+    match = SIZE_RE.match(value)
+    if not match:
+        raise ValueError(f"Invalid size: {value}")
+    exponent = ' KMGT'.index(match.group(2).upper() or ' ')
+    return int(float(match.group(1)) * 1024 ** exponent)
+
+
+def format_size(size: int) -> str:
+    for unit in ('B', 'K', 'M', 'G'):
+        if size < 1024:
+            return f'{size:.0f}{unit}' if unit == 'B' else f'{size:.1f}{unit}'
+        size /= 1024
+    return f'{size:.1f}T'
+
+
+def get_disk_usage(path: str) -> int:
+    """Get bytes freed by removing the path
+
+    Files hard linked from the content store are not counted,
+    because removing them does not free their blocks.
+    """
+    if not os.path.isdir(path):
+        stat = os.lstat(path)
+        return stat.st_blocks * 512 if stat.st_nlink == 1 else 0
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            try:
+                stat = os.lstat(os.path.join(root, name))
+            except OSError:
+                continue
+            if stat.st_nlink == 1 or name in dirs:
+                total += stat.st_blocks * 512
+    return total
+
+
+class WorkspaceManager:
+    """Tracks the last use of the workspace artifacts.
+
+    The usage file is shared by the concurrent runs of a workspace,
+    so it is read and written under an exclusive file lock::
+
+        {"<artifact path>": <last use as unix time>}
+    """
+    def __init__(self, work_dir: str, mirror_dir: str = None,
+                 store_dir: str = None):
+        self.work_dir = work_dir
+        self.projects_dir = os.path.join(work_dir, 'projects')
+        self.mirror_dir = mirror_dir
+        self.store_dir = store_dir or os.path.join(work_dir, 'store')
+        self.usage_path = os.path.join(work_dir, USAGE_NAME)
+        self.lock_path = os.path.join(work_dir, 'workspace_usage.lock')
+
+    @contextmanager
+    def _usage(self):
+        """Lock and load the usage file
+
+        :returns: A dictionary of artifact path -> last use.
+            Changes are saved when the context exits.
+        """
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                usage = {}
+                if os.path.exists(self.usage_path):
+                    with open(self.usage_path) as f:
+                        usage = json.load(f)
+                before = dict(usage)
+                yield usage
+                if usage != before:
+                    tmp_path = f'{self.usage_path}.tmp'
+                    with open(tmp_path, 'w') as f:
+                        json.dump(usage, f, indent=2, sort_keys=True)
+                    os.replace(tmp_path, self.usage_path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _project_artifacts(self, project: str, project_dir: str):
+        """Artifacts of a project or a version workspace directory"""
+        kinds = {project: 'clone'}
+        kinds.update((kind, kind) for kind in ARTIFACT_KINDS[1:])
+        for name, kind in kinds.items():
+            path = os.path.join(project_dir, name)
+            if os.path.isdir(path):
+                yield Artifact(path, project, kind)
+
+    def scan(self, project: str = None) -> list:
+        """Find the artifacts on disk
+
+        :param project: string name of a project, all projects by default
+        :returns: list of Artifact
+        """
+        artifacts = []
+        projects = [project] if project else sorted(
+            os.listdir(self.projects_dir)
+            if os.path.isdir(self.projects_dir) else [])
+        for name in projects:
+            project_dir = os.path.join(self.projects_dir, name)
+            artifacts.extend(self._project_artifacts(name, project_dir))
+            versions_dir = os.path.join(project_dir, 'versions')
+            if os.path.isdir(versions_dir):
+                for version in sorted(os.listdir(versions_dir)):
+                    artifacts.extend(self._project_artifacts(
+                        name, os.path.join(versions_dir, version)))
+            mirror = (os.path.join(self.mirror_dir, f'{name}.git')
+                      if self.mirror_dir else None)
+            if mirror and os.path.isdir(mirror):
+                artifacts.append(Artifact(mirror, name, 'mirror'))
+        return artifacts
+
+    def scan_zips(self) -> list:
+        """Find the zips cached in the content store
+
+        They are shared by the projects, so their project is empty.
+
+        :returns: list of Artifact
+        """
+        zips_dir = os.path.join(self.store_dir, 'zips')
+        if not os.path.isdir(zips_dir):
+            return []
+        return [Artifact(os.path.join(zips_dir, name), '', 'zip')
+                for name in sorted(os.listdir(zips_dir))
+                if name.endswith('.zip')]
+
+    def _store_objects(self):
+        """Stat the objects of the content store"""
+        objects_dir = os.path.join(self.store_dir, 'objects')
+        for root, _, files in os.walk(objects_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    yield path, os.lstat(path)
+                except OSError:
+                    continue
+
+    def get_store_usage(self) -> tuple:
+        """Get bytes used by the objects of the content store
+
+        The workspace files linked to the objects are not counted,
+        so the objects are counted here instead.
+
+        :returns: tuple of bytes used by all the objects and bytes
+            used by the objects which are not linked any more
+        """
+        total = garbage = 0
+        for _, stat in self._store_objects():
+            total += stat.st_blocks * 512
+            if stat.st_nlink == 1:
+                garbage += stat.st_blocks * 512
+        return total, garbage
+
+    def collect_garbage(self, dry_run: bool = False) -> int:
+        """Remove the objects of the content store which are not linked
+
+        Recently stored or reused objects are kept, see
+        STORE_GRACE_SECONDS.
+
+        :param dry_run: bool only count what would be removed
+        :returns: int bytes freed
+        """
+        freed = 0
+        deadline = time.time() - STORE_GRACE_SECONDS
+        for path, stat in self._store_objects():
+            if stat.st_nlink != 1 or stat.st_mtime > deadline:
+                continue
+            if not dry_run:
+                try:
+                    os.unlink(path)
+                except OSError:
+                    continue
+            freed += stat.st_blocks * 512
+        return freed
+
+    def touch(self, project: str) -> None:
+        """Record that the artifacts of the project are used now"""
+        now = time.time()
+        with self._usage() as usage:
+            for artifact in self.scan(project):
+                usage[artifact.path] = now
+
+    def get_last_use(self, artifact: Artifact, usage: dict) -> float:
+        """Get the last use, the modified time if it was not recorded
+
+        A cached zip is touched when it is reused, so its modified time
+        is its last use.
+        """
+        if artifact.path in usage:
+            return usage[artifact.path]
+        return os.stat(artifact.path).st_mtime
+
+    def remove(self, artifact: Artifact) -> bool:
+        """Remove the artifact
+
+        A mirror is removed only if no run is updating it.
+
+        :returns: bool removed or not
+        """
+        if artifact.kind == 'zip':
+            try:
+                os.unlink(artifact.path)
+            except FileNotFoundError:
+                pass
+            return True
+        if artifact.kind != 'mirror':
+            shutil.rmtree(artifact.path, ignore_errors=True)
+            return True
+
+        lock_path = os.path.join(self.mirror_dir, f'{artifact.project}.lock')
+        with open(lock_path, 'a') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            try:
+                shutil.rmtree(artifact.path, ignore_errors=True)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        return True
+
+    def evict(self, budget: int, keep: set = (), batch: set = (),
+              dry_run: bool = False) -> list:
+        """Remove the least recently used artifacts over the budget
+
+        :param budget: int bytes the artifacts may use
+        :param keep: set of project names which are never removed
+        :param batch: set of project names removed after the others
+        :param dry_run: bool only print what would be removed
+        :returns: list of removed Artifact
+        """
+        with self._usage() as usage:
+            artifacts = []
+            for artifact in self.scan() + self.scan_zips():
+                try:
+                    artifacts.append((
+                        artifact.project in batch,
+                        self.get_last_use(artifact, usage),
+                        get_disk_usage(artifact.path),
+                        artifact))
+                except FileNotFoundError:
+                    # A zip removed by another run
+                    continue
+            store_size, _ = self.get_store_usage()
+            total = store_size + sum(size for _, _, size, _ in artifacts)
+            print(f"[INFO] Workspace uses {format_size(total)} "
+                  f"of {format_size(budget)}")
+            total -= self._collect_garbage(dry_run)
+
+            removed = []
+            for _, _, size, artifact in sorted(
+                    artifacts, key=lambda a: (a[0], a[1])):
+                if total <= budget:
+                    break
+                if artifact.project in keep or artifact in removed:
+                    continue
+                if not dry_run and not self.remove(artifact):
+                    print(f"[INFO] Skip {artifact.path}: in use")
+                    continue
+                # The worktrees can not be used without their mirror.
+                targets = [(size, artifact)]
+                if artifact.kind == 'mirror':
+                    targets.extend(
+                        (other_size, other)
+                        for _, _, other_size, other in artifacts
+                        if other.project == artifact.project
+                        and other.kind == 'clone' and other not in removed)
+                for target_size, target in targets:
+                    if not dry_run and target.kind == 'clone':
+                        self.remove(target)
+                    action = 'Would remove' if dry_run else 'Removed'
+                    owner = target.project or 'the content store'
+                    print(f"[INFO] {action} {target.kind} of "
+                          f"{owner}: {target.path} "
+                          f"({format_size(target_size)})")
+                    usage.pop(target.path, None)
+                    total -= target_size
+                    removed.append(target)
+                # The pulled files are links to the objects of the
+                # content store, which are freed once nothing else
+                # links them. A dry run does not know which ones.
+                if (not dry_run
+                        and artifact.kind in ('pot', 'translations', 'test')):
+                    total -= self._collect_garbage(dry_run)
+
+            if total > budget:
+                print(f"[INFO] Workspace still uses {format_size(total)}, "
+                      f"the rest is used by the current batch")
+        return removed
+
+    def _collect_garbage(self, dry_run: bool) -> int:
+        """Collect the garbage of the content store and print it"""
+        freed = self.collect_garbage(dry_run)
+        if freed:
+            action = 'Would remove' if dry_run else 'Removed'
+            print(f"[INFO] {action} unlinked objects of the content store "
+                  f"({format_size(freed)})")
+        return freed
+
+    def status(self) -> None:
+        with self._usage() as usage:
+            total = 0
+            for artifact in self.scan() + self.scan_zips():
+                try:
+                    size = get_disk_usage(artifact.path)
+                    last_use = time.strftime(
+                        '%Y-%m-%d %H:%M',
+                        time.localtime(self.get_last_use(artifact, usage)))
+                except FileNotFoundError:
+                    continue
+                total += size
+                print(f"{last_use}  {format_size(size):>8}  "
+                      f"{artifact.kind:<12} {artifact.path}")
+            store_size, garbage = self.get_store_usage()
+            total += store_size
+            print(f"{'':16}  {format_size(store_size):>8}  "
+                  f"{'objects':<12} {self.store_dir} "
+                  f"({format_size(garbage)} not linked)")
+            print(f"Total: {format_size(total)}")
+
+
+def read_list(path):
+    with open(path) as f:
+        return {line.strip() for line in f if line.strip()}
+
+
+def setup_argument_parser():
+    """Setup command line argument parser with subcommands."""
+    parser = argparse.ArgumentParser(
+        description='Keep the migration workspace under a disk budget')
+    parser.add_argument(
+        '--work-dir', required=True, help='Path to the workspace directory')
+    parser.add_argument(
+        '--mirror-dir', default=os.getenv('MIRROR_DIR'),
+        help='Path to the repository mirrors '
+             '(default: MIRROR_DIR environment variable)')
+    parser.add_argument(
+        '--store-dir', default=os.getenv('MIGRATION_STORE_DIR'),
+        help='Path to the content store (default: MIGRATION_STORE_DIR '
+             'environment variable, or store/ of the workspace)')
+    subparser = parser.add_subparsers(
+        dest='command', help='Available commands')
+    # Touch command
+    touch_parser = subparser.add_parser(
+        'touch', help='Record that the artifacts of projects are used now')
+    touch_parser.add_argument('projects', nargs='+', help='Project names')
+    # Evict command
+    evict_parser = subparser.add_parser(
+        'evict', help='Remove least recently used artifacts over the budget')
+    evict_parser.add_argument(
+        '--budget', default=os.getenv('WORKSPACE_BUDGET'),
+        help='Disk budget such as 50G '
+             '(default: WORKSPACE_BUDGET environment variable)')
+    evict_parser.add_argument(
+        '--keep', nargs='*', default=[],
+        help='Projects which are never removed, e.g. the current project')
+    evict_parser.add_argument(
+        '--batch-list', default=os.getenv('BATCH_LIST_FILE'),
+        help='Project list of the current batch. Its projects are removed '
+             'after the others (default: BATCH_LIST_FILE environment '
+             'variable)')
+    evict_parser.add_argument(
+        '--dry-run', action='store_true',
+        help='Print what would be removed without removing it')
+    # Status command
+    subparser.add_parser('status', help='Print the artifacts and last use')
+    return parser
+
+
+def main():
+    parser = setup_argument_parser()
+    args = parser.parse_args()
+    manager = WorkspaceManager(args.work_dir, args.mirror_dir,
+                               args.store_dir)
+
+    if args.command == 'touch':
+        for project in args.projects:
+            manager.touch(project)
+    elif args.command == 'evict':
+        if not args.budget:
+            print("[INFO] Workspace budget is not set, nothing to evict")
+            return
+        try:
+            budget = parse_size(args.budget)
+        except ValueError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+        batch = read_list(args.batch_list) if args.batch_list else set()
+        manager.evict(budget, set(args.keep), batch, args.dry_run)
+    elif args.command == 'status':
+        manager.status()
+    else:
+        parser.print_help()
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
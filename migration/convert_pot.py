@@ -11,9 +11,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 import os
 import polib
 import sys
+import tempfile
+
+
+# Obsolete entries are prefixed with "#~ ".
+# polib converts them as well, so the streaming mode does the same.
+OBSOLETE_PREFIX = '#~ '
 
 
 def convert_pot_file(pot_file):
@@ -49,14 +57,172 @@ def convert_pot_files(pot_file_path):
     convert_pot_file(pot_file_path)
 
 
+def _has_text(msgid_lines):
+    """Check whether the collected msgid literals are not empty.
+
+    The header entry has an empty msgid(msgid "") and is skipped,
+    same as the polib based conversion.
+    """
+    return any(line.strip() != '""' for line in msgid_lines)
+
+
+def convert_pot_lines(lines):
+    """Copy msgid to msgstr on the raw lines of a POT file.
+
+    It works on the gettext syntax directly instead of building
+    the polib object graph, so each line is read only once.
+    Plural entries are left as they are because polib also
+    ignores msgstr for them on save.
+
+    :param lines: iterable of lines including line endings
+    :returns: tuple of (list of converted lines, number of changes)
+    """
+    output = []
+    changes_made = 0
+    msgid_lines = []
+    in_msgid = False
+    is_plural = False
+    skip_msgstr = False
+
+    for line in lines:
+        prefix = OBSOLETE_PREFIX if line.startswith(OBSOLETE_PREFIX) else ''
+        body = line[len(prefix):]
+
+        # Drop the continuation lines of the replaced msgstr.
+        if skip_msgstr:
+            if body.startswith('"'):
+                continue
+            skip_msgstr = False
+
+        if body.startswith('msgid '):
+            msgid_lines = [body[len('msgid '):]]
+            in_msgid = True
+            is_plural = False
+        elif body.startswith('msgid_plural '):
+            in_msgid = False
+            is_plural = True
+        elif in_msgid and body.startswith('"'):
+            msgid_lines.append(body)
+        elif (body.startswith('msgstr ') and not is_plural
+                and _has_text(msgid_lines)):
+            in_msgid = False
+            output.append(f'{prefix}msgstr {msgid_lines[0]}')
+            output.extend(f'{prefix}{msgid}' for msgid in msgid_lines[1:])
+            msgid_lines = []
+            skip_msgstr = True
+            changes_made += 1
+            continue
+        else:
+            in_msgid = False
+
+        output.append(line)
+
+    return output, changes_made
+
+
+def stream_convert_pot_file(pot_file):
+    """Convert a POT file in a single pass and replace it atomically.
+
+    The converted content is written to a temporary file in the same
+    directory and renamed over the original, so a reader never sees
+    a half written file.
+
+    :param pot_file: path to the POT file
+    :returns: tuple of (pot_file, number of changes, error message)
+    """
+    try:
+        with open(pot_file, encoding='utf-8', newline='') as f:
+            lines, changes_made = convert_pot_lines(f)
+
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(pot_file)),
+            prefix='.convert-', suffix='.pot')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                f.writelines(lines)
+            os.chmod(tmp_path, os.stat(pot_file).st_mode & 0o777)
+            os.replace(tmp_path, pot_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except Exception as e:
+        return pot_file, 0, str(e)
+
+    return pot_file, changes_made, None
+
+
+def collect_pot_files(paths):
+    """Expand the given paths into a sorted list of POT files.
+
+    Directories are searched recursively for *.pot files.
+
+    :param paths: list of POT file or directory paths
+    :returns: list of POT file paths
+    """
+    pot_files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                pot_files.update(
+                    os.path.join(root, name)
+                    for name in files if name.endswith('.pot'))
+        elif os.path.isfile(path):
+            pot_files.add(path)
+        else:
+            print(f"POT file {path} does not exist")
+    return sorted(pot_files)
+
+
+def batch_convert_pot_files(paths, jobs=None):
+    """Convert many POT files in parallel.
+
+    :param paths: list of POT file or directory paths
+    :param jobs: number of worker processes (default: all cores)
+    :returns: number of files that failed to convert
+    """
+    pot_files = collect_pot_files(paths)
+    print(f"Converting {len(pot_files)} POT files "
+          f"with {jobs or os.cpu_count()} workers")
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for pot_file, changes_made, error in executor.map(
+                stream_convert_pot_file, pot_files, chunksize=4):
+            if error:
+                failed += 1
+                print(f"    Error converting {pot_file}: {error}")
+            else:
+                print(f"Converted {pot_file}: {changes_made} entries")
+    return failed
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='Convert POT files by copying msgid content to msgstr')
+    parser.add_argument(
+        'paths', nargs='+',
+        help='POT files or directories containing POT files.')
+    parser.add_argument(
+        '-b', '--batch', action='store_true',
+        help='Use the streaming converter in parallel. It is enabled '
+             'automatically for several paths or a directory.')
+    parser.add_argument(
+        '-j', '--jobs', type=int, default=None,
+        help='Number of worker processes (default: number of cores).')
+    return parser.parse_args()
+
+
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python3 polib.py <pot_file_path>")
-        print("  Converts POT files by copying msgid content to msgstr")
-        sys.exit(1)
+    args = get_args()
 
-    pot_file_path = sys.argv[1]
-    convert_pot_files(pot_file_path)
+    is_batch = (args.batch or len(args.paths) > 1
+                or os.path.isdir(args.paths[0]))
+    if not is_batch:
+        convert_pot_files(args.paths[0])
+        return
+
+    if batch_convert_pot_files(args.paths, args.jobs):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
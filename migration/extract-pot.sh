@@ -0,0 +1,189 @@
+#!/bin/bash
+# Extract the pot files of a python or django project in parallel
+# extract-pot.sh
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+# The extractions of the modules, the django domains(django, djangojs),
+# the releasenotes and the documents read different files and write
+# different pot files, so they run at the same time.
+# Each job copies its pot files into the pot directory atomically, and
+# the components are listed after all jobs finished, in the same order
+# as the sequential extraction.
+
+source $SCRIPTSDIR/pretty-printer.sh
+
+# Number of extractions running at the same time
+MAX_EXTRACT_JOBS=${MAX_EXTRACT_JOBS:-$(nproc)}
+
+# Run an extraction job in background, waiting for a free slot first.
+# The output of the job is kept in a log file and printed when all jobs
+# finished, so that the outputs of the jobs are not interleaved.
+function start_extract_job {
+    local name=$1
+    shift
+
+    while [ "$(jobs -rp | wc -l)" -ge "$MAX_EXTRACT_JOBS" ]; do
+        wait -n
+    done
+    (
+        if ! "$@" > "$EXTRACT_JOB_DIR/$name.log" 2>&1; then
+            touch "$EXTRACT_JOB_DIR/$name.failed"
+        fi
+    ) &
+    EXTRACT_JOBS+=("$name")
+}
+
+function wait_extract_jobs {
+    local name
+
+    wait
+    for name in "${EXTRACT_JOBS[@]}"; do
+        debug "Extraction job: $name"
+        cat "$EXTRACT_JOB_DIR/$name.log"
+        if [ -f "$EXTRACT_JOB_DIR/$name.failed" ]; then
+            fail "Failed to extract messages: $name"
+        fi
+    done
+}
+
+function extract_releasenotes_job {
+    extract_messages_releasenotes
+    preprocess_releasenotes_pot
+}
+
+function extract_python_job {
+    local modulename=$1
+
+    extract_messages_python "$modulename"
+    preprocess_python_pot "$modulename" "$modulename"
+}
+
+function extract_django_job {
+    local modulename=$1
+    local domain=$2
+    local dest_modulename=$3
+
+    extract_messages_django_domain "$modulename" "$domain"
+    if [ -f "$modulename/locale/$domain.pot" ]; then
+        preprocess_django_pot "$modulename" "$domain" "$dest_modulename"
+    fi
+}
+
+function extract_doc_job {
+    local doc_pot_file
+
+    extract_messages_doc
+    preprocess_doc_pot "doc"
+    for doc_pot_file in doc/source/locale/doc-*.pot; do
+        if [[ -f "$doc_pot_file" ]]; then
+            preprocess_doc_pot "$(basename "$doc_pot_file" .pot)"
+        fi
+    done
+}
+
+# Get the component name of a domain of a django module.
+# In Weblate, we can't use multiple components name in a project.
+# If it has multiple Django modules, we set name <module_name>-django/djangojs
+# to identify the module in weblate.
+# e.g. horizon-django, openstack-dashboard-django
+function get_django_component_name {
+    local modulename=$1
+    local domain=$2
+    local is_multiple=$3
+
+    if [ "$is_multiple" == "true" ]; then
+        # The module name basically use _ as separator.
+        # In weblate, we need to use -.
+        echo "${modulename//_/-}-${domain}"
+    else
+        echo "$domain"
+    fi
+}
+
+# Extract the pot files of all modules of a python or django project
+# and add the components to COMPONENTS.
+# It should be run in the cloned project directory.
+function extract_project_pots {
+    local python_module_names
+    local django_module_names
+    local is_multiple=false
+    local has_releasenotes=false
+    local has_doc=false
+    local modulename
+    local domain
+    local doc_pot_file
+
+    python_module_names=($(python3 $SCRIPTSDIR/get-modulename.py -p $PROJECT -t python -f setup.cfg))
+    debug "Python module names: ${python_module_names[*]}"
+    django_module_names=($(python3 $SCRIPTSDIR/get-modulename.py -p $PROJECT -t django -f setup.cfg))
+    debug "Django module names: ${django_module_names[*]}"
+    if [ ${#django_module_names[@]} -ge 2 ]; then
+        is_multiple=true
+    fi
+
+    if [[ -f releasenotes/source/conf.py ]]; then
+        if [[ ${#python_module_names[@]} -gt 0 && "$ZANATA_VERSION" == "master" ]] \
+            || [[ ${#django_module_names[@]} -gt 0 ]]; then
+            has_releasenotes=true
+        fi
+    fi
+    if [[ -f doc/source/conf.py && ${DOC_TARGETS[*]} =~ "$PROJECT" ]]; then
+        has_doc=true
+    fi
+
+    EXTRACT_JOBS=()
+    EXTRACT_JOB_DIR=$(mktemp -d)
+    debug "Extract messages with up to $MAX_EXTRACT_JOBS jobs"
+
+    if [ "$has_releasenotes" == "true" ]; then
+        start_extract_job "releasenotes" extract_releasenotes_job
+    fi
+    for modulename in "${python_module_names[@]}"; do
+        start_extract_job "python-$modulename" extract_python_job "$modulename"
+    done
+    for modulename in "${django_module_names[@]}"; do
+        for domain in djangojs django; do
+            start_extract_job "$domain-$modulename" extract_django_job \
+                "$modulename" "$domain" \
+                "$(get_django_component_name "$modulename" "$domain" "$is_multiple")"
+        done
+    done
+    if [ "$has_doc" == "true" ]; then
+        start_extract_job "doc" extract_doc_job
+    fi
+    wait_extract_jobs
+    rm -rf "$EXTRACT_JOB_DIR"
+
+    if [ "$has_releasenotes" == "true" ]; then
+        COMPONENTS+=("releasenotes")
+    fi
+    for modulename in "${python_module_names[@]}"; do
+        COMPONENTS+=("$modulename")
+    done
+    for modulename in "${django_module_names[@]}"; do
+        for domain in django djangojs; do
+            if [ -f "$modulename/locale/$domain.pot" ]; then
+                COMPONENTS+=("$(get_django_component_name "$modulename" "$domain" "$is_multiple")")
+            fi
+        done
+    done
+    if [ "$has_doc" == "true" ]; then
+        COMPONENTS+=("doc")
+        for doc_pot_file in doc/source/locale/doc-*.pot; do
+            if [[ -f "$doc_pot_file" ]]; then
+                COMPONENTS+=("$(basename "$doc_pot_file" .pot)")
+            fi
+        done
+    fi
+}
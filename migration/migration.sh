@@ -28,6 +28,7 @@ ZANATA_VERSION=${BRANCHNAME//\//-}
 COMPONENTS=()
 
 SCRIPTSDIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+source $SCRIPTSDIR/extract-pot.sh
 source $SCRIPTSDIR/po-utils.sh
 source $SCRIPTSDIR/prepare-weblate.sh
 source $SCRIPTSDIR/prepare-workspace.sh
@@ -133,95 +134,12 @@ case "$PROJECT" in
         COMPONENTS+=("i18n")
         ;;
     *)
-        # ---- Python projects ----
+        # ---- Python and Django projects ----
         # Common setup for python and django repositories
         setup_project "$PROJECT" "$ZANATA_VERSION"
-        module_names=$(python3 $SCRIPTSDIR/get-modulename.py -p $PROJECT -t python -f setup.cfg)
-        debug "Python module names: $module_names"
-        if [ -n "$module_names" ]; then
-            if [[ "$ZANATA_VERSION" == "master" && -f releasenotes/source/conf.py ]]; then
-                extract_messages_releasenotes
-                preprocess_releasenotes_pot
-                COMPONENTS+=("releasenotes")
-            fi
-            for modulename in $module_names; do
-                extract_messages_python "$modulename"
-                preprocess_python_pot "$modulename" "$modulename"
-                COMPONENTS+=("$modulename")
-            done
-        fi
-
-        # ---- Django projects ----
-        module_names=$(python3 $SCRIPTSDIR/get-modulename.py -p $PROJECT -t django -f setup.cfg)
-        debug "Django module names: $module_names"
-        # Convert array for proper counting
-        # In Weblate, we can't use multiple components name in a project.
-        # If it has multiple Django modules, we set name <module_name>-django/djangojs
-        # to identify the module in weblate. 
-        # e.g. horizon-django, openstack-dashboard-django
-        django_module_names=($module_names)
-
-        if [ ${#django_module_names[@]} -ge 2 ]; then
-            is_multiple=true
-        else
-            is_multiple=false
-        fi
-
-        if [ -n "$module_names" ]; then
-            if [[ -f releasenotes/source/conf.py ]]; then
-                extract_messages_releasenotes
-                preprocess_releasenotes_pot
-                COMPONENTS+=("releasenotes")
-            fi
-
-            # Check if the project has multiple Django modules
-            # If it has, we set name <module_name>-django/djangojs
-            for modulename in ${django_module_names[@]}; do
-                # Extract messages and generate pot files for all Django modules
-                extract_messages_django "$modulename"
-
-                if [ -f "$modulename/locale/django.pot" ]; then
-                    dest_modulename="django"
-                    if [ "$is_multiple" == "true" ]; then
-                        # The module name basically use _ as separator.
-                        # In weblate, we need to use -.
-                        module_name_hyphenated=$(echo "$modulename" | sed 's/_/-/g')
-                        dest_modulename="${module_name_hyphenated}-django"
-                    fi
-
-                    preprocess_django_pot "$modulename" "django" "$dest_modulename"
-                    COMPONENTS+=("$dest_modulename")
-                fi
-
-                if [ -f "$modulename/locale/djangojs.pot" ]; then
-                    dest_modulename="djangojs"
-                    if [ "$is_multiple" == "true" ]; then
-                        module_name_hyphenated=$(echo "$modulename" | sed 's/_/-/g')
-                        dest_modulename="${module_name_hyphenated}-djangojs"
-                    fi
-                    preprocess_django_pot "$modulename" "djangojs" "$dest_modulename"
-                    COMPONENTS+=("$dest_modulename")
-                fi
-            done
-        fi
-
-        # ---- Documentation ----
-        if [[ -f doc/source/conf.py ]]; then
-            # Let's test this with some repos :)
-            if [[ ${DOC_TARGETS[*]} =~ "$PROJECT" ]]; then
-                extract_messages_doc
-                preprocess_doc_pot "doc"
-                COMPONENTS+=("doc")
-
-                for doc_pot_file in doc/source/locale/doc-*.pot; do
-                    if [[ -f "$doc_pot_file" ]]; then
-                        doc_component_name=$(basename "$doc_pot_file" .pot)
-                        preprocess_doc_pot "$doc_component_name"
-                        COMPONENTS+=("$doc_component_name")
-                    fi
-                done
-            fi
-        fi
+        # The modules, django domains, releasenotes and documents are
+        # extracted in parallel.
+        extract_project_pots
         ;;
 esac
 
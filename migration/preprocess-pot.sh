@@ -19,44 +19,58 @@ POT_DIR="$HOME/workspace/projects/$PROJECT/pot"
 
 source $SCRIPTSDIR/pretty-printer.sh
 
+# Copy a pot file into the pot directory atomically, so that a
+# component never reads a partially written file while the pot files
+# are extracted in parallel.
+function publish_pot {
+    local src=$1
+    local dest=$2
+    local tmp="$dest.tmp.$BASHPID"
+
+    cp "$src" "$tmp" && mv -f "$tmp" "$dest"
+    local ret=$?
+    rm -f "$tmp"
+    return $ret
+}
+
 function preprocess_api_site_pot {
     # python3 $SCRIPTSDIR/convert_pot.py $PROJECT_DIR/api-quick-start/locale/api-quick-start.pot
     # python3 $SCRIPTSDIR/convert_pot.py $PROJECT_DIR/firstapp/locale/firstapp.pot
 
-    cp $PROJECT_DIR/api-quick-start/locale/api-quick-start.pot "$POT_DIR/api-quick-start.pot"
-    cp $PROJECT_DIR/firstapp/locale/firstapp.pot "$POT_DIR/firstapp.pot"
+    publish_pot $PROJECT_DIR/api-quick-start/locale/api-quick-start.pot "$POT_DIR/api-quick-start.pot"
+    publish_pot $PROJECT_DIR/firstapp/locale/firstapp.pot "$POT_DIR/firstapp.pot"
 }
 
 function preprocess_security_doc_pot {
     # python3 $SCRIPTSDIR/convert_pot.py security-guide/locale/security-guide.pot
-    cp $PROJECT_DIR/security-guide/locale/security-guide.pot "$POT_DIR/security-guide.pot"
+    publish_pot $PROJECT_DIR/security-guide/locale/security-guide.pot "$POT_DIR/security-guide.pot"
 }
 
 function preprocess_doc_pot {
     local doc_name=$1
 
     # python3 $SCRIPTSDIR/convert_pot.py $PROJECT_DIR/doc/source/locale/$doc_name.pot
-    cp $PROJECT_DIR/doc/source/locale/$doc_name.pot "$POT_DIR/$doc_name.pot"
+    publish_pot $PROJECT_DIR/doc/source/locale/$doc_name.pot "$POT_DIR/$doc_name.pot"
 }
 
 function preprocess_releasenotes_pot {
     # python3 $SCRIPTSDIR/convert_pot.py $PROJECT_DIR/releasenotes/source/locale/releasenotes.pot
-    cp $PROJECT_DIR/releasenotes/source/locale/releasenotes.pot "$POT_DIR/releasenotes.pot"
+    publish_pot $PROJECT_DIR/releasenotes/source/locale/releasenotes.pot "$POT_DIR/releasenotes.pot"
 }
 
 function preprocess_training_guides_pot {
     # python3 $SCRIPTSDIR/convert_pot.py $PROJECT_DIR/doc/upstream-training/source/locale/upstream-training.pot
-    cp $PROJECT_DIR/doc/upstream-training/source/locale/upstream-training.pot "$POT_DIR/upstream-training.pot"
+    publish_pot $PROJECT_DIR/doc/upstream-training/source/locale/upstream-training.pot "$POT_DIR/upstream-training.pot"
 }
 
 function preprocess_i18n_pot {
     # python3 $SCRIPTSDIR/convert_pot.py $PROJECT_DIR/doc/locale/i18n.pot
-    cp $PROJECT_DIR/doc/locale/i18n.pot "$POT_DIR/i18n.pot"
+    publish_pot $PROJECT_DIR/doc/locale/i18n.pot "$POT_DIR/i18n.pot"
 }
 
 function preprocess_reactjs_pot {
     # python3 $SCRIPTSDIR/convert_pot.py $PROJECT_DIR/i18n/locale/i18n.pot
-    cp $PROJECT_DIR/i18n/locale/i18n.pot "$POT_DIR/i18n.pot"
+    publish_pot $PROJECT_DIR/i18n/locale/i18n.pot "$POT_DIR/i18n.pot"
 }
 
 function preprocess_python_pot {
@@ -64,7 +78,7 @@ function preprocess_python_pot {
     local dest_modulename=$2
 
     # python3 $SCRIPTSDIR/convert_pot.py $PROJECT_DIR/$modulename/locale/$modulename.pot
-    cp $PROJECT_DIR/$modulename/locale/$modulename.pot "$POT_DIR/$dest_modulename.pot"
+    publish_pot $PROJECT_DIR/$modulename/locale/$modulename.pot "$POT_DIR/$dest_modulename.pot"
 }
 
 function preprocess_django_pot {
@@ -73,5 +87,5 @@ function preprocess_django_pot {
     local dest_modulename=$3
 
     # python3 $SCRIPTSDIR/convert_pot.py $PROJECT_DIR/$modulename/locale/$target_modulename.pot
-    cp $PROJECT_DIR/$modulename/locale/$target_modulename.pot "$POT_DIR/$dest_modulename.pot"
+    publish_pot $PROJECT_DIR/$modulename/locale/$target_modulename.pot "$POT_DIR/$dest_modulename.pot"
 }
\ No newline at end of file
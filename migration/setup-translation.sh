@@ -28,6 +28,15 @@ ERROR_ABORT=1
 
 # HORIZON_DIR="$SCRIPTSDIR/workspace/projects/horizon"
 
+# Sphinx doctrees of the documents are kept per project and branch in
+# $SPHINX_CACHE_DIR/<project>/<branch>/, so the next extraction only
+# reads the changed source files.
+SPHINX_CACHE_DIR=${SPHINX_CACHE_DIR:-"$HOME/.cache/openstack-weblate-migration/sphinx"}
+
+# Modified time of the files unchanged since the cached build.
+# It is older than any build, so Sphinx does not read them again.
+SPHINX_UNCHANGED_MTIME="2000-01-01 00:00:00"
+
 # List of repos that have doc/source translated, we test with a smaller
 # set for now.
 DOC_TARGETS=('contributor-guide'
@@ -250,36 +259,116 @@ function extract_messages_python {
 # and djangojs.pot.
 function extract_messages_django {
     local modulename=$1
-    local pot
-
-    KEYWORDS="-k gettext_noop -k gettext_lazy -k ngettext_lazy:1,2"
-    KEYWORDS+=" -k ugettext_noop -k ugettext_lazy -k ungettext_lazy:1,2"
-    KEYWORDS+=" -k npgettext:1c,2,3 -k pgettext_lazy:1c,2 -k npgettext_lazy:1c,2,3"
 
     for DOMAIN in djangojs django ; do
-        if [ -f babel-${DOMAIN}.cfg ]; then
-            mkdir -p ${modulename}/locale
-            pot=${modulename}/locale/${DOMAIN}.pot
-            touch ${pot}
-            pybabel ${QUIET} extract -F babel-${DOMAIN}.cfg \
-                --add-comments Translators: \
-                --msgid-bugs-address="https://bugs.launchpad.net/openstack-i18n/" \
-                --project=${PROJECT} --version=${VERSION} \
-                $KEYWORDS \
-                -o ${pot} ${modulename}
-            check_empty_pot ${pot}
-        fi
+        extract_messages_django_domain "$modulename" "$DOMAIN"
     done
 }
 
+# Extract messages of a domain(django or djangojs) of a django module.
+# The domains are independent, so they can be extracted in parallel.
+function extract_messages_django_domain {
+    local modulename=$1
+    local domain=$2
+    local pot
+    local keywords
+
+    keywords="-k gettext_noop -k gettext_lazy -k ngettext_lazy:1,2"
+    keywords+=" -k ugettext_noop -k ugettext_lazy -k ungettext_lazy:1,2"
+    keywords+=" -k npgettext:1c,2,3 -k pgettext_lazy:1c,2 -k npgettext_lazy:1c,2,3"
+
+    if [ -f babel-${domain}.cfg ]; then
+        mkdir -p ${modulename}/locale
+        pot=${modulename}/locale/${domain}.pot
+        touch ${pot}
+        pybabel ${QUIET} extract -F babel-${domain}.cfg \
+            --add-comments Translators: \
+            --msgid-bugs-address="https://bugs.launchpad.net/openstack-i18n/" \
+            --project=${PROJECT} --version=${VERSION} \
+            $keywords \
+            -o ${pot} ${modulename}
+        check_empty_pot ${pot}
+    fi
+}
+
+# Prepare the Sphinx cache of the current project and branch.
+# A new branch starts from the most recently used cache of another
+# branch, because most documents are the same between the branches.
+function prepare_sphinx_cache {
+    local cache_dir=$1
+    local seed_dir
+
+    if [ -f "$cache_dir/sources.txt" ]; then
+        return 0
+    fi
+    mkdir -p "$cache_dir"
+    seed_dir=$(ls -td "$SPHINX_CACHE_DIR/$PROJECT"/*/ 2>/dev/null \
+        | grep -v "^$cache_dir/$" | head -n 1)
+    if [ -n "$seed_dir" ] && [ -f "$seed_dir/sources.txt" ]; then
+        echo "[INFO] Seed Sphinx cache from $(basename $seed_dir)"
+        rm -rf "$cache_dir/doctrees"
+        cp -a "$seed_dir/doctrees" "$cache_dir/doctrees" \
+            && cp "$seed_dir/sources.txt" "$cache_dir/sources.txt"
+    fi
+}
+
+# List the tracked files as "<blob id><tab><path>"
+function list_git_blobs {
+    git -c core.quotePath=false ls-files -s \
+        | sed 's/^[0-9]* \([0-9a-f]*\) [0-9]*\t/\1\t/'
+}
+
+# Sphinx reads a document again when its source file or one of its
+# dependencies is newer than the cached build. The files of a fresh
+# checkout are all new, so the modified times are set from the git
+# blob ids recorded by the cached build: unchanged files get an old
+# time and changed files get the current time.
+function restore_sphinx_mtimes {
+    local cache_dir=$1
+    local sources="$cache_dir/sources.txt"
+
+    if [ ! -f "$sources" ]; then
+        return 0
+    fi
+    list_git_blobs | awk -F '\t' -v out="$cache_dir/changed.txt" '
+        NR == FNR { cached[$2] = $1; next }
+        { if (cached[$2] == $1) print $2; else print $2 > out }
+    ' "$sources" - > "$cache_dir/unchanged.txt"
+    # -c does not create the files out of a sparse checkout.
+    tr '\n' '\0' < "$cache_dir/unchanged.txt" \
+        | xargs -0 -r touch -c -d "$SPHINX_UNCHANGED_MTIME"
+    if [ -f "$cache_dir/changed.txt" ]; then
+        tr '\n' '\0' < "$cache_dir/changed.txt" | xargs -0 -r touch -c
+    fi
+    rm -f "$cache_dir/unchanged.txt" "$cache_dir/changed.txt"
+}
+
+# Record the git blob ids of the files the cached build has read
+function save_sphinx_sources {
+    local cache_dir=$1
+
+    list_git_blobs > "$cache_dir/sources.txt.tmp" \
+        && mv -f "$cache_dir/sources.txt.tmp" "$cache_dir/sources.txt"
+}
+
 # Extract doc messages
 function extract_messages_doc {
+    local cache_dir="$SPHINX_CACHE_DIR/$PROJECT/$ZANATA_VERSION"
+
     # Temporary build folder for gettext
     mkdir -p doc/build/gettext
 
+    prepare_sphinx_cache "$cache_dir"
+    restore_sphinx_mtimes "$cache_dir"
+
     # Extract messages
-    $VENV_DIR/bin/sphinx-build -b gettext doc/source \
-        doc/build/gettext/
+    if $VENV_DIR/bin/sphinx-build -b gettext -d "$cache_dir/doctrees" \
+        doc/source doc/build/gettext/; then
+        save_sphinx_sources "$cache_dir"
+    else
+        # The doctrees may not match the recorded files anymore.
+        rm -f "$cache_dir/sources.txt"
+    fi
     # Manipulates pot translation sources if needed
     if [[ -f tools/doc-pot-filter.sh ]]; then
         tools/doc-pot-filter.sh
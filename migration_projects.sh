@@ -22,6 +22,8 @@ if [ ! -f "$VERSION_FILE" ]; then
 fi
 
 MIGRATION_SCRIPT="$(dirname "$0")/migration_resources.sh"
+# Copies the output to the log files in the background
+LOG_TEE="$(dirname "$0")/common/migration_log.py"
 
 if [ ! -f "$MIGRATION_SCRIPT" ]; then
     echo "Error: migration_resources.sh file does not exist in '$MIGRATION_SCRIPT'."
@@ -37,6 +39,10 @@ fi
 # Make logs directory
 mkdir -p logs
 
+# The workspace manager removes the artifacts of the projects
+# in this batch after the others.
+export BATCH_LIST_FILE="$(realpath "$LIST_FILE")"
+
 echo "=== Migration starts ==="
 echo "Project file: $LIST_FILE"
 echo "Version file: $VERSION_FILE"
@@ -59,6 +65,23 @@ while IFS= read -r project || [ -n "$project" ]; do
     
     echo ""
     echo "=== Project: $project ==="
+
+    # With PARALLEL_VERSIONS=true, all versions of the project run
+    # at the same time. The output is already prefixed with the version.
+    if [ "$PARALLEL_VERSIONS" == "true" ]; then
+        LOG_FILE="logs/$project/project.${TIMESTAMP}.log"
+        ERROR_LOG="logs/$project/error.${TIMESTAMP}.log"
+        ((total_count++))
+        if "$(dirname "$0")/migration_versions.sh" "$project" "$VERSION_FILE" 2>&1 \
+            | python3 -u "$LOG_TEE" tee --log-file "$LOG_FILE" --error-log "$ERROR_LOG"; \
+            [ ${PIPESTATUS[0]} -eq 0 ]; then
+            echo "[$total_count] Success: '$project' (all versions)"
+        else
+            echo "[$total_count] Failed: '$project' (all versions)"
+        fi
+        echo "---"
+        continue
+    fi
     
     # Iterate over the versions
     while IFS= read -r version || [ -n "$version" ]; do
@@ -77,16 +100,12 @@ while IFS= read -r project || [ -n "$project" ]; do
         LOG_FILE="logs/$project/project.${TIMESTAMP}.log"
         ERROR_LOG="logs/$project/error.${TIMESTAMP}.log"
         
-        # run migration.sh and save the log to the log file
-        
-        if "$MIGRATION_SCRIPT" "$project" "$version" 2>&1 | while IFS= read -r line; do
-            # save the version to the log file
-            echo "$version | $line" | tee -a "$LOG_FILE"
-            # save the error line to the error log file
-            if [[ "$line" == \[ERROR\]* ]]; then
-                echo "$version | $line" >> "$ERROR_LOG"
-            fi
-        done; then
+        # run migration.sh and save the log to the log file,
+        # prefixed with the version, and the error lines to the error log
+        if "$MIGRATION_SCRIPT" "$project" "$version" 2>&1 \
+            | python3 -u "$LOG_TEE" tee --log-file "$LOG_FILE" --error-log "$ERROR_LOG" \
+                --prefix "$version | "; \
+            [ ${PIPESTATUS[0]} -eq 0 ]; then
             echo "[$total_count] Success: '$project' (version: $version)"
         else
             echo "[$total_count] Failed: '$project' (version: $version) (exit code: $?)"
@@ -13,9 +13,51 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+# The migration runs in three stages: pull (clone the project, pull
+# the translations from Zanata and discover the components), upload
+# (create the Weblate components and translations) and verify.
+# batch_migration/scheduler.py runs them as a pipeline with --stage.
+# All stages run by default.
+MIGRATION_STAGE=${MIGRATION_STAGE:-"all"}
+
+# With --resume, the steps completed by a failed run are skipped.
+# See common/journal.py.
+while [[ "$1" == --* ]]; do
+    case "$1" in
+        --resume)
+            export MIGRATION_RESUME=true
+            shift
+            ;;
+        --stage)
+            MIGRATION_STAGE=$2
+            shift 2
+            ;;
+        *)
+            echo "[ERROR] Unknown option: $1"
+            exit 1
+            ;;
+    esac
+done
+
+case "$MIGRATION_STAGE" in
+    all|pull|upload|verify)
+        ;;
+    *)
+        echo "[ERROR] Unknown stage: $MIGRATION_STAGE"
+        exit 1
+        ;;
+esac
+
+function run_stage {
+    [ "$MIGRATION_STAGE" == "all" ] || [ "$MIGRATION_STAGE" == "$1" ]
+}
+
 PROJECT=$1
 BRANCH_NAME=${2:-"master"}
 WORKSPACE_NAME=${3:-"workspace"}
+# Set BUNDLE_TRANSLATIONS=true to create each component together with
+# all of its translations in a single request.
+BUNDLE_TRANSLATIONS=${BUNDLE_TRANSLATIONS:-"false"}
 
 # Replace /'s in branch names with -'s because Zanata doesn't
 # allow /'s in version names.
@@ -32,6 +74,9 @@ source $SCRIPTSDIR/prepare_component_name/get_project_component_name.sh
 source $SCRIPTSDIR/prepare_weblate_components/create_weblate_components.sh
 source $SCRIPTSDIR/test_accuracy/test.sh
 
+# Components discovered by the pull stage
+COMPONENT_LIST=$PROJECT_WORK_DIR/components.txt
+
 # We need a UTF-8 locale, set it properly in case it's not set.
 export LANG=en_US.UTF-8
 
@@ -48,79 +93,110 @@ if [ -z "$WEBLATE_TOKEN" ] || [ "$WEBLATE_TOKEN" == "<weblate_token>" ]; then
 fi
 echo "[INFO] WEBLATE_URL and WEBLATE_TOKEN are set"
 
-echo "[INFO] Setup environment and prepare workspace"
-if ! setup_env_and_prepare_workspace "$PROJECT"; then
-    echo "[ERROR] Failed to setup environment and prepare workspace"
-    exit 1
+if [ "$PREPARED_PROJECT" == "true" ]; then
+    # migration_versions.sh already set up the environment,
+    # the mirror and the Weblate project.
+    echo "[INFO] Prepare $ZANATA_VERSION workspace"
+    source "$WORK_DIR/.venv/bin/activate"
+    prepare_project_workspace "$PROJECT"
+else
+    echo "[INFO] Setup environment and prepare workspace"
+    if ! setup_env_and_prepare_workspace "$PROJECT"; then
+        echo "[ERROR] Failed to setup environment and prepare workspace"
+        exit 1
+    fi
 fi
+start_daemon || exit 1
 
-echo "[INFO] Clone $PROJECT project"
-if ! clone_project "$PROJECT" "$ZANATA_VERSION"; then
-    echo "[ERROR] Failed to clone $PROJECT project"
-    exit 1
-fi
+if run_stage pull; then
+    start_journal || exit 1
 
-case $PROJECT in
-    api-site)
-        setup_manuals
-        pull_translation_files
-        COMPONENTS+=("api-quick-start")
-        COMPONENTS+=("firstapp")
-        ;;
-    
-    security-doc)
-        setup_manuals
-        pull_translation_files
-        COMPONENTS+=("security-guide")
-        ;;
-    openstack-manuals)
-        setup_manuals
-        pull_translation_files
-        COMPONENTS+=("doc")
-        ;;
-    i18n)
-        setup_i18n
-        pull_translation_files
-        COMPONENTS+=("doc")
-        ;;
-    training-guides)
-        setup_training_guides
-        pull_translation_files
-        COMPONENTS+=("doc")
-        ;;
-    tripleo-ui)
-        setup_reactjs_project
-        pull_translation_files
-        COMPONENTS+=("i18n")
-        ;;
-    *)
-        setup_project
-        pull_translation_files
-        
-        COMPONENTS+=($(get_python_component_names))
-        COMPONENTS+=($(get_django_component_names))
-        COMPONENTS+=($(get_doc_component_names))
-        ;;
-esac
+    echo "[INFO] Clone $PROJECT project"
+    if is_step_done clone && [ -e "$CLONED_PROJECT_DIR/.git" ]; then
+        echo "[INFO] Skip completed step: clone"
+    elif clone_project "$PROJECT" "$ZANATA_VERSION"; then
+        record_step clone
+    else
+        echo "[ERROR] Failed to clone $PROJECT project"
+        exit 1
+    fi
+    update_workspace_usage
 
-# In bash script, it did not handle duplication.
-# So we need to delete duplicated components.
-if [ ${#COMPONENTS[@]} -eq 0 ]; then
-    fail "No components to process"
-    exit 1
+    case $PROJECT in
+        api-site)
+            setup_manuals
+            pull_translation_files
+            COMPONENTS+=("api-quick-start")
+            COMPONENTS+=("firstapp")
+            ;;
+
+        security-doc)
+            setup_manuals
+            pull_translation_files
+            COMPONENTS+=("security-guide")
+            ;;
+        openstack-manuals)
+            setup_manuals
+            pull_translation_files
+            COMPONENTS+=("doc")
+            ;;
+        i18n)
+            setup_i18n
+            pull_translation_files
+            COMPONENTS+=("doc")
+            ;;
+        training-guides)
+            setup_training_guides
+            pull_translation_files
+            COMPONENTS+=("doc")
+            ;;
+        tripleo-ui)
+            setup_reactjs_project
+            pull_translation_files
+            COMPONENTS+=("i18n")
+            ;;
+        *)
+            setup_project
+            pull_translation_files
+
+            COMPONENTS+=($(discover_components))
+            ;;
+    esac
+
+    # In bash script, it did not handle duplication.
+    # So we need to delete duplicated components.
+    if [ ${#COMPONENTS[@]} -eq 0 ]; then
+        fail "No components to process"
+        exit 1
+    fi
+    # The later stages read the components of the pull stage.
+    printf '%s\n' "${COMPONENTS[@]}" > "$COMPONENT_LIST"
+else
+    if [ ! -f "$COMPONENT_LIST" ]; then
+        echo "[ERROR] $COMPONENT_LIST does not exist. Run the pull stage first"
+        exit 1
+    fi
+    mapfile -t COMPONENTS < "$COMPONENT_LIST"
 fi
 echo "[INFO] Components to migrate: ${COMPONENTS[@]}"
 
-echo "[INFO] Create Weblate components"
-create_weblate_components
+if run_stage upload; then
+    echo "[INFO] Create Weblate components"
+    create_weblate_components
+fi
 
-echo "[INFO] Start Accuracy Test"
-test_accuracy
+if run_stage verify; then
+    echo "[INFO] Start Accuracy Test"
+    test_accuracy
 
-# Clean
-echo "[INFO] Clean up workspace directory"
-# Not remove the project repository for reuse.
-# TODO: Create code for cleanup all projects.
-rm -rf $HOME/$WORKSPACE_NAME/projects/pot
-rm -rf $HOME/$WORKSPACE_NAME/projects/translations
+    # Clean
+    echo "[INFO] Clean up workspace directory"
+    # The repository and the pulled files are kept for reuse.
+    # When the workspace uses more than WORKSPACE_BUDGET(e.g. 50G),
+    # the least recently used artifacts of the other projects are removed.
+    update_workspace_usage
+    python3 -u $SCRIPTSDIR/common/workspace_manager.py \
+        --work-dir $WORK_DIR --mirror-dir $MIRROR_DIR \
+        evict --keep $PROJECT $WORKSPACE_KEEP
+fi
 exit 0
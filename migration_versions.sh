@@ -0,0 +1,88 @@
+#!/bin/bash
+# Migrate all versions of a project concurrently
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+# Each version gets its own git worktree of the shared mirror and its
+# own workspace directory(projects/<project>/versions/<version>/),
+# and migration_resources.sh runs for all versions at the same time.
+# The environment, the mirror, the Weblate project and the glossary
+# are shared by the versions, so they are prepared once before.
+# Each version still creates its own Weblate category.
+
+PROJECT=$1
+VERSION_FILE=${2:-"version.txt"}
+WORKSPACE_NAME=${3:-"workspace"}
+
+if [ -z "$PROJECT" ]; then
+    echo "Usage: $0 <project> [version_file] [workspace_name]"
+    exit 1
+fi
+
+if [ ! -f "$VERSION_FILE" ]; then
+    echo "[ERROR] File '$VERSION_FILE' does not exist."
+    exit 1
+fi
+
+VERSIONS=()
+while IFS= read -r version || [ -n "$version" ]; do
+    version=$(echo "$version" | xargs)
+    if [ -n "$version" ]; then
+        VERSIONS+=("$version")
+    fi
+done < "$VERSION_FILE"
+
+export VERSION_WORKSPACE=true
+
+SCRIPTSDIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+"$SCRIPTSDIR/prepare_project.sh" "$PROJECT" "$WORKSPACE_NAME" || exit 1
+
+source $SCRIPTSDIR/setup_env/setup.sh
+source $SCRIPTSDIR/prepare_translations/get_zanata_xml.sh
+export PREPARED_PROJECT=true
+
+# Worktrees are added one by one, because they share the
+# administrative files of the mirror.
+for version in "${VERSIONS[@]}"; do
+    BRANCH_NAME=$version
+    ZANATA_VERSION=${version//\//-}
+    PROJECT_WORK_DIR=$(get_project_work_dir "$PROJECT" "$ZANATA_VERSION")
+    CLONED_PROJECT_DIR="$PROJECT_WORK_DIR/$PROJECT"
+    mkdir -p "$PROJECT_WORK_DIR"
+    clone_project || exit 1
+done
+
+# Run all versions and prefix their output with the version.
+declare -A PIDS
+for version in "${VERSIONS[@]}"; do
+    echo "[INFO] Start $PROJECT ($version)"
+    (
+        # Keep the exit code of migration_resources.sh, not sed.
+        set -o pipefail
+        "$SCRIPTSDIR/migration_resources.sh" "$PROJECT" "$version" "$WORKSPACE_NAME" 2>&1 \
+            | sed -u "s|^|$version \| |"
+    ) &
+    PIDS[$version]=$!
+done
+
+failed=0
+for version in "${VERSIONS[@]}"; do
+    if wait ${PIDS[$version]}; then
+        echo "[INFO] Success: $PROJECT ($version)"
+    else
+        echo "[ERROR] Failed: $PROJECT ($version)"
+        failed=1
+    fi
+done
+
+exit $failed
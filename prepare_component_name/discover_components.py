@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+"""Discover the Weblate components of a project in one shot.
+
+setup.cfg is parsed once for both python and django modules, and the
+POT directory is scanned once. The components are written to a manifest
+with their POT paths and filemasks, which drives the later stages.
+
+Manifest format::
+
+    {
+        "project": "<project>",
+        "version": "<zanata version>",
+        "components": [
+            {"name": "<component>", "pot_path": "<path>",
+             "filemask": "<filemask>"}
+        ]
+    }
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from get_modulename import get_translate_options
+from get_modulename import get_valid_modules
+from get_modulename import parse_config
+from get_modulename import read_config
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), os.pardir, 'common'))
+from git_metadata import read_metadata  # noqa: E402
+from weblate_utils import get_filemask  # noqa: E402
+
+
+# List of the projects that have doc component.
+DOC_TARGETS = (
+    'contributor-guide',
+    'horizon',
+    'openstack-ansible',
+    'operations-guide',
+    'swift',
+)
+
+# Projects with fixed components set in migration_resources.sh.
+SPECIAL_PROJECT_COMPONENTS = {
+    'api-site': ('api-quick-start', 'firstapp'),
+    'security-doc': ('security-guide',),
+    'openstack-manuals': ('doc',),
+    'i18n': ('doc',),
+    'training-guides': ('doc',),
+    'tripleo-ui': ('i18n',),
+}
+
+
+def get_args():
+    parser = argparse.ArgumentParser(
+        description='Discover Weblate components of a project.')
+    parser.add_argument('-p', '--project', required=True)
+    parser.add_argument('-v', '--version', default='master',
+                        help='Zanata version of the project.')
+    parser.add_argument('--project-dir', required=True,
+                        help='Path to the cloned project repository.')
+    parser.add_argument('--pot-dir', required=True,
+                        help='Path to the POT files pulled from Zanata.')
+    parser.add_argument('-f', '--file',
+                        help='Path of setup.cfg file '
+                             '(default: setup.cfg in the project dir).')
+    parser.add_argument('--git-ref',
+                        help='Read setup.cfg and conf.py files of the '
+                             'branch from git objects instead of the '
+                             'working tree.')
+    parser.add_argument('-o', '--output', required=True,
+                        help='Path to the manifest JSON.')
+    return parser.parse_args()
+
+
+def get_modules(config, project, target):
+    """Get module names for the target, same as get_modulename.py"""
+    if 'openstack_translations' in config:
+        return get_translate_options(config, target)
+    return get_valid_modules(config, project, target)
+
+
+def scan_pot_dir(pot_dir):
+    """Get relative paths of all POT files in the directory"""
+    pot_files = set()
+    for root, _, files in os.walk(pot_dir):
+        for name in files:
+            if name.endswith('.pot'):
+                pot_files.add(
+                    os.path.relpath(os.path.join(root, name), pot_dir))
+    return pot_files
+
+
+def discover_components(project, config, pot_files,
+                        has_releasenotes, has_doc):
+    """Discover components of the project
+
+    :param project: string name of the project
+    :param config: dict of setup.cfg parsed by read_config
+    :param pot_files: set of POT paths relative to the POT directory
+    :param has_releasenotes: bool releasenotes/source/conf.py exists
+    :param has_doc: bool doc/source/conf.py exists
+    :returns: list of (component name, POT path relative to the POT
+        directory) tuples
+    """
+    components = []
+    python_modules = get_modules(config, project, 'python')
+    django_modules = get_modules(config, project, 'django')
+
+    if (python_modules or django_modules) and has_releasenotes:
+        components.append(
+            ('releasenotes', 'releasenotes/source/locale/releasenotes.pot'))
+
+    # In Weblate, we can't use multiple components name in a project.
+    # If it has multiple Django modules, we set name
+    # <module_name>-django/djangojs to identify the module in weblate.
+    # e.g. horizon-django, openstack-dashboard-django
+    is_multiple = len(django_modules) >= 2
+    for module_name in django_modules:
+        for domain in ('django', 'djangojs'):
+            pot_path = f'{module_name}/locale/{domain}.pot'
+            if pot_path not in pot_files:
+                continue
+            component = domain
+            if is_multiple:
+                # The module name basically use _ as separator.
+                # In weblate, we need to use -.
+                component = f"{module_name.replace('_', '-')}-{domain}"
+            components.append((component, pot_path))
+
+    if has_doc and project in DOC_TARGETS:
+        if 'doc/source/locale/doc.pot' in pot_files:
+            components.append(('doc', 'doc/source/locale/doc.pot'))
+        for pot_path in sorted(pot_files):
+            directory, name = os.path.split(pot_path)
+            if (directory == 'doc/source/locale'
+                    and name.startswith('doc-')):
+                components.append((name[:-len('.pot')], pot_path))
+
+    # Remove duplicated components keeping the order.
+    unique = {}
+    for component, pot_path in components:
+        unique.setdefault(component, pot_path)
+    return list(unique.items())
+
+
+def discover_branch_components(project, files, pot_files):
+    """Discover components from the files read by read_metadata
+
+    :param project: string name of the project
+    :param files: dict of path -> content or None of a branch
+    :param pot_files: set of POT paths relative to the POT directory
+    :returns: list of (component name, POT path) tuples
+    """
+    return discover_components(
+        project, parse_config(files['setup.cfg'] or ''), pot_files,
+        files['releasenotes/source/conf.py'] is not None,
+        files['doc/source/conf.py'] is not None)
+
+
+def main():
+    args = get_args()
+    pot_files = scan_pot_dir(args.pot_dir)
+
+    if args.git_ref:
+        files = read_metadata(args.project_dir, [args.git_ref])[args.git_ref]
+        if files is None:
+            print(f'[ERROR] {args.git_ref} not found in {args.project_dir}',
+                  file=sys.stderr)
+            sys.exit(1)
+        if args.file:
+            with open(args.file) as f:
+                files['setup.cfg'] = f.read()
+        components = discover_branch_components(
+            args.project, files, pot_files)
+    else:
+        setup_cfg = args.file or os.path.join(args.project_dir, 'setup.cfg')
+        components = discover_components(
+            args.project, read_config(setup_cfg), pot_files,
+            os.path.isfile(os.path.join(
+                args.project_dir, 'releasenotes/source/conf.py')),
+            os.path.isfile(os.path.join(
+                args.project_dir, 'doc/source/conf.py')))
+
+    manifest = {
+        'project': args.project,
+        'version': args.version,
+        'components': [
+            {
+                'name': component,
+                'pot_path': os.path.join(
+                    os.path.abspath(args.pot_dir), pot_path),
+                'filemask': get_filemask(component),
+            }
+            for component, pot_path in components
+        ],
+    }
+    tmp_path = f'{args.output}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, args.output)
+
+    print(f'[INFO] Discovered {len(components)} components: {args.output}',
+          file=sys.stderr)
+    print(' '.join(component for component, _ in components))
+
+
+if __name__ == '__main__':
+    main()
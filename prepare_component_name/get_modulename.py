@@ -47,7 +47,17 @@ def split_multiline(value):
 def read_config(path):
     parser = configparser.ConfigParser()
     parser.read(path)
+    return _to_dict(parser)
 
+
+def parse_config(text):
+    """Parse setup.cfg content, e.g. read from git objects"""
+    parser = configparser.ConfigParser()
+    parser.read_string(text)
+    return _to_dict(parser)
+
+
+def _to_dict(parser):
     config = {}
     for section in parser.sections():
         config[section] = dict(parser.items(section))
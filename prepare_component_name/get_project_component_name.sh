@@ -13,107 +13,24 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
-PROJECT_DIR=$HOME/$WORKSPACE_NAME/projects/$PROJECT/$PROJECT
-POT_DIR=$HOME/$WORKSPACE_NAME/projects/$PROJECT/pot
-
-# List of the projects that have doc component.
-DOC_TARGETS=('contributor-guide'
-             'horizon'
-             'openstack-ansible'
-             'operations-guide',
-             'swift')
-
-function get_python_component_names {
-    local components=()
-    local module_names
-
-    module_names=$(python3 $SCRIPTSDIR/prepare_component_name/get_modulename.py -p $PROJECT -t python -f setup.cfg)
-
-    if [ -n "$module_names" ]; then
-        if [ -f $PROJECT_DIR/releasenotes/source/conf.py ]; then
-            components+=("releasenotes")
-        fi
-    fi
-    
-    echo "${components[@]}"
-}
-
-function get_django_component_names {
-    local components=()
-    local module_names
-    local django_module_names
-    local is_multiple
-    local dest_modulename
-    local module_name_hyphenated
-
-    module_names=$(python3 $SCRIPTSDIR/prepare_component_name/get_modulename.py -p $PROJECT -t django -f setup.cfg)
-    
-    # Convert array for proper counting
-    # In Weblate, we can't use multiple components name in a project.
-    # If it has multiple Django modules, we set name <module_name>-django/djangojs
-    # to identify the module in weblate. 
-    # e.g. horizon-django, openstack-dashboard-django
-    django_module_names=($module_names)
-
-    if [ ${#django_module_names[@]} -ge 2 ]; then
-        is_multiple=true
-    else
-        is_multiple=false
-    fi
-
-    if [ -n "$module_names" ]; then
-        if [[ -f $PROJECT_DIR/releasenotes/source/conf.py ]]; then
-            components+=("releasenotes")
-        fi
-
-        # Check if the project has multiple Django modules
-        # If it has, we set name <module_name>-django/djangojs
-        for modulename in ${django_module_names[@]}; do
-            if [ -f "$POT_DIR/$modulename/locale/django.pot" ]; then
-                dest_modulename="django"
-                if [ "$is_multiple" == "true" ]; then
-                    # The module name basically use _ as separator.
-                    # In weblate, we need to use -.
-                    module_name_hyphenated=$(echo "$modulename" | sed 's/_/-/g')
-                    dest_modulename="${module_name_hyphenated}-django"
-                fi
-
-                components+=("$dest_modulename")
-            fi
-
-            if [ -f "$POT_DIR/$modulename/locale/djangojs.pot" ]; then
-                dest_modulename="djangojs"
-                if [ "$is_multiple" == "true" ]; then
-                    module_name_hyphenated=$(echo "$modulename" | sed 's/_/-/g')
-                    dest_modulename="${module_name_hyphenated}-djangojs"
-                fi
-                components+=("$dest_modulename")
-            fi
-        done
-    fi
-
-    echo "${components[@]}"
-}
-
-function get_doc_component_names {
-    local components=()
-    local doc_component_name
-
-    if [[ -f $PROJECT_DIR/doc/source/conf.py ]]; then
-        # Check if the project is in the DOC_TARGETS list.
-        if [[ ${DOC_TARGETS[*]} =~ "$PROJECT" ]]; then
-            if [[ -f $POT_DIR/doc/source/locale/doc.pot ]]; then
-                components+=("doc")
-            fi
-
-            for doc_pot_file in $POT_DIR/doc/source/locale/doc-*.pot; do
-                if [[ -f "$doc_pot_file" ]]; then
-                    doc_component_name=$(basename "$doc_pot_file" .pot)
-                    components+=("$doc_component_name")
-                fi
-            done
-        fi
-    fi
-
-    echo "${components[@]}"
+source $SCRIPTSDIR/common/get_translation_path.sh
+
+PROJECT_DIR=$PROJECT_WORK_DIR/$PROJECT
+POT_DIR=$PROJECT_WORK_DIR/pot
+
+# Discover the components of the project and write the manifest
+# with their pot paths and filemasks.
+# setup.cfg is parsed once and the pot directory is scanned once.
+# The DOC_TARGETS, multiple Django modules and releasenotes rules
+# are in discover_components.py.
+# The metadata files of the branch are read from git objects,
+# so it does not depend on the checked out branch.
+function discover_components {
+    python3 $SCRIPTSDIR/prepare_component_name/discover_components.py \
+        --project $PROJECT \
+        --version $ZANATA_VERSION \
+        --project-dir $PROJECT_DIR \
+        --git-ref $BRANCH_NAME \
+        --pot-dir $POT_DIR \
+        --output $COMPONENT_MANIFEST
 }
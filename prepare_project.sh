@@ -0,0 +1,64 @@
+#!/bin/bash
+# Prepare the resources shared by the versions of a project
+
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+# The environment, the mirror, the Weblate project and the glossary
+# are shared by the versions of a project, so they are prepared once
+# before the versions run concurrently with PREPARED_PROJECT=true.
+# With PREPARED_ENV=true, the environment is not set up again, e.g.
+# when another project of the same workspace already set it up.
+
+PROJECT=$1
+WORKSPACE_NAME=${2:-"workspace"}
+
+if [ -z "$PROJECT" ]; then
+    echo "Usage: $0 <project> [workspace_name]"
+    exit 1
+fi
+
+SCRIPTSDIR="$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )"
+source $SCRIPTSDIR/setup_env/setup.sh
+source $SCRIPTSDIR/prepare_translations/get_zanata_xml.sh
+
+export LANG=en_US.UTF-8
+
+echo "[INFO] Check variables"
+if [ -z "$WEBLATE_URL" ] || [ "$WEBLATE_URL" == "<weblate_url>" ]; then
+    echo "[ERROR] WEBLATE_URL is not set"
+    exit 1
+fi
+if [ -z "$WEBLATE_TOKEN" ] || [ "$WEBLATE_TOKEN" == "<weblate_token>" ]; then
+    echo "[ERROR] WEBLATE_TOKEN is not set"
+    exit 1
+fi
+
+if [ "$PREPARED_ENV" == "true" ]; then
+    source "$WORK_DIR/.venv/bin/activate"
+else
+    echo "[INFO] Setup environment and prepare workspace"
+    if ! setup_env; then
+        echo "[ERROR] Failed to setup environment and prepare workspace"
+        exit 1
+    fi
+fi
+
+echo "[INFO] Update $PROJECT mirror"
+update_mirror "$PROJECT" || exit 1
+
+start_daemon || exit 1
+
+echo "[INFO] Create Weblate project and glossary"
+run_python $SCRIPTSDIR/common/weblate_utils.py create-project --project $PROJECT || exit 1
+run_python $SCRIPTSDIR/common/weblate_utils.py create-glossary --project $PROJECT || exit 1
+exit 0
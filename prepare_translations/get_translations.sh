@@ -16,12 +16,29 @@
 WORK_DIR="$HOME/$WORKSPACE_NAME"
 
 function pull_translation_files {
-    cd $WORK_DIR/projects/$PROJECT/$PROJECT
+    cd $CLONED_PROJECT_DIR
+
+    if is_step_done pull && [ -d $PROJECT_WORK_DIR/pot ]; then
+        echo "[INFO] Skip completed step: pull"
+        return 0
+    fi
+
+    # The pot and translations directories only hold references to
+    # the content store, so they are cleared instead of overwritten.
+    # Writing into a reference would change the stored payload.
+    rm -rf $PROJECT_WORK_DIR/pot $PROJECT_WORK_DIR/translations
+    mkdir -p $PROJECT_WORK_DIR/pot $PROJECT_WORK_DIR/translations
 
     # Pull all translation files(po, pot) from Zanata.
     # source file(*.pot) is in /pot directory.
     # translation file(*.po) is in /translations directory.
     zanata-cli -B -e pull --pull-type both \
-        --src-dir $WORK_DIR/projects/$PROJECT/pot \
-        --trans-dir $WORK_DIR/projects/$PROJECT/translations
+        --src-dir $PROJECT_WORK_DIR/pot \
+        --trans-dir $PROJECT_WORK_DIR/translations || return 1
+
+    # Keep a single copy of identical files across versions.
+    python3 $SCRIPTSDIR/common/content_store.py ingest \
+        $PROJECT_WORK_DIR/pot \
+        $PROJECT_WORK_DIR/translations || return 1
+    record_step pull
 }
\ No newline at end of file
@@ -14,35 +14,111 @@
 # under the License.
 
 WORK_DIR="$HOME/$WORKSPACE_NAME"
-CLONED_PROJECT_DIR="$WORK_DIR/projects/$PROJECT/$PROJECT"
+CLONED_PROJECT_DIR="$PROJECT_WORK_DIR/$PROJECT"
+
+# The files read by the discovery and the zanata.xml steps.
+# The other projects only check out these files.
+SPARSE_PATTERNS=(
+    "/setup.cfg"
+    "/releasenotes/source/conf.py"
+    "/doc/source/conf.py"
+    "/doc-tools-check-languages.conf"
+)
+# setup_manuals walks the document directories, so the manuals
+# projects check out the whole tree.
+FULL_CHECKOUT_PROJECTS=(api-site openstack-manuals security-doc)
+
+# Update the bare mirror of the project in the shared cache.
+# The first run clones it, and later runs only fetch new objects.
+# Only branches and tags are mirrored, because Gerrit refs/changes/*
+# are much bigger than the branches.
+# The mirror is a blobless partial clone: it has the history and the
+# trees, and the file contents are fetched when they are needed.
+# The metadata files of all branches are fetched at once after update.
+# syntax: update_mirror <project>
+function update_mirror {
+    local project=$1
+    local mirror="$MIRROR_DIR/$project.git"
+
+    mkdir -p "$MIRROR_DIR" || return 1
+    (
+        # Runs of other workspaces can update the same mirror.
+        flock 9
+
+        if [ ! -d "$mirror" ]; then
+            rm -rf "$mirror.tmp"
+            if ! git clone --bare --filter=blob:none \
+                https://opendev.org/openstack/$project "$mirror.tmp"; then
+                rm -rf "$mirror.tmp"
+                echo "[ERROR] Failed to clone $project project"
+                exit 1
+            fi
+            git -C "$mirror.tmp" config remote.origin.fetch '+refs/heads/*:refs/heads/*' || exit 1
+            git -C "$mirror.tmp" config --add remote.origin.fetch '+refs/tags/*:refs/tags/*' || exit 1
+            mv "$mirror.tmp" "$mirror" || exit 1
+            echo "[INFO] $project: Mirrored to $mirror"
+        else
+            if ! git -C "$mirror" fetch --prune origin; then
+                echo "[ERROR] Failed to update the mirror of $project project"
+                exit 1
+            fi
+            echo "[INFO] $project: Updated $mirror"
+        fi
+        python3 $SCRIPTSDIR/common/git_metadata.py prefetch --repo "$mirror" || exit 1
+        # Forget working copies of deleted workspaces.
+        git -C "$mirror" worktree prune
+    ) 9> "$MIRROR_DIR/$project.lock"
+}
 
+# Create the working copy of the version from the mirror.
+# It is a git worktree, so it shares the objects with the mirror
+# instead of keeping its own copy. Only SPARSE_PATTERNS are checked
+# out, except for FULL_CHECKOUT_PROJECTS.
+# With PREPARED_PROJECT=true, the mirror was already updated
+# for all versions by migration_versions.sh.
 function clone_project() {
+    local mirror="$MIRROR_DIR/$PROJECT.git"
 
-    cd $WORK_DIR/projects/$PROJECT
-    if [ ! -d "$WORK_DIR/$PROJECT" ]; then
-        git clone https://opendev.org/openstack/$PROJECT
+    if [ "$PREPARED_PROJECT" != "true" ]; then
+        update_mirror "$PROJECT" || return 1
+    fi
 
-        # If the cloned project directory is empty, remove and get errors.
-        if [ -z "$(ls -A $CLONED_PROJECT_DIR)" ]; then
-            rm -rf $CLONED_PROJECT_DIR
-            echo "[ERROR] Failed to clone $PROJECT project"
-            return 1
-        else
-            echo "[INFO] $PROJECT: Cloned successfully"
-        fi
+    # Working copies of older runs were full clones. Replace them.
+    if [ -d "$CLONED_PROJECT_DIR/.git" ]; then
+        echo "[INFO] $PROJECT: Replace the full clone with a worktree"
+        rm -rf "$CLONED_PROJECT_DIR"
+    fi
+    # The mirror can be removed by the workspace manager.
+    if [ -e "$CLONED_PROJECT_DIR/.git" ] && ! git -C "$CLONED_PROJECT_DIR" rev-parse --git-dir &> /dev/null; then
+        echo "[INFO] $PROJECT: Recreate the worktree of the removed mirror"
+        rm -rf "$CLONED_PROJECT_DIR"
     fi
 
-    # If ZANATA_VERSION is master, we don't need to checkout.
-    if [ "$BRANCH_NAME" != "master" ]; then
-        cd $CLONED_PROJECT_DIR
-        if ! git checkout $BRANCH_NAME; then
+    if [ ! -e "$CLONED_PROJECT_DIR/.git" ]; then
+        rm -rf "$CLONED_PROJECT_DIR"
+        (
+            # Concurrent jobs of the project add worktrees to the
+            # same mirror.
+            flock 9
+            git -C "$mirror" worktree add --no-checkout --detach "$CLONED_PROJECT_DIR" "$BRANCH_NAME"
+        ) 9> "$MIRROR_DIR/$PROJECT.lock"
+        if [ $? -ne 0 ]; then
             echo "[ERROR] Failed to checkout $BRANCH_NAME version"
             return 1
         fi
-        cd - > /dev/null
+    fi
+
+    if [[ " ${FULL_CHECKOUT_PROJECTS[*]} " == *" $PROJECT "* ]]; then
+        git -C "$CLONED_PROJECT_DIR" sparse-checkout disable || return 1
+    else
+        git -C "$CLONED_PROJECT_DIR" sparse-checkout set --no-cone "${SPARSE_PATTERNS[@]}" || return 1
+    fi
+
+    if ! git -C "$CLONED_PROJECT_DIR" checkout --detach "$BRANCH_NAME"; then
+        echo "[ERROR] Failed to checkout $BRANCH_NAME version"
+        return 1
     fi
     echo "[INFO] $PROJECT: Checked out $BRANCH_NAME version"
-    cd - > /dev/null
 
     return 0
 }
@@ -129,7 +205,7 @@ function setup_manuals {
     if ! python3 $SCRIPTSDIR/prepare_translations/create_zanata_xml.py \
         -p $PROJECT -v $ZANATA_VERSION --srcdir . --txdir . \
         $ZANATA_RULES -e "$EXCLUDE" \
-        -f $WORK_DIR/projects/$PROJECT/$PROJECT/zanata.xml; then
+        -f $CLONED_PROJECT_DIR/zanata.xml; then
         echo "[ERROR] Failed to create zanata.xml for $PROJECT"
         exit 1
     fi
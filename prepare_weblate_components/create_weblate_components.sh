@@ -21,50 +21,137 @@ function create_weblate_components {
     WORKSPACE_DIR=$HOME/workspace/projects/$PROJECT/$WORKSPACE_NAME/test
     mkdir -p $WORKSPACE_DIR
 
-    # Create project
-    python3 -u $SCRIPTSDIR/common/weblate_utils.py create-project --project $PROJECT || exit 1
-    # Create global glossary for the project
-    python3 -u $SCRIPTSDIR/common/weblate_utils.py create-glossary --project $PROJECT || exit 1
-    # Create category with the branch name
-    python3 -u $SCRIPTSDIR/common/weblate_utils.py create-category --project $PROJECT --category $ZANATA_VERSION || exit 1
-    # Create components with the pot file for Weblate component initialization.
-    for component in ${COMPONENTS[@]}; do
-        pot_path=$(get_pot_path $component)
+    # Strip obsolete entries, previous msgids and source references
+    # from the po files. Weblate ignores them, so uploading them only
+    # costs transfer and parse time.
+    echo "[INFO] Minimize PO files before uploading"
+    python3 -u $SCRIPTSDIR/common/minimize_po.py \
+        $PROJECT_WORK_DIR/translations
 
-        python3 -u $SCRIPTSDIR/common/weblate_utils.py create-component \
-            --project $PROJECT \
-            --category $ZANATA_VERSION \
-            --component $component \
-            --pot-path $pot_path || exit 1
-    done
+    # Check the po files for what Weblate rejects before uploading.
+    # Invalid files are moved out of the translations directory,
+    # so they are not uploaded and retried in vain.
+    # The stage fails when files were quarantined. Fix them and put
+    # them back, or run again with --resume to migrate without them.
+    echo "[INFO] Validate PO files before uploading"
+    if ! python3 -u $SCRIPTSDIR/common/validate_po.py \
+            --quarantine $PROJECT_WORK_DIR/quarantine/$ZANATA_VERSION \
+            $PROJECT_WORK_DIR/translations; then
+        echo "[ERROR] Invalid PO files of $PROJECT ($ZANATA_VERSION) were quarantined"
+        exit 1
+    fi
 
-    for component in ${COMPONENTS[@]}; do
-        translation_path_list=$(get_translation_path_list $component)
+    # Index the remaining po files once for all components.
+    # test_accuracy reads the same index.
+    build_translation_index || exit 1
 
-        for translation_path in $translation_path_list; do
-            locale=$(extract_locale_from_path $translation_path)
-            echo "[INFO] Creating translation, locale: $locale, component: $component"
+    # With PREPARED_PROJECT=true, the project and the glossary were
+    # created once by migration_versions.sh before the versions started.
+    if [ "$PREPARED_PROJECT" != "true" ]; then
+        # Create project
+        run_python $SCRIPTSDIR/common/weblate_utils.py create-project --project $PROJECT || exit 1
+        # Create global glossary for the project
+        run_python $SCRIPTSDIR/common/weblate_utils.py create-glossary --project $PROJECT || exit 1
+    fi
+    # Create category with the branch name
+    run_python $SCRIPTSDIR/common/weblate_utils.py create-category --project $PROJECT --category $ZANATA_VERSION || exit 1
 
-            python3 -u $SCRIPTSDIR/common/weblate_utils.py create-translation \
-                --project $PROJECT \
-                --category $ZANATA_VERSION \
-                --component $component \
-                --locale $locale 
-            sleep 10
+    # In bundle mode, the components are created with all translations
+    # in the initial zip file, so no more requests per locale are needed.
+    if [ "$BUNDLE_TRANSLATIONS" == "true" ]; then
+        create_weblate_components_with_translations
+        return
+    fi
 
-            echo "[INFO] Check plural forms..."
-            python3 -u $SCRIPTSDIR/prepare_weblate_components/lang_plural_check.py $translation_path
+    echo "[INFO] Check plural forms..."
+    mapfile -t translation_paths < <(list_upload_tasks | cut -f 3)
+    if [ ${#translation_paths[@]} -gt 0 ]; then
+        run_python $SCRIPTSDIR/prepare_weblate_components/lang_plural_check.py \
+            "${translation_paths[@]}"
+    fi
 
-            echo "[INFO] Uploading PO filse: $translation_path"
-            python3 -u $SCRIPTSDIR/common/weblate_utils.py upload-po-file \
-                --project $PROJECT \
-                --category $ZANATA_VERSION \
-                --component $component \
-                --locale $locale \
-                --po-path $translation_path
+    # The components and their translations are run as a dependency
+    # graph by weblate_utils.py batch. The translations of a component
+    # start as soon as the component is created, so a slow component
+    # does not hold back the translations of the others.
+    local results=$PROJECT_WORK_DIR/upload_results.jsonl
+    echo "[INFO] Create components and translations"
+    list_component_operations \
+        | run_python $SCRIPTSDIR/common/weblate_utils.py batch \
+            --jobs "${WEBLATE_BATCH_JOBS:-4}" > "$results"
 
-        done
+    jq -r 'select(.status != "success")
+           | "[ERROR] \(.id): \(.status) \(.error // "")"' "$results"
+    if jq -e 'select(.op == "create-component" and .status != "success")' \
+            "$results" > /dev/null; then
+        exit 1
+    fi
+}
 
+# Print the operations of weblate_utils.py batch as JSON lines:
+# the creation of each component, then the creation and upload of
+# each translation after its component, the biggest po files first.
+function list_component_operations {
+    local component done_uploads='{}'
+
+    for component in ${COMPONENTS[@]}; do
+        jq -cn --arg project "$PROJECT" --arg category "$ZANATA_VERSION" \
+            --arg component "$component" \
+            --arg pot_path "$(get_component_pot_path $component)" \
+            '{id: "component:\($component)", op: "create-component",
+              project: $project, category: $category,
+              component: $component, pot_path: $pot_path}'
     done
 
+    # The upload is the last step of a translation.
+    if [ "$MIGRATION_RESUME" == "true" ]; then
+        done_uploads=$(run_python $SCRIPTSDIR/common/journal.py list \
+            --project "$PROJECT" --version "$ZANATA_VERSION" --step upload \
+            | jq -Rnc '[inputs | {(.): true}] | add // {}')
+    fi
+
+    # Weblate needs some time to set up a new translation before
+    # the upload, so the upload waits after the creation, see
+    # NEW_TRANSLATION_WAIT_SECONDS of weblate_utils.py.
+    # The batch skips the wait when the translation already existed.
+    jq -c --arg project "$PROJECT" --arg category "$ZANATA_VERSION" \
+        --argjson done "$done_uploads" \
+        --argjson wait "${NEW_TRANSLATION_WAIT_SECONDS:-10}" \
+        '[.components | to_entries[] | .key as $component
+          | .value | to_entries[]
+          | select($done["\($component)\t\(.key)"] | not)
+          | {size: .value.size, component: $component, locale: .key,
+             po_path: .value.zanata_path}]
+         | sort_by(-.size)[]
+         | "\(.component):\(.locale)" as $id
+         | {id: "translation:\($id)", op: "create-translation",
+            project: $project, category: $category,
+            component, locale, after: ["component:\(.component)"],
+            wait: $wait},
+           {id: "upload:\($id)", op: "upload-po-file",
+            project: $project, category: $category,
+            component, locale, po_path, after: ["translation:\($id)"]}' \
+        $TRANSLATION_INDEX
+}
+
+# Create each component with the pot file and the normalized po files
+# of all locales in a single request.
+function create_weblate_components_with_translations {
+    for component in ${COMPONENTS[@]}; do
+        pot_path=$(get_component_pot_path $component)
+        translation_path_list=$(list_translations $component | cut -f 2)
+
+        echo "[INFO] Check plural forms..."
+        if [ -n "$translation_path_list" ]; then
+            run_python $SCRIPTSDIR/prepare_weblate_components/lang_plural_check.py $translation_path_list
+        fi
+
+        echo "[INFO] Creating component with translations: $component"
+        run_python $SCRIPTSDIR/common/weblate_utils.py create-component \
+            --project $PROJECT \
+            --category $ZANATA_VERSION \
+            --component $component \
+            --pot-path $pot_path \
+            --po-paths $translation_path_list || exit 1
+    done
 }
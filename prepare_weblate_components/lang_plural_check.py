@@ -12,6 +12,7 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import os
 import polib
 import sys
 
@@ -29,12 +30,8 @@ def check_lang_exist(lang_code: str) -> bool:
     return False
     
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python3 lang_plural_check.py <po_file_path>")
-        sys.exit(1)
-
-    po_file_path = sys.argv[1]
+def check_po_file(po_file_path: str) -> None:
+    """Fix the language and the plural rules of a po file"""
     po = polib.pofile(po_file_path)
 
     po_lang_data = po.metadata['Language']
@@ -72,9 +69,30 @@ def main():
         )
         po.metadata['Plural-Forms'] = expected_plurals
 
-    po.save(po_file_path)
+    # The po file can be a reference to the content store.
+    # Save to a new file and replace it not to change the stored file.
+    tmp_path = f"{po_file_path}.tmp"
+    po.save(tmp_path)
+    os.replace(tmp_path, po_file_path)
     print(f"[INFO] Saved {po_file_path} with new metadata")
 
 
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 lang_plural_check.py <po_file_path>...")
+        sys.exit(1)
+
+    # A broken file does not stop the check of the other files
+    failed = False
+    for po_file_path in sys.argv[1:]:
+        try:
+            check_po_file(po_file_path)
+        except Exception as e:
+            print(f"[ERROR] Failed to check {po_file_path}: {e}")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
 if __name__ == "__main__":
     main()
@@ -14,6 +14,42 @@
 # under the License.
 
 WORK_DIR="$HOME/$WORKSPACE_NAME"
+# Content-addressed store for the pulled POT/PO files.
+# It is shared by all projects and versions of the workspace.
+export MIGRATION_STORE_DIR="${MIGRATION_STORE_DIR:-$WORK_DIR/store}"
+# Checkpoint journal of the completed steps, see common/journal.py.
+# With MIGRATION_RESUME=true, the steps completed by a failed run
+# are skipped.
+export MIGRATION_JOURNAL="${MIGRATION_JOURNAL:-$WORK_DIR/journal.sqlite}"
+# Durations of the Weblate requests, see common/latency.py.
+# The dry run of batch_migration/scheduler.py estimates from them.
+export MIGRATION_LATENCY="${MIGRATION_LATENCY:-$WORK_DIR/latency.sqlite}"
+# Warm worker daemon of the Python scripts, see common/migration_daemon.py.
+# With MIGRATION_DAEMON=true, weblate_utils.py and the other scripts
+# called per component and locale run without starting an interpreter.
+if [ "$MIGRATION_DAEMON" == "true" ]; then
+    export MIGRATION_DAEMON_SOCKET="${MIGRATION_DAEMON_SOCKET:-$WORK_DIR/daemon.sock}"
+fi
+# Shared cache of bare repository mirrors.
+# It is shared by all workspaces, so repeated runs only fetch new objects.
+MIRROR_DIR="${MIRROR_DIR:-$HOME/.cache/openstack-weblate-migration/mirrors}"
+
+# Get the workspace directory of the project.
+# With VERSION_WORKSPACE=true, each version has its own directory,
+# so that the versions of a project can be migrated concurrently.
+# syntax: get_project_work_dir <project> <zanata_version>
+function get_project_work_dir {
+    local project=$1
+    local version=$2
+
+    if [ "$VERSION_WORKSPACE" == "true" ]; then
+        echo "$WORK_DIR/projects/$project/versions/$version"
+    else
+        echo "$WORK_DIR/projects/$project"
+    fi
+}
+
+PROJECT_WORK_DIR=$(get_project_work_dir "$PROJECT" "$ZANATA_VERSION")
 
 function create_python_venv() {
     if ! command -v python3 &> /dev/null; then
@@ -119,6 +155,14 @@ function prepare_workspace() {
         fi
     fi
 
+    # Create store directory
+    if [ ! -d "$MIGRATION_STORE_DIR" ]; then
+        if ! mkdir -p "$MIGRATION_STORE_DIR"; then
+            echo "[ERROR] Failed to create store directory"
+            return 1
+        fi
+    fi
+
     echo "[INFO] Workspace directory created successfully"
     return 0
 
@@ -126,27 +170,87 @@ function prepare_workspace() {
 
 function prepare_project_workspace() {
     local project=$1
+    local project_dir=$(get_project_work_dir "$project" "$ZANATA_VERSION")
 
     # Create project directory
-    if [ ! -d "$WORK_DIR/projects/$project" ]; then
-        mkdir -p $WORK_DIR/projects/$project
+    if [ ! -d "$project_dir" ]; then
+        mkdir -p $project_dir
     fi
 
     # Create pot directory
-    if [ ! -d "$WORK_DIR/projects/$project/pot" ]; then
-        mkdir -p $WORK_DIR/projects/$project/pot
+    if [ ! -d "$project_dir/pot" ]; then
+        mkdir -p $project_dir/pot
         echo "[INFO] Pot directory created successfully"
     fi
 
     # Create translations directory
-    if [ ! -d "$WORK_DIR/projects/$project/translations" ]; then
-        mkdir -p $WORK_DIR/projects/$project/translations
+    if [ ! -d "$project_dir/translations" ]; then
+        mkdir -p $project_dir/translations
         echo "[INFO] Translations directory created successfully"
     fi
 
     return 0
 }
 
+# Record that the artifacts of the project are used now.
+# The workspace manager removes the least recently used ones first.
+function update_workspace_usage {
+    python3 $SCRIPTSDIR/common/workspace_manager.py \
+        --work-dir $WORK_DIR --mirror-dir $MIRROR_DIR \
+        touch $PROJECT
+}
+
+# Check if a resumed run already completed the step.
+# syntax: is_step_done <step> [component] [locale]
+function is_step_done {
+    if [ "$MIGRATION_RESUME" != "true" ]; then
+        return 1
+    fi
+    run_python $SCRIPTSDIR/common/journal.py check \
+        --project "$PROJECT" --version "$ZANATA_VERSION" \
+        --step "$1" --component "$2" --locale "$3"
+}
+
+# Record that the step is completed.
+# syntax: record_step <step> [component] [locale]
+function record_step {
+    run_python $SCRIPTSDIR/common/journal.py record \
+        --project "$PROJECT" --version "$ZANATA_VERSION" \
+        --step "$1" --component "$2" --locale "$3"
+}
+
+# Start the journal of the run. A new run clears the steps of an
+# older run, and a resumed run keeps them. The uploads recorded in
+# the content store are kept by both, because they are only trusted
+# while their component or translation exists in Weblate.
+function start_journal {
+    if [ "$MIGRATION_RESUME" == "true" ]; then
+        echo "[INFO] Resume $PROJECT ($ZANATA_VERSION) from the first unfinished step"
+        return 0
+    fi
+    run_python $SCRIPTSDIR/common/journal.py reset \
+        --project "$PROJECT" --version "$ZANATA_VERSION"
+}
+
+# Start the daemon of the Python scripts if MIGRATION_DAEMON is true.
+# It must be started in the virtual environment.
+function start_daemon {
+    if [ -z "$MIGRATION_DAEMON_SOCKET" ]; then
+        return 0
+    fi
+    python3 $SCRIPTSDIR/common/migration_daemon.py start
+}
+
+# Run a Python script, by the daemon if it is running.
+# syntax: run_python <script> [args...]
+function run_python {
+    if [ -S "$MIGRATION_DAEMON_SOCKET" ]; then
+        python3 -S $SCRIPTSDIR/common/migration_daemon.py run "$@"
+    else
+        python3 -u "$@"
+    fi
+}
+
 function setup_env_and_prepare_workspace() {
     local project=$1
 
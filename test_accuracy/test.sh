@@ -1,7 +1,7 @@
 source $SCRIPTSDIR/common/get_translation_path.sh
 
-TEST_DIR=$HOME/$WORKSPACE_NAME/projects/$PROJECT/test
-RESULT_JSON=$HOME/$WORKSPACE_NAME/projects/$PROJECT/result.json
+TEST_DIR=$PROJECT_WORK_DIR/test
+RESULT_JSON=$PROJECT_WORK_DIR/result.json
 
 function test_accuracy {
 
@@ -12,7 +12,7 @@ function test_accuracy {
 
     cd $TEST_DIR
     # Download translation file from Weblate
-    python3 -u $SCRIPTSDIR/common/weblate_utils.py download-translation-file \
+    run_python $SCRIPTSDIR/common/weblate_utils.py download-translation-file \
         --project $PROJECT \
         --po-path $TEST_DIR/$PROJECT.zip
     unzip -o $PROJECT.zip
@@ -24,25 +24,33 @@ function test_accuracy {
         echo " Target: $PROJECT / $ZANATA_VERSION / $component"
         echo "============================================================"
         
-        # Get translation path list as an array
-        local translation_path_array=($(get_translation_path_list $component))
-        
-        for translation_path in "${translation_path_array[@]}"; do
-            local locale=$(extract_locale_from_path $translation_path)
+        # Get translations of the component from the index
+        local translations
+        mapfile -t translations < <(list_translations $component)
+
+        # the directory name did not support .,
+        # so we need to replace . with -
+        local version_dir=${ZANATA_VERSION//./-}
+
+        for translation in "${translations[@]}"; do
+            local locale translation_path weblate_path
+            IFS=$'\t' read -r locale translation_path weblate_path <<< "$translation"
+            weblate_path=$TEST_DIR/$PROJECT/$version_dir/$weblate_path
             echo ""
+            if is_step_done verify $component $locale; then
+                echo "[INFO] Skip completed step: verify $component $locale"
+                continue
+            fi
             echo "[INFO] Testing locale: $locale"
             
             echo "[INFO] Step 1/2: Check the sentence count..."
-            # the directory name did not support ., 
-            # so we need to replace . with -
-            local version_dir=${ZANATA_VERSION//./-}
-            if ! python3 -u $SCRIPTSDIR/common/weblate_utils.py check-sentence-count \
+            if ! run_python $SCRIPTSDIR/common/weblate_utils.py check-sentence-count \
                 --project $PROJECT \
                 --category $ZANATA_VERSION \
                 --component $component \
                 --locale $locale \
                 --zanata-po-path $translation_path \
-                --weblate-po-path $(get_po_path $component $locale $TEST_DIR/$PROJECT/$version_dir true) \
+                --weblate-po-path $weblate_path \
                 --result-json $RESULT_JSON
             then
                 echo "[ERROR] Check the sentence failed: $PROJECT, $ZANATA_VERSION, $component, $locale, $translation_path"
@@ -50,17 +58,17 @@ function test_accuracy {
             fi
 
             echo "[INFO] Step 2/2: Check the sentence detail..."
-            python3 -u $SCRIPTSDIR/common/weblate_utils.py check-sentence-detail \
+            run_python $SCRIPTSDIR/common/weblate_utils.py check-sentence-detail \
                 --project $PROJECT \
                 --category $ZANATA_VERSION \
                 --component $component \
                 --locale $locale \
                 --zanata-po-path $translation_path \
-                --weblate-po-path $(get_po_path $component $locale $TEST_DIR/$PROJECT/$version_dir true) \
+                --weblate-po-path $weblate_path \
                 --result-json $RESULT_JSON 
             
         done
-        echo "[INFO] ✓ Component '$component' completed - tested ${#translation_path_array[@]} locales"
+        echo "[INFO] ✓ Component '$component' completed - tested ${#translations[@]} locales"
     done
 
     echo ""